@@ -1,29 +1,58 @@
-import utils
+"""
+Manual smoke test of the validation agents.
+
+    cd backend && python Tester.py           # offline, against benchmarks/fake_upstreams.py
+    cd backend && python Tester.py --live    # real CMS NPI Registry
+"""
+import os
+import sys
+import argparse
+import tempfile
+
+from benchmarks.fake_upstreams import DEFAULT_PROVIDER, FakeUpstreams
+
+parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+parser.add_argument("--live", action="store_true", help="Call the live CMS API instead of the local fake")
+parser.add_argument("--npi", default=DEFAULT_PROVIDER["npi_number"])
+args = parser.parse_args()
+
+upstreams = None
+if not args.live:
+    upstreams = FakeUpstreams(providers={DEFAULT_PROVIDER["npi_number"]: DEFAULT_PROVIDER}).start()
+    os.environ.update(upstreams.env())
+    # Keep fake answers out of the real caches
+    os.environ["DATA_DIR"] = tempfile.mkdtemp(prefix="tester_")
+# Extraction is not exercised here, so no Gemini key is needed
+os.environ.setdefault("EXTRACTION_MODEL_CLIENT", "local")
+
+# Imported after the environment points at the fake (agents read it at construction)
+from agents.directory_management_agent import DirectoryManagementAgent
 
 # 1. Define a real NPI number you found
-real_npi = "1134527302"  # Replace with the one you found if different
+real_npi = args.npi
 
-print(f"--- Testing NPI API for {real_npi} ---")
+print(f"--- Testing NPI API for {real_npi} ({'live' if args.live else 'local fake'}) ---")
 
-# 2. Call your function
-result = utils.fetch_npi_data(real_npi)
+# 2. Call the validation agent
+manager = DirectoryManagementAgent()
+validator = manager.validator
+result = validator.validate_npi(real_npi)
 
 # 3. Print the result
 if "error" in result:
     print("❌ Error:", result["error"])
     print("Tip: Check your internet connection or the API URL.")
-else:
-    print("✅ Success! Data fetched from Government API:")
-    print(f"Name: {result.get('official_name')}")
-    print(f"Address: {result.get('official_address')}")
-    print(f"Phone: {result.get('official_phone')}")
-    print(f"Status: {result.get('status')}")
+    sys.exit(1)
 
-    # OPTIONAL: Check your Mock DB logic
-    print("\n--- Testing Mock DB Logic ---")
-    mock_check = utils.validate_provider({"npi_number": real_npi})
-    print("Mock DB Result:", mock_check['state_board'])
+print("✅ Success! Data fetched from Government API:")
+print(f"Name: {result.get('official_name')}")
+print(f"Address: {result.get('official_address')}")
+print(f"Phone: {result.get('official_phone')}")
+print(f"Status: {result.get('status')}")
 
+print("\n--- Testing State License Lookup ---")
+license_data = validator.check_state_license(real_npi)
+print("State Board Result:", license_data)
 
 print("\n--- Testing Full Validation Logic (The Judge) ---")
 
@@ -36,8 +65,12 @@ fake_extracted_data = {
 }
 
 # Run the Judge (Job 3)
-final_report = utils.validate_provider(fake_extracted_data)
+web_data = {"verified_location": None, "coordinates": None}
+final_report = manager.perform_quality_assurance(fake_extracted_data, result, license_data, web_data)
 
 print(f"Final Score: {final_report['validation_result']['score']}")
 print(f"Priority:    {final_report['validation_result']['priority']}")
-print(f"Mismatches:  {final_report['validation_result']['mismatches']}")
\ No newline at end of file
+print(f"Mismatches:  {final_report['validation_result']['mismatches']}")
+
+if upstreams:
+    upstreams.stop()
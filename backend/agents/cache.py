@@ -0,0 +1,200 @@
+import os
+import copy
+import json
+import time
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from .storage import connect, data_path
+from .telemetry import CACHE_EVENTS
+
+# One background pool for stale-while-revalidate refreshes, shared by all caches
+_refresh_pool = ThreadPoolExecutor(max_workers=int(os.getenv("CACHE_REFRESH_THREADS", "4")), thread_name_prefix="cache-refresh")
+
+class TieredCache:
+    """
+    Two-tier TTL cache: an in-memory LRU in front of a persistent SQLite table.
+    - Positive and negative results get their own TTL.
+    - After expiry an entry stays usable for `stale_ttl` seconds: it is served
+      immediately while a background refresh fetches the new value.
+    - Concurrent misses for the same key are coalesced into one fetch.
+    - `max_disk_entries` bounds the table; the entries closest to expiry go first.
+    - Values go in and come out as copies, so callers may modify what they get.
+    Several caches can share one database file; `namespace` keeps them apart.
+    """
+    def __init__(self, namespace, ttl, negative_ttl=None, stale_ttl=0, max_memory_entries=10000, max_disk_entries=None, db_path=None):
+        self.namespace = namespace
+        self.ttl = ttl
+        self.negative_ttl = ttl if negative_ttl is None else negative_ttl
+        self.stale_ttl = stale_ttl
+        self.max_memory_entries = max_memory_entries
+        self.max_disk_entries = max_disk_entries
+
+        self.memory = OrderedDict()
+        self.lock = threading.Lock()
+        self.refreshing = set()
+        self.in_flight = {}
+        self.writes = 0
+        self.counters = {"hits": 0, "stale_hits": 0, "misses": 0, "coalesced": 0, "refreshes": 0, "refresh_errors": 0, "evictions": 0}
+
+        self.conn = connect(db_path or os.getenv("CACHE_DB_PATH") or data_path("cache.sqlite"))
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS cache (
+                namespace TEXT NOT NULL,
+                key TEXT NOT NULL,
+                value TEXT NOT NULL,
+                expires_at REAL NOT NULL,
+                stale_until REAL NOT NULL,
+                PRIMARY KEY (namespace, key)
+            )
+        """)
+
+    def get(self, key):
+        """
+        Returns (value, state) where state is "fresh", "stale" or None (miss).
+        The value is the caller's own copy.
+        """
+        now = time.time()
+        with self.lock:
+            entry = self.memory.get(key)
+            if entry is not None:
+                self.memory.move_to_end(key)
+
+        if entry is None:
+            row = self.conn.execute(
+                "SELECT value, expires_at, stale_until FROM cache WHERE namespace = ? AND key = ?",
+                (self.namespace, key),
+            ).fetchone()
+            if row is not None:
+                entry = (json.loads(row["value"]), row["expires_at"], row["stale_until"])
+                self._remember(key, entry)
+
+        if entry is None:
+            return None, None
+        value, expires_at, stale_until = entry
+        if now < expires_at:
+            return copy.deepcopy(value), "fresh"
+        if now < stale_until:
+            return copy.deepcopy(value), "stale"
+        return None, None
+
+    def set(self, key, value, negative=False):
+        now = time.time()
+        expires_at = now + (self.negative_ttl if negative else self.ttl)
+        stale_until = expires_at + self.stale_ttl
+        self._remember(key, (copy.deepcopy(value), expires_at, stale_until))
+        with self.lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO cache (namespace, key, value, expires_at, stale_until) VALUES (?, ?, ?, ?, ?)",
+                (self.namespace, key, json.dumps(value), expires_at, stale_until),
+            )
+            self.writes += 1
+            if self.max_disk_entries and self.writes % 100 == 0:
+                self._evict()
+
+    def get_or_fetch(self, key, fetch, is_negative=None, cacheable=None):
+        """
+        Cache-aside lookup. `fetch(key)` is only called on a miss (or in the
+        background for a stale entry). Results rejected by `cacheable` are
+        returned but never stored (e.g. upstream errors).
+        """
+        value, state = self.get(key)
+        if state == "fresh":
+            self._count("hits")
+            return value
+        if state == "stale":
+            self._count("stale_hits")
+            self._schedule_refresh(key, fetch, is_negative, cacheable)
+            return value
+
+        # Single flight: the first caller fetches, concurrent callers wait for its result
+        with self.lock:
+            leader = key not in self.in_flight
+            if leader:
+                future = self.in_flight[key] = Future()
+            else:
+                future = self.in_flight[key]
+                self.counters["coalesced"] += 1
+                CACHE_EVENTS.labels(self.namespace, "coalesced").inc()
+        if not leader:
+            # Every waiter gets its own copy of the leader's result
+            return copy.deepcopy(future.result())
+
+        self._count("misses")
+        try:
+            value = fetch(key)
+            self._store(key, value, is_negative, cacheable)
+            future.set_result(value)
+            return value
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self.lock:
+                self.in_flight.pop(key, None)
+
+    def stats(self):
+        with self.lock:
+            stats = dict(self.counters)
+            stats["memory_entries"] = len(self.memory)
+        served = stats["hits"] + stats["stale_hits"] + stats["coalesced"]
+        lookups = served + stats["misses"]
+        stats["hit_ratio"] = round(served / lookups, 4) if lookups else 0.0
+        return stats
+
+    def purge_expired(self):
+        """
+        Drops entries past their stale window from disk.
+        """
+        with self.lock:
+            self.conn.execute(
+                "DELETE FROM cache WHERE namespace = ? AND stale_until < ?", (self.namespace, time.time())
+            )
+
+    def _evict(self):
+        # Called with self.lock held
+        count = self.conn.execute("SELECT COUNT(*) FROM cache WHERE namespace = ?", (self.namespace,)).fetchone()[0]
+        excess = count - self.max_disk_entries
+        if excess > 0:
+            self.conn.execute(
+                "DELETE FROM cache WHERE namespace = ? AND key IN "
+                "(SELECT key FROM cache WHERE namespace = ? ORDER BY stale_until LIMIT ?)",
+                (self.namespace, self.namespace, excess),
+            )
+            self.counters["evictions"] += excess
+
+    def _store(self, key, value, is_negative, cacheable):
+        if cacheable and not cacheable(value):
+            return
+        self.set(key, value, negative=bool(is_negative and is_negative(value)))
+
+    def _schedule_refresh(self, key, fetch, is_negative, cacheable):
+        with self.lock:
+            if key in self.refreshing:
+                return
+            self.refreshing.add(key)
+
+        def refresh():
+            try:
+                self._store(key, fetch(key), is_negative, cacheable)
+                self._count("refreshes")
+            except Exception:
+                self._count("refresh_errors")
+            finally:
+                with self.lock:
+                    self.refreshing.discard(key)
+
+        _refresh_pool.submit(refresh)
+
+    def _remember(self, key, entry):
+        with self.lock:
+            self.memory[key] = entry
+            self.memory.move_to_end(key)
+            while len(self.memory) > self.max_memory_entries:
+                self.memory.popitem(last=False)
+
+    def _count(self, name):
+        with self.lock:
+            self.counters[name] += 1
+        CACHE_EVENTS.labels(self.namespace, name).inc()
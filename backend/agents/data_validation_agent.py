@@ -1,19 +1,38 @@
-import requests
-import json
 import os
+from .cache import TieredCache
+from .http_client import get_http_client
+from .telemetry import get_logger
+from .license_store import open_license_store
+from .nppes_store import open_nppes_store
+
+logger = get_logger("validation")
 
 class DataValidationAgent:
-    def __init__(self):
-        self.base_url = "https://npiregistry.cms.hhs.gov/api/"
+    def __init__(self, npi_cache=None, license_store=None, nppes_store=None, http_client=None):
+        self.base_url = os.getenv("NPI_REGISTRY_URL", "https://npiregistry.cms.hhs.gov/api/")
+        self.http = http_client or get_http_client()
+        # Local NPPES copy (None until `python -m agents.nppes_store` has been run)
+        self.nppes_store = nppes_store or open_nppes_store()
+        # Registry answers rarely change, so repeat NPIs are served from cache
+        self.npi_cache = npi_cache or TieredCache(
+            "npi_registry",
+            ttl=float(os.getenv("NPI_CACHE_TTL", "86400")),
+            negative_ttl=float(os.getenv("NPI_CACHE_NEGATIVE_TTL", "3600")),
+            stale_ttl=float(os.getenv("NPI_CACHE_STALE_TTL", "604800")),
+            max_memory_entries=int(os.getenv("NPI_CACHE_MEMORY_ENTRIES", "50000")),
+        )
+        # State board export, indexed once and reloaded when the file changes
+        self.license_store = license_store or open_license_store()
 
     def validate_npi(self, npi_number):
         """
         REAL LOGIC:
         1. Checks NPI format (10 digits).
         2. Runs Luhn Checksum (Mathematical validation).
-        3. Queries CMS Government API.
+        3. Looks the NPI up in the local NPPES copy.
+        4. Falls back to the CMS Government API (through the NPI cache).
         """
-        print(f"🔍 [ValidationAgent] Validating NPI: {npi_number}")
+        logger.debug("validating npi", extra={"npi": npi_number})
         
         # 1. Sanity Check
         if not npi_number or len(npi_number) != 10 or not npi_number.isdigit():
@@ -21,13 +40,30 @@ class DataValidationAgent:
 
         # 2. Mathematical Checksum (Luhn Algorithm) - Core Logic
         if not self._luhn_check(npi_number):
-            print("   ↳ [ValidationAgent] Luhn Checksum Failed (Fake NPI detected)")
+            logger.info("npi checksum failed", extra={"npi": npi_number})
             return {"official_name": "Fake NPI", "status": "Checksum Fail"}
 
-        # 3. External API Call
+        # 3. Local NPPES copy (no network, sub-millisecond)
+        if self.nppes_store:
+            record = self.nppes_store.lookup(npi_number)
+            if record:
+                return record
+
+        # 4. External API Call (only well-formed, checksum-valid NPIs get here)
+        return self.npi_cache.get_or_fetch(
+            npi_number,
+            self.query_registry,
+            is_negative=lambda r: r.get("status") == "Not Found",
+            cacheable=lambda r: "error" not in r,
+        )
+
+    def query_registry(self, npi_number):
+        """
+        Live CMS NPI Registry lookup. Errors are returned (not raised) and never cached.
+        """
         try:
-            url = f"{self.base_url}?number={npi_number}&version=2.1"
-            response = requests.get(url, timeout=5) # 5s timeout for safety
+            # Shared client handles pooling, rate limits, retries and the timeout
+            response = self.http.get(self.base_url, params={"number": npi_number, "version": "2.1"})
             data = response.json()
             
             if data.get("result_count", 0) > 0:
@@ -37,47 +73,66 @@ class DataValidationAgent:
                     "official_name": f"{res['basic']['first_name']} {res['basic']['last_name']}",
                     "official_phone": addr.get('telephone_number', 'N/A'),
                     "official_address": addr.get('address_1', 'N/A'),
+                    "official_city": addr.get('city'),
+                    "official_state": addr.get('state'),
+                    "official_postal_code": (addr.get('postal_code') or '')[:5] or None,
                     "status": "Active"
                 }
             return {"official_name": "Not Found", "status": "Not Found"}
         except Exception as e:
-            print(f"❌ [ValidationAgent] API Error: {e}")
+            logger.warning("npi registry error", extra={"npi": npi_number, "error": str(e)})
             return {"error": "Registry Unreachable"}
 
     def check_state_license(self, npi_number):
         """
-        Treats the local JSON as a 'Cached State Database'.
-        No sleep, just fast lookup.
+        Treats the state board export as a 'Cached State Database'.
+        The license store is indexed once, so this is a dict/B-tree lookup.
         """
-        print(f"📜 [ValidationAgent] Checking Local State License Cache for {npi_number}...")
+        logger.debug("checking state license", extra={"npi": npi_number})
         
         try:
-            filename = 'mock_db.json' if os.path.exists('mock_db.json') else 'mock-db.json'
-            # Fallback path logic
-            if not os.path.exists(filename) and os.path.exists(f"../{filename}"):
-                filename = f"../{filename}"
-
-            with open(filename, 'r') as f:
-                db = json.load(f)
-                record = db.get(str(npi_number))
-                
-                if record:
-                    return record
-                else:
-                    # Return "Unverified" instead of Active if not in DB
-                    return {"state_license_status": "Unverified", "note": "Not in State DB"}
+            record = self.license_store.lookup(npi_number)
+            if record:
+                return dict(record)
+            else:
+                # Return "Unverified" instead of Active if not in DB
+                return {"state_license_status": "Unverified", "note": "Not in State DB"}
                     
         except Exception as e:
             return {"state_license_status": "Error", "note": str(e)}
 
-    def _luhn_check(self, n):
+    def check_state_licenses(self, npi_numbers):
         """
-        Validates NPI using the Luhn algorithm.
-        CRITICAL: CMS requires prefixing '80840' to the NPI before calculation.
+        Bulk version of check_state_license for rosters: one store round-trip.
         """
-        # 1. Add the secret prefix
-        full_number = "80840" + str(n)
-        
-        # 2. Run standard Luhn
-        r = [int(ch) for ch in full_number][::-1]
-        return (sum(r[0::2]) + sum(sum(divmod(d*2,10)) for d in r[1::2])) % 10 == 0
\ No newline at end of file
+        try:
+            found = self.license_store.lookup_many(npi_numbers)
+        except Exception as e:
+            return {str(n): {"state_license_status": "Error", "note": str(e)} for n in npi_numbers}
+        return {
+            str(n): dict(found[str(n)]) if str(n) in found else {"state_license_status": "Unverified", "note": "Not in State DB"}
+            for n in npi_numbers
+        }
+
+    def _luhn_check(self, n):
+        return npi_checksum_ok(n)
+
+
+def npi_checksum_ok(n):
+    """
+    Validates NPI using the Luhn algorithm.
+    CRITICAL: CMS requires prefixing '80840' to the NPI before calculation.
+    """
+    # 1. Add the secret prefix
+    full_number = "80840" + str(n)
+    
+    # 2. Run standard Luhn
+    r = [int(ch) for ch in full_number][::-1]
+    return (sum(r[0::2]) + sum(sum(divmod(d*2,10)) for d in r[1::2])) % 10 == 0
+
+def registry_verified(official):
+    """
+    True when the registry (or the NPPES copy) confirmed an active provider.
+    Only these go into the directory-wide indexes.
+    """
+    return bool(official) and "error" not in official and official.get("status") == "Active"
@@ -1,12 +1,25 @@
 import os
+import time
+import asyncio
 # Import your agent
 from .extraction_agent import ExtractionAgent
 # Import Teammate A's agents 
-from .data_validation_agent import DataValidationAgent
+from .data_validation_agent import DataValidationAgent, registry_verified
+from .document_splitter import DocumentSplitter
 from .enrichment_agent import InformationEnrichmentAgent
+from .matching import ProviderMatcher, name_similarity
+from .qa_rules import load_rules
+from .report_store import ReportStore
+from .spatial_index import SpatialIndex, haversine_km, indexed_location, report_location
+from .telemetry import get_logger, stage_span
+
+logger = get_logger("directory_manager")
+
+# Registry answers that carry no real official name to compare against
+NO_OFFICIAL_NAME = {"Not Found", "Invalid Input", "Checksum Fail", "Deactivated"}
 
 class DirectoryManagementAgent:
-    def __init__(self):
+    def __init__(self, report_store=None, rules=None, matcher=None, locations=None):
         # Initialize the workforce
         api_key = os.getenv("GOOGLE_API_KEY")
         
@@ -17,66 +30,252 @@ class DirectoryManagementAgent:
         self.validator = DataValidationAgent()
         self.enricher = InformationEnrichmentAgent()
 
-    def process_application(self, file_path):
-        print("\n🤖 [DirectoryManager] New Task Received. Starting Workflow...")
-        
+        # QA scoring rules, compiled once
+        self.rules = rules or load_rules()
+
+        # Every QA report is kept for the review queue (/reports)
+        self.reports = report_store or ReportStore()
+        # Directory-wide duplicate index, updated with every report
+        self.matcher = matcher or ProviderMatcher()
+        # Validated practice locations (radius / nearest queries, address conflicts)
+        self.locations = locations or SpatialIndex()
+        # Registry addresses are geocoded from the gazetteer/geocode cache only,
+        # unless this allows a (rate-limited) Nominatim request per document
+        self.geocode_registry_online = os.getenv("REGISTRY_GEOCODE_ONLINE", "0") == "1"
+
+        # Multi-provider packets: one segment per application, extracted in parallel
+        self.splitter = DocumentSplitter()
+        self.segment_concurrency = int(os.getenv("SPLIT_EXTRACTION_CONCURRENCY", "16"))
+
+    def process_application(self, document):
+        """
+        `document` is a Document (see agents/document.py) or a file path.
+        """
+        logger.debug("workflow started")
+        started = time.perf_counter()
+        run = self._traced
+
         # STEP 1: Extraction (The Eyes)
-        extracted = self.extractor.process_document(file_path)
+        extracted = run("extraction", self.extractor.process_document, document)
         if "error" in extracted:
             return {"error": "Extraction Failed", "details": extracted}
 
         # STEP 2: Validation (The Verifier)
         npi = extracted.get("npi_number")
-        official_data = self.validator.validate_npi(npi)
-        license_data = self.validator.check_state_license(npi)
+        official_data = run("npi_registry", self.validator.validate_npi, npi)
+        license_data = run("state_license", self.validator.check_state_license, npi)
 
         # STEP 3: Enrichment (The Researcher)
-        # We search based on the extracted name to see if they exist online
-        web_data = self.enricher.enrich_provider_data(extracted.get("provider_name"), "USA")
+        # We geocode the practice address from the PDF to see if it exists
+        web_data = run("enrichment", self.enricher.enrich_provider_data, extracted.get("provider_name"), extracted.get("address"))
 
-        # STEP 4: Quality Assurance (The Judge)
-        report = self._perform_quality_assurance(extracted, official_data, license_data, web_data)
-        
-        print("✅ [DirectoryManager] Workflow Complete. Report Ready.")
+        # STEP 4: Matching (name vs registry, duplicates already in the directory)
+        matching = run("matching", self.match_provider, extracted, official_data, web_data)
+
+        # STEP 5: Quality Assurance (The Judge)
+        report = run("qa", self.perform_quality_assurance, extracted, official_data, license_data, web_data, matching)
+        self.record(report, document)
+
+        self._log_complete(report, started)
         return report
 
-    def _perform_quality_assurance(self, extracted, official, license_data, web_data):
+    async def process_application_async(self, document, limits=None, emit=None):
         """
-        Calculates confidence score based on data consistency across sources.
+        Same workflow as process_application, but safe to await from the API.
+        The agents do blocking I/O (Gemini, CMS, Nominatim), so every stage runs
+        in a worker thread and the three lookups after extraction run concurrently.
+        `limits` optionally maps a stage name to an asyncio.Semaphore (batch jobs).
+        `emit` is an optional async callback receiving one event per finished
+        stage (stage name, status, timings and that stage's partial result).
         """
-        score = 100
-        mismatches = []
-        priority = "Low"
+        logger.debug("async workflow started")
+        run = self._stage_runner(limits, emit)
+        started = time.perf_counter()
 
-        # Normalization
-        pdf_phone = str(extracted.get("phone_number", "")).replace("-", "").replace(" ", "")
-        npi_phone = str(official.get("official_phone", "")).replace("-", "").replace(" ", "")
-        
-        # Rule 1: Existence Check
-        if official.get("official_name") == "Not Found":
-            score = 0
-            mismatches.append("CRITICAL: Provider not found in NPI Registry")
-            priority = "Critical"
-        
-        # Rule 2: Phone Verification
-        elif pdf_phone != npi_phone:
-            score -= 40
-            mismatches.append(f"Phone Discrepancy (PDF: {pdf_phone} vs Registry: {npi_phone})")
-            priority = "High"
+        # STEP 1: Extraction (everything else depends on it)
+        extracted = await run("extraction", self.extractor.process_document, document)
+        if "error" in extracted:
+            return {"error": "Extraction Failed", "details": extracted}
+
+        # STEP 2 + 3: Validation and Enrichment are independent, so fan out
+        npi = extracted.get("npi_number")
+        official_data, license_data, web_data = await asyncio.gather(
+            run("npi_registry", self.validator.validate_npi, npi),
+            run("state_license", self.validator.check_state_license, npi),
+            run("enrichment", self.enricher.enrich_provider_data, extracted.get("provider_name"), extracted.get("address")),
+        )
+
+        # STEP 4: Matching (local index lookups)
+        matching = await run("matching", self.match_provider, extracted, official_data, web_data)
+
+        # STEP 5: Quality Assurance (cheap, stays on the event loop)
+        report = await run("qa", self.perform_quality_assurance, extracted, official_data, license_data, web_data, matching, in_thread=False)
+        await asyncio.to_thread(self.record, report, document)
+
+        self._log_complete(report, started)
+        return report
+
+    async def process_packet_async(self, document, limits=None, emit=None):
+        """
+        Multi-provider version of process_application_async: splits the
+        document into one segment per provider and runs the whole workflow for
+        every segment concurrently (extractions capped by the "extraction"
+        limit, SPLIT_EXTRACTION_CONCURRENCY unless the caller passes one).
+        Returns one report per segment in page order; stage events carry the
+        segment index.
+        """
+        segments = await asyncio.to_thread(self.splitter.split, document)
+        if len(segments) == 1:
+            return [await self.process_application_async(document, limits, emit)]
+        logger.info("document split", extra={"segments": len(segments)})
 
-        # Rule 3: License Check
-        if license_data.get("state_license_status") != "Active":
-            score -= 20
-            mismatches.append(f"State License Issue: {license_data.get('state_license_status')}")
+        limits = dict(limits or {})
+        limits.setdefault("extraction", asyncio.Semaphore(self.segment_concurrency))
 
+        async def run(index, segment, pages):
+            segment_emit = (lambda event: emit(dict(event, segment=index))) if emit else None
+            report = await self.process_application_async(segment, limits, segment_emit)
+            report["segment"] = {"index": index, "pages": pages, "count": len(segments)}
+            return report
+
+        return list(await asyncio.gather(*(run(i, segment, pages) for i, (segment, pages) in enumerate(segments))))
+
+    def _stage_runner(self, limits, emit):
+        """
+        Returns run(stage, func, *args): runs one blocking agent call in a worker
+        thread (under the stage's limit, if any) and emits its event when done.
+        """
+        workflow_started = time.perf_counter()
+
+        async def run(stage, func, *args, in_thread=True):
+            limit = (limits or {}).get(stage)
+            if limit is not None:
+                await limit.acquire()
+            started = time.perf_counter()
+            try:
+                with stage_span(stage) as outcome:
+                    result = await asyncio.to_thread(func, *args) if in_thread else func(*args)
+                    outcome["error"] = isinstance(result, dict) and "error" in result
+            finally:
+                if limit is not None:
+                    limit.release()
+
+            if emit:
+                finished = time.perf_counter()
+                await emit({
+                    "stage": stage,
+                    "status": "error" if isinstance(result, dict) and "error" in result else "completed",
+                    "duration_ms": round((finished - started) * 1000, 1),
+                    "elapsed_ms": round((finished - workflow_started) * 1000, 1),
+                    "data": result,
+                })
+            return result
+
+        return run
+
+    def _traced(self, stage, func, *args):
+        with stage_span(stage) as outcome:
+            result = func(*args)
+            outcome["error"] = isinstance(result, dict) and "error" in result
+            return result
+
+    def _log_complete(self, report, started):
+        result = report.get("validation_result", {})
+        logger.info("workflow complete", extra={
+            "duration_ms": round((time.perf_counter() - started) * 1000, 1),
+            "score": result.get("score"),
+            "priority": result.get("priority"),
+        })
+
+    def match_provider(self, extracted, official, web_data=None):
+        """
+        Name similarity between the application and the registry, likely
+        duplicates of this provider under another NPI, name or address, and
+        (given a geocoded practice) unrelated NPIs at the same spot and the
+        distance to the registry's practice address.
+        """
+        similarity = None
+        if official.get("official_name") and official.get("status") not in NO_OFFICIAL_NAME:
+            similarity = name_similarity(extracted.get("provider_name"), official.get("official_name"))
+        duplicates = self.matcher.find_duplicates(
+            extracted.get("provider_name"), extracted.get("npi_number"), extracted.get("phone_number"),
+            extracted.get("address"), exclude_npi=extracted.get("npi_number"),
+        )
         return {
+            "name_similarity": similarity,
+            "duplicate_count": len(duplicates),
+            "duplicate_npi": duplicates[0]["npi"] if duplicates else None,
+            "duplicates": duplicates,
+            **self._match_location(extracted, official, web_data or {}),
+        }
+
+    def _match_location(self, extracted, official, web_data):
+        point = report_location({"web_enrichment": web_data})
+        if point is None:
+            return {"colocated_count": None, "colocated_npis": [], "registry_distance_km": None}
+        colocated = self.locations.colocated(*point, exclude_npi=extracted.get("npi_number"), phone=extracted.get("phone_number"))
+        registry_point = None
+        registry_address = _registry_address(official)
+        if registry_address:
+            registry_point = self.enricher.locate(registry_address, online=self.geocode_registry_online)
+        return {
+            "colocated_count": colocated["unrelated"],
+            "colocated_npis": colocated["npis"],
+            "registry_distance_km": round(haversine_km(*point, *registry_point), 1) if registry_point else None,
+        }
+
+    def record(self, report, document=None):
+        """
+        Stores the report and adds the provider to the duplicate and location
+        indexes; returns the report id. `document` is the upload (or its
+        source name). Only registry-verified providers are indexed: "Not
+        Found", checksum failures and malformed NPIs would otherwise show up
+        as duplicates of real providers.
+        """
+        report["report_id"] = self.reports.add(report, source=_source_name(document))
+        if not registry_verified(report.get("official")):
+            return report["report_id"]
+        extracted = report["extracted"]
+        self.matcher.add(
+            extracted.get("provider_name"), extracted.get("npi_number"), extracted.get("phone_number"),
+            extracted.get("address"), report_id=report["report_id"],
+        )
+        point = indexed_location(report)
+        if point:
+            self.locations.add(
+                extracted.get("npi_number"), *point, extracted.get("provider_name"),
+                extracted.get("phone_number"), extracted.get("address"), report_id=report["report_id"],
+            )
+        return report["report_id"]
+
+    def perform_quality_assurance(self, extracted, official, license_data, web_data, matching=None):
+        """
+        Calculates confidence score based on data consistency across sources,
+        using the versioned rule set (agents/qa_rules.json or QA_RULES_PATH).
+        """
+        report = {
             "extracted": extracted,
             "official": official,
             "state_board": license_data,
             "web_enrichment": web_data,
-            "validation_result": {
-                "score": score,
-                "priority": priority,
-                "mismatches": mismatches
-            }
-        }
\ No newline at end of file
+            "matching": matching or {},
+        }
+        report["validation_result"] = self.rules.evaluate(report)
+        return report
+
+
+def _registry_address(official):
+    """
+    "123 Main St, New York, NY 10003" from a registry answer, or None when the
+    registry gave no street line or no city/ZIP to place it.
+    """
+    street = official.get("official_address")
+    if not street or street == "N/A" or not (official.get("official_city") or official.get("official_postal_code")):
+        return None
+    region = " ".join(part for part in (official.get("official_state"), official.get("official_postal_code")) if part)
+    return ", ".join(part for part in (street, official.get("official_city"), region) if part)
+
+def _source_name(document):
+    if document is None:
+        return None
+    return getattr(document, "filename", None) or os.path.basename(str(document))
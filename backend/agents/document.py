@@ -0,0 +1,78 @@
+import io
+import os
+import hashlib
+import tempfile
+import mimetypes
+from contextlib import contextmanager
+
+class Document:
+    """
+    One input document, either held in memory (small uploads) or backed by a
+    file on disk (large uploads, batch jobs, local paths). Agents read it via
+    open() so in-memory bytes are never written to disk just to be read back.
+    """
+    def __init__(self, filename, data=None, path=None, sha256=None, size=None, owns_path=False):
+        self.filename = filename
+        self.data = data
+        self.path = path
+        self.sha256 = sha256
+        self.size = size if size is not None else (len(data) if data is not None else os.path.getsize(path))
+        self.owns_path = owns_path
+
+    @classmethod
+    def from_path(cls, path):
+        return cls(os.path.basename(path), path=path)
+
+    @property
+    def mime_type(self):
+        mime_type, _ = mimetypes.guess_type(self.filename)
+        return mime_type or "application/pdf"
+
+    def open(self):
+        """
+        Binary file object over the content (BytesIO shares the bytes, no copy).
+        """
+        if self.data is not None:
+            return io.BytesIO(self.data)
+        return open(self.path, "rb")
+
+    def content_hash(self):
+        if self.sha256 is None:
+            digest = hashlib.sha256()
+            with self.open() as f:
+                for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                    digest.update(chunk)
+            self.sha256 = digest.hexdigest()
+        return self.sha256
+
+    def read_bytes(self):
+        if self.data is not None:
+            return self.data
+        with open(self.path, "rb") as f:
+            return f.read()
+
+    @contextmanager
+    def as_path(self):
+        """
+        For consumers that insist on a filename. Only in-memory documents pay
+        for a (uniquely named) temp file.
+        """
+        if self.path is not None:
+            yield self.path
+            return
+        suffix = os.path.splitext(self.filename)[1]
+        with tempfile.NamedTemporaryFile(prefix="doc_", suffix=suffix) as f:
+            f.write(self.data)
+            f.flush()
+            yield f.name
+
+    def close(self):
+        if self.owns_path and self.path and os.path.exists(self.path):
+            os.remove(self.path)
+
+
+def as_document(source):
+    """
+    Accepts a Document or a file path (the original API) and returns a Document.
+    """
+    return source if isinstance(source, Document) else Document.from_path(source)
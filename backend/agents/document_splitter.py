@@ -0,0 +1,78 @@
+import io
+import os
+
+from .document import Document, as_document
+from .local_extractor import LocalTextExtractor, load_pypdf
+
+class DocumentSplitter:
+    """
+    Splits a packet PDF (a group practice sending many applications in one
+    file) into one segment per provider. A page starts a new segment when its
+    text layer names a provider or NPI different from the one already in the
+    current segment; pages without identifying fields (continuation pages,
+    scans) stay with the segment before them. SPLIT_MODE=page makes every
+    page its own segment, for packets of one-page scanned forms.
+    Returns [(Document, (first_page, last_page))], pages counted from 1.
+    """
+    def __init__(self, mode=None, max_pages=None, local_extractor=None):
+        self.mode = mode or os.getenv("SPLIT_MODE", "auto")
+        self.max_pages = max_pages or int(os.getenv("SPLIT_MAX_PAGES", "500"))
+        self.local_extractor = local_extractor or LocalTextExtractor()
+
+    def split(self, document):
+        document = as_document(document)
+        pypdf = load_pypdf()
+        # Without pypdf every document is a single segment
+        if pypdf is None or document.mime_type != "application/pdf":
+            return [(document, None)]
+        try:
+            with document.open() as stream:
+                reader = pypdf.PdfReader(stream)
+                pages = reader.pages[:self.max_pages]
+                if len(pages) < 2:
+                    return [(document, None)]
+                ranges = self._page_ranges(pages)
+                if len(ranges) == 1:
+                    return [(document, None)]
+                return [(self._segment(document, reader, first, last), (first + 1, last + 1)) for first, last in ranges]
+        except Exception:
+            # Unreadable PDFs go through the pipeline whole, as before
+            return [(document, None)]
+
+    def _page_ranges(self, pages):
+        if self.mode == "page":
+            return [(i, i) for i in range(len(pages))]
+        ranges = []
+        current = {}
+        start = 0
+        for i, page in enumerate(pages):
+            fields = self._identity(page)
+            if i and any(current.get(k) and current[k] != v for k, v in fields.items()):
+                ranges.append((start, i - 1))
+                start, current = i, {}
+            for key, value in fields.items():
+                current.setdefault(key, value)
+        ranges.append((start, len(pages) - 1))
+        return ranges
+
+    def _identity(self, page):
+        text = page.extract_text() or ""
+        if not text.strip():
+            return {}
+        fields, _ = self.local_extractor.extract_fields(text)
+        identity = {}
+        if fields.get("npi_number"):
+            identity["npi_number"] = fields["npi_number"]
+        if fields.get("provider_name"):
+            identity["provider_name"] = " ".join(fields["provider_name"].lower().split())
+        return identity
+
+    def _segment(self, document, reader, first, last):
+        writer = load_pypdf().PdfWriter()
+        for index in range(first, last + 1):
+            writer.add_page(reader.pages[index])
+        buffer = io.BytesIO()
+        writer.write(buffer)
+        stem, ext = os.path.splitext(document.filename)
+        pages = f"p{first + 1}" if first == last else f"p{first + 1}-{last + 1}"
+        return Document(f"{stem}_{pages}{ext or '.pdf'}", data=buffer.getvalue())
@@ -1,14 +1,36 @@
-import requests
-import re
-from urllib.parse import quote
+import os
+import time
+import threading
+from collections import deque
+from .cache import TieredCache
+from .geocoding import normalize_address, open_gazetteer, parse_coordinates
+from .http_client import get_http_client
+from .telemetry import get_logger
+
+logger = get_logger("enrichment")
 
 class InformationEnrichmentAgent:
-    def __init__(self):
+    def __init__(self, http_client=None, geocode_cache=None, gazetteer=None):
         # OpenStreetMap Nominatim API (Free, No Key Required)
-        self.geocoding_url = "https://nominatim.openstreetmap.org/search"
+        self.geocoding_url = os.getenv("NOMINATIM_URL", "https://nominatim.openstreetmap.org/search")
+        # Shared client enforces Nominatim's 1 request/second policy
+        self.http = http_client or get_http_client()
         self.headers = {
             'User-Agent': 'ProviderValidatorApp/1.0' # Required by OSM policy
         }
+        # Addresses don't move: cache geocodes for a long time, keyed by the normalised address
+        self.geocode_cache = geocode_cache or TieredCache(
+            "geocode",
+            ttl=float(os.getenv("GEOCODE_CACHE_TTL", str(30 * 86400))),
+            negative_ttl=float(os.getenv("GEOCODE_CACHE_NEGATIVE_TTL", "86400")),
+            max_memory_entries=int(os.getenv("GEOCODE_CACHE_MEMORY_ENTRIES", "50000")),
+        )
+        # Optional offline gazetteer (None until `python -m agents.geocoding` has been run)
+        self.gazetteer = gazetteer or open_gazetteer()
+
+        self.lock = threading.Lock()
+        self.latencies = deque(maxlen=int(os.getenv("ENRICHMENT_LATENCY_SAMPLES", "1000")))
+        self.counters = {"lookups": 0, "gazetteer_hits": 0}
 
     def enrich_provider_data(self, provider_name, location_query):
         """
@@ -16,35 +38,102 @@ class InformationEnrichmentAgent:
         1. Geocodes the address to verify it exists physically.
         2. Validates phone number format strictly.
         """
-        print(f"🌍 [EnrichmentAgent] Starting Real Enrichment for: '{provider_name}'")
-        
+        logger.debug("starting enrichment", extra={"provider_name": provider_name})
+        started = time.perf_counter()
+
         # 1. Real Geolocation Check
         geo_data = self._verify_address_exists(location_query)
-        
-        # 2. Return Enriched Data
+
+        with self.lock:
+            self.latencies.append(time.perf_counter() - started)
+
+        # 2. Return Enriched Data (numeric lat/lon feed the spatial index)
+        point = parse_coordinates(geo_data['coords']) if geo_data['coords'] else None
         return {
-            "web_source": "OpenStreetMap",
+            "web_source": geo_data.get('source', "OpenStreetMap"),
             "verified_location": geo_data['exists'],
             "coordinates": geo_data['coords'],
+            "latitude": point[0] if point else None,
+            "longitude": point[1] if point else None,
             "full_address_match": geo_data['display_name'],
             "enrichment_status": "Completed"
         }
 
+    def locate(self, address, online=True):
+        """
+        (lat, lon) of an address, or None. With online=False only the offline
+        gazetteer and the geocode cache are consulted, never Nominatim.
+        """
+        if online:
+            coords = self._verify_address_exists(address)["coords"]
+            return parse_coordinates(coords) if coords else None
+        key = normalize_address(address)
+        if not key:
+            return None
+        if self.gazetteer:
+            hit = self.gazetteer.lookup(address)
+            if hit:
+                return hit["lat"], hit["lon"]
+        cached, _ = self.geocode_cache.get(key)
+        return parse_coordinates(cached["coords"]) if cached and cached.get("coords") else None
+
+    def stats(self):
+        with self.lock:
+            samples = sorted(self.latencies)
+            counters = dict(self.counters)
+        cache = self.geocode_cache.stats()
+        offline_hits = counters["gazetteer_hits"] + cache["hits"] + cache["stale_hits"]
+        return {
+            "lookups": counters["lookups"],
+            "gazetteer_hits": counters["gazetteer_hits"],
+            "geocode_cache": cache,
+            "offline_hit_ratio": round(offline_hits / counters["lookups"], 4) if counters["lookups"] else 0.0,
+            "p95_latency_ms": round(samples[int(0.95 * (len(samples) - 1))] * 1000, 2) if samples else None,
+        }
+
     def _verify_address_exists(self, address):
         """
-        Queries OpenStreetMap to see if the address is real.
+        Resolves an address: offline gazetteer first, then the geocode cache,
+        and only then OpenStreetMap.
         """
-        if not address:
+        key = normalize_address(address)
+        if not key:
             return {"exists": False, "coords": None, "display_name": "No Address Provided"}
 
-        print(f"   ↳ [EnrichmentAgent] Geocoding Address: {address}...")
+        with self.lock:
+            self.counters["lookups"] += 1
+
+        if self.gazetteer:
+            hit = self.gazetteer.lookup(address)
+            if hit:
+                with self.lock:
+                    self.counters["gazetteer_hits"] += 1
+                return {
+                    "exists": True,
+                    "coords": f"{hit['lat']}, {hit['lon']}",
+                    "display_name": hit['display_name'],
+                    "source": "Offline Gazetteer",
+                }
+
+        return self.geocode_cache.get_or_fetch(
+            key,
+            lambda _: self._geocode_online(address),
+            is_negative=lambda r: r["exists"] is False,
+            cacheable=lambda r: r["exists"] != "Error",
+        )
+
+    def _geocode_online(self, address):
+        """
+        Queries OpenStreetMap to see if the address is real.
+        """
+        logger.debug("geocoding address online", extra={"address": address})
         try:
             params = {
                 'q': address,
                 'format': 'json',
                 'limit': 1
             }
-            response = requests.get(self.geocoding_url, headers=self.headers, params=params)
+            response = self.http.get(self.geocoding_url, headers=self.headers, params=params)
             data = response.json()
 
             if data:
@@ -57,7 +146,7 @@ class InformationEnrichmentAgent:
                 }
             else:
                 return {"exists": False, "coords": None, "display_name": "Address Not Found"}
-                
+
         except Exception as e:
-            print(f"   ⚠️ [EnrichmentAgent] Geocoding Failed: {e}")
-            return {"exists": "Error", "coords": None, "display_name": "Service Unavailable"}
\ No newline at end of file
+            logger.warning("geocoding failed", extra={"address": address, "error": str(e)})
+            return {"exists": "Error", "coords": None, "display_name": "Service Unavailable"}
@@ -1,58 +1,93 @@
 import os
 import json
-import mimetypes
-import google.generativeai as genai
-from google.generativeai.types import HarmBlockThreshold, HarmCategory
+import hashlib
+from .cache import TieredCache
+from .document import as_document
+from .local_extractor import LocalTextExtractor
+from .model_clients import create_model_client
+from .telemetry import get_logger
+
+logger = get_logger("extraction")
+
+MODEL_NAME = 'gemini-2.5-flash'
+
+EXTRACTION_PROMPT = """
+You are an expert Data Entry Specialist.
+Extract the following fields from the provider application form into a strict JSON object:
+- provider_name (String): Full legal name
+- npi_number (String): 10-digit NPI
+- phone_number (String): Office phone
+- address (String): Practice address
+
+Rules:
+1. Return ONLY valid JSON.
+2. If a value is missing or illegible, set it to null.
+3. Do not include markdown formatting like ```json.
+"""
+
+PROMPT_HASH = hashlib.sha256(EXTRACTION_PROMPT.encode()).hexdigest()[:12]
 
 class ExtractionAgent:
-    def __init__(self, api_key):
-        if not api_key:
-            raise ValueError("API Key is required for Extraction Agent")
-        genai.configure(api_key=api_key)
-        # Using the stable 1.5-flash model
-        self.model = genai.GenerativeModel('gemini-2.5-flash')
-
-    def process_document(self, file_path):
-        filename = os.path.basename(file_path)
-        print(f"🕵️ [ExtractionAgent] Analyzing document: {filename}")
-        
-        mime_type, _ = mimetypes.guess_type(file_path)
-        if mime_type is None: mime_type = "application/pdf"
+    def __init__(self, api_key, model_client=None, local_extractor=None):
+        # Tier 2: the vision model (Gemini unless a stand-in is injected/configured)
+        self.model_client = model_client or create_model_client(api_key, MODEL_NAME)
+        # Tier 1: text-layer parsing for digitally generated PDFs
+        self.local_extractor = local_extractor or LocalTextExtractor()
+        self.min_local_confidence = float(os.getenv("LOCAL_EXTRACTION_MIN_CONFIDENCE", "0.8"))
+        # Cached results are only reused for the same model + prompt + local tier
+        self.version = f"{self.model_client.name}:{PROMPT_HASH}:{self.local_extractor.VERSION}:{self.min_local_confidence}"
+        # Identical documents (resubmissions, frontend retries) skip the upload + model call
+        self.cache = TieredCache(
+            "extraction",
+            ttl=float(os.getenv("EXTRACTION_CACHE_TTL", str(30 * 86400))),
+            max_memory_entries=int(os.getenv("EXTRACTION_CACHE_MEMORY_ENTRIES", "2000")),
+            max_disk_entries=int(os.getenv("EXTRACTION_CACHE_MAX_ENTRIES", "100000")),
+        )
+        self.counters = {"local": 0, "model": 0}
+
+    def process_document(self, document):
+        """
+        `document` is a Document (in-memory or on-disk upload) or a file path.
+        """
+        document = as_document(document)
+        logger.debug("analyzing document", extra={"document": document.filename, "bytes": document.size})
 
+        # Same bytes + same model/prompt => same answer. Concurrent requests for
+        # one document share a single in-flight model call. Uploads arrive
+        # already hashed, so this does not re-read them.
+        key = f"{self.version}:{document.content_hash()}"
+        return self.cache.get_or_fetch(
+            key,
+            lambda _: self._extract(document),
+            cacheable=lambda r: "error" not in r,
+        )
+
+    def stats(self):
+        return dict(self.counters, cache=self.cache.stats())
+
+    def _extract(self, document):
+        # Tier 1: local text layer. Only confident results skip the model.
+        fields, confidence = self.local_extractor.extract(document)
+        if fields and confidence >= self.min_local_confidence:
+            logger.debug("text layer parsed locally", extra={"confidence": confidence})
+            self.counters["local"] += 1
+            return dict(fields, extraction_method="local_text", extraction_confidence=confidence)
+
+        # Tier 2: scanned or low-confidence documents escalate to the model
+        self.counters["model"] += 1
+        return self._extract_with_model(document)
+
+    def _extract_with_model(self, document):
         try:
-            uploaded_file = genai.upload_file(file_path, mime_type=mime_type)
-            
-            prompt = """
-            You are an expert Data Entry Specialist. 
-            Extract the following fields from the provider application form into a strict JSON object:
-            - provider_name (String): Full legal name
-            - npi_number (String): 10-digit NPI
-            - phone_number (String): Office phone
-            - address (String): Practice address
-            
-            Rules:
-            1. Return ONLY valid JSON.
-            2. If a value is missing or illegible, set it to null.
-            3. Do not include markdown formatting like ```json.
-            """
-            
-            # Disable safety filters to ensure medical forms are processed
-            response = self.model.generate_content(
-                [prompt, uploaded_file],
-                safety_settings={
-                    HarmCategory.HARM_CATEGORY_HATE_SPEECH: HarmBlockThreshold.BLOCK_NONE,
-                    HarmCategory.HARM_CATEGORY_HARASSMENT: HarmBlockThreshold.BLOCK_NONE,
-                    HarmCategory.HARM_CATEGORY_SEXUALLY_EXPLICIT: HarmBlockThreshold.BLOCK_NONE,
-                    HarmCategory.HARM_CATEGORY_DANGEROUS_CONTENT: HarmBlockThreshold.BLOCK_NONE,
-                }
-            )
-            
+            raw_text = self.model_client.generate(document, EXTRACTION_PROMPT)
+
             # Clean and Parse
-            clean_json = response.text.replace("```json", "").replace("```", "").strip()
+            clean_json = raw_text.replace("```json", "").replace("```", "").strip()
             data = json.loads(clean_json)
-            print("✅ [ExtractionAgent] Data extracted successfully.")
+            data["extraction_method"] = "model"
+            logger.debug("model extraction succeeded")
             return data
 
         except Exception as e:
-            print(f"❌ [ExtractionAgent] Critical Error: {e}")
-            return {"error": str(e), "provider_name": "Error"}
\ No newline at end of file
+            logger.error("model extraction failed", extra={"error": str(e), "document": document.filename})
+            return {"error": str(e), "provider_name": "Error"}
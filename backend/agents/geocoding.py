@@ -0,0 +1,172 @@
+import os
+import re
+import csv
+import time
+import argparse
+import threading
+
+from .storage import connect, data_path, transaction
+
+# USPS-style abbreviations so "123 Main Street" and "123 MAIN ST." share a key
+ABBREVIATIONS = {
+    "STREET": "ST", "AVENUE": "AVE", "ROAD": "RD", "BOULEVARD": "BLVD", "DRIVE": "DR",
+    "LANE": "LN", "PLACE": "PL", "COURT": "CT", "HIGHWAY": "HWY", "PARKWAY": "PKWY",
+    "TERRACE": "TER", "CIRCLE": "CIR", "SQUARE": "SQ", "EXPRESSWAY": "EXPY",
+    "NORTH": "N", "SOUTH": "S", "EAST": "E", "WEST": "W",
+    "NORTHEAST": "NE", "NORTHWEST": "NW", "SOUTHEAST": "SE", "SOUTHWEST": "SW",
+}
+# Unit designators don't change where a building is, so they are dropped with their value
+# ("FL" is left alone, it is far more often Florida than "floor")
+UNIT_DESIGNATORS = {"STE", "SUITE", "APT", "APARTMENT", "UNIT", "FLOOR", "RM", "ROOM", "BLDG", "BUILDING"}
+COUNTRY_TOKENS = {"USA", "US", "UNITED STATES", "UNITED STATES OF AMERICA"}
+
+def normalize_address(address):
+    """
+    Canonical cache/index key for a free-text US address, e.g.
+    "123 Main Street, Suite 4, Springfield, IL 62701-1234, USA" -> "123 MAIN ST SPRINGFIELD IL 62701"
+    """
+    if not address:
+        return ""
+    text = str(address).upper()
+    for country in COUNTRY_TOKENS:
+        text = re.sub(rf"[,\s]+{country}\s*$", "", text)
+    text = re.sub(r"#\s*\w+", " ", text)
+    text = re.sub(r"\b(\d{5})-\d{4}\b", r"\1", text)
+    tokens = re.sub(r"[^\w\s]", " ", text).split()
+
+    out = []
+    skip_next = False
+    for token in tokens:
+        if skip_next:
+            skip_next = False
+            continue
+        if token in UNIT_DESIGNATORS:
+            skip_next = True
+            continue
+        out.append(ABBREVIATIONS.get(token, token))
+    return " ".join(out)
+
+def key_variants(key):
+    """
+    Lookup keys to try, most specific first (the full key, then without the ZIP).
+    """
+    variants = [key]
+    stripped = re.sub(r"\s\d{5}$", "", key)
+    if stripped != key:
+        variants.append(stripped)
+    return variants
+
+def parse_coordinates(coords):
+    """
+    "40.7128, -74.0060" (the enrichment report format) -> (40.7128, -74.006),
+    or None when missing or out of range.
+    """
+    try:
+        lat, lon = (float(part) for part in str(coords).split(","))
+    except (TypeError, ValueError):
+        return None
+    if not (-90 <= lat <= 90 and -180 <= lon <= 180):
+        return None
+    return lat, lon
+
+
+class OfflineGazetteer:
+    """
+    Local address -> coordinates index built from an open dataset
+    (OpenAddresses CSV, or any CSV with address/lat/lon columns).
+    Keys are normalize_address() output, so lookups are one primary-key probe.
+    """
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self.conn = connect(db_path)
+        self.lock = threading.Lock()
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS gazetteer (
+                key TEXT PRIMARY KEY,
+                lat REAL NOT NULL,
+                lon REAL NOT NULL,
+                display_name TEXT NOT NULL
+            ) WITHOUT ROWID
+        """)
+
+    def lookup(self, address):
+        for key in key_variants(normalize_address(address)):
+            row = self.conn.execute("SELECT lat, lon, display_name FROM gazetteer WHERE key = ?", (key,)).fetchone()
+            if row:
+                return dict(row)
+        return None
+
+    def build(self, csv_path, batch_size=50000):
+        count = 0
+        batch = []
+        with open(csv_path, "r", newline="", encoding="utf-8", errors="replace") as f:
+            for display_name, lat, lon in _iter_dataset(csv.DictReader(f)):
+                key = normalize_address(display_name)
+                # Index both "... IL 62701" and "... IL" so addresses without a ZIP still hit
+                for variant in key_variants(key):
+                    batch.append((variant, lat, lon, display_name))
+                if len(batch) >= batch_size:
+                    count += self._write(batch)
+                    batch = []
+        if batch:
+            count += self._write(batch)
+        return count
+
+    def stats(self):
+        entries = self.conn.execute("SELECT COUNT(*) FROM gazetteer").fetchone()[0]
+        return {"path": self.db_path, "entries": entries}
+
+    def _write(self, batch):
+        with self.lock, transaction(self.conn):
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO gazetteer (key, lat, lon, display_name) VALUES (?, ?, ?, ?)", batch
+            )
+        return len(batch)
+
+
+def _iter_dataset(reader):
+    fields = {name.upper(): name for name in reader.fieldnames}
+    for row in reader:
+        try:
+            if "ADDRESS" in fields:
+                display_name = row[fields["ADDRESS"]]
+                lat, lon = float(row[fields["LAT"]]), float(row[fields["LON"]])
+            else:
+                # OpenAddresses: LON,LAT,NUMBER,STREET,UNIT,CITY,DISTRICT,REGION,POSTCODE,...
+                get = lambda col: (row.get(fields.get(col, ""), "") or "").strip()
+                street = f"{get('NUMBER')} {get('STREET')}".strip()
+                region = f"{get('REGION')} {get('POSTCODE')}".strip()
+                display_name = ", ".join(part for part in (street, get("CITY"), region) if part)
+                lat, lon = float(get("LAT")), float(get("LON"))
+        except (KeyError, ValueError):
+            continue
+        if display_name:
+            yield display_name, lat, lon
+
+
+def open_gazetteer():
+    """
+    Returns the offline gazetteer if one has been built, else None.
+    """
+    db_path = os.getenv("GAZETTEER_DB_PATH") or data_path("gazetteer.sqlite")
+    if not os.path.exists(db_path):
+        return None
+    return OfflineGazetteer(db_path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the offline gazetteer used by the enrichment agent.")
+    parser.add_argument("files", nargs="+", help="OpenAddresses CSV files (or CSVs with address,lat,lon columns)")
+    parser.add_argument("--db", default=os.getenv("GAZETTEER_DB_PATH") or data_path("gazetteer.sqlite"))
+    args = parser.parse_args()
+
+    gazetteer = OfflineGazetteer(args.db)
+    for path in args.files:
+        started = time.perf_counter()
+        rows = gazetteer.build(path)
+        print(f"🗺️ Indexed {rows:,} address keys from {os.path.basename(path)} in {time.perf_counter() - started:.1f}s")
+    print(gazetteer.stats())
+
+
+if __name__ == "__main__":
+    main()
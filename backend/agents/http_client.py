@@ -0,0 +1,184 @@
+import os
+import json
+import time
+import random
+import threading
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from .telemetry import UPSTREAM_ERRORS, UPSTREAM_LATENCY, UPSTREAM_THROTTLE, get_logger, span, upstream_name
+
+logger = get_logger("http")
+
+# Upstream etiquette. Nominatim's usage policy is an absolute max of 1 request/second.
+# Override or extend with HTTP_HOST_POLICIES='{"host": {"rate": 5, "burst": 5, "max_concurrency": 2}}'
+DEFAULT_HOST_POLICIES = {
+    "nominatim.openstreetmap.org": {"rate": 1.0, "burst": 1, "max_concurrency": 1},
+    "npiregistry.cms.hhs.gov": {"rate": 20.0, "burst": 20, "max_concurrency": 10},
+}
+# Hosts without a policy are not rate limited, only capped on concurrency
+FALLBACK_POLICY = {"rate": None, "burst": 1, "max_concurrency": 20}
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+class TokenBucket:
+    """
+    Thread-safe token bucket. acquire() blocks until a token is free and
+    returns how long the caller had to wait.
+    """
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.capacity = max(1, burst)
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        waited = 0.0
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return waited
+                delay = (1 - self.tokens) / self.rate
+            time.sleep(delay)
+            waited += delay
+
+
+class _Host:
+    """
+    Per-host limits and counters.
+    """
+    def __init__(self, name, policy):
+        self.name = name
+        self.policy = policy
+        self.bucket = TokenBucket(policy["rate"], policy.get("burst", 1)) if policy.get("rate") else None
+        self.slots = threading.BoundedSemaphore(policy.get("max_concurrency", FALLBACK_POLICY["max_concurrency"]))
+        self.stats = {
+            "requests": 0, "retries": 0, "errors": 0, "timeouts": 0, "in_flight": 0,
+            "throttle_wait_seconds": 0.0, "concurrency_wait_seconds": 0.0,
+        }
+
+
+class HttpClient:
+    """
+    One pooled requests.Session shared by every agent:
+    - keep-alive connection pool (HTTP_POOL_SIZE connections per host)
+    - per-host concurrency cap and token-bucket rate limit
+    - retries with jittered exponential backoff on 429/5xx and connection errors
+      (Retry-After is honoured when the server sends it)
+    - a default timeout on every request
+    """
+    def __init__(self, pool_size=None, max_retries=None, backoff=None, max_backoff=None, timeout=None, host_policies=None):
+        self.pool_size = pool_size or int(os.getenv("HTTP_POOL_SIZE", "20"))
+        self.max_retries = int(os.getenv("HTTP_MAX_RETRIES", "3")) if max_retries is None else max_retries
+        self.backoff = backoff if backoff is not None else float(os.getenv("HTTP_BACKOFF", "0.5"))
+        self.max_backoff = max_backoff if max_backoff is not None else float(os.getenv("HTTP_MAX_BACKOFF", "8"))
+        self.timeout = timeout or float(os.getenv("HTTP_TIMEOUT", "5"))
+
+        self.host_policies = dict(DEFAULT_HOST_POLICIES)
+        self.host_policies.update(json.loads(os.getenv("HTTP_HOST_POLICIES", "{}")))
+        self.host_policies.update(host_policies or {})
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=10, pool_maxsize=self.pool_size, max_retries=0)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+        self.hosts = {}
+        self.lock = threading.Lock()
+
+    def get(self, url, params=None, headers=None, timeout=None):
+        return self.request("GET", url, params=params, headers=headers, timeout=timeout)
+
+    def request(self, method, url, timeout=None, **kwargs):
+        host = self._host(urlsplit(url).hostname or "")
+        attempt = 0
+        while True:
+            if host.bucket:
+                waited = host.bucket.acquire()
+                self._add(host, "throttle_wait_seconds", waited)
+                UPSTREAM_THROTTLE.labels(host.name).inc(waited)
+
+            started = time.monotonic()
+            with host.slots:
+                self._add(host, "concurrency_wait_seconds", time.monotonic() - started)
+                self._add(host, "in_flight", 1)
+                self._add(host, "requests", 1)
+                call_started = time.perf_counter()
+                try:
+                    with span(f"upstream.{host.name}", upstream=host.name, attempt=attempt):
+                        response = self.session.request(method, url, timeout=timeout or self.timeout, **kwargs)
+                except (requests.ConnectionError, requests.Timeout) as e:
+                    kind = "timeout" if isinstance(e, requests.Timeout) else "connection"
+                    self._add(host, "timeouts" if kind == "timeout" else "errors", 1)
+                    UPSTREAM_ERRORS.labels(host.name, kind).inc()
+                    logger.warning("upstream request failed", extra={"upstream": host.name, "kind": kind, "attempt": attempt})
+                    if attempt >= self.max_retries:
+                        raise
+                    response = None
+                finally:
+                    self._add(host, "in_flight", -1)
+                    UPSTREAM_LATENCY.labels(host.name).observe(time.perf_counter() - call_started)
+
+            if response is not None and (response.status_code not in RETRY_STATUSES or attempt >= self.max_retries):
+                return response
+
+            if response is not None:
+                self._add(host, "errors", 1)
+                UPSTREAM_ERRORS.labels(host.name, f"http_{response.status_code}").inc()
+                response.close()  # hand the connection back to the pool
+            self._add(host, "retries", 1)
+            time.sleep(self._retry_delay(attempt, response))
+            attempt += 1
+
+    def metrics(self):
+        with self.lock:
+            hosts = {name: dict(h.stats, policy=h.policy) for name, h in self.hosts.items()}
+        in_flight = sum(h["in_flight"] for h in hosts.values())
+        return {
+            "pool_size_per_host": self.pool_size,
+            "in_flight": in_flight,
+            "pool_utilisation": {name: round(h["in_flight"] / self.pool_size, 3) for name, h in hosts.items()},
+            "hosts": hosts,
+        }
+
+    def _retry_delay(self, attempt, response):
+        retry_after = response.headers.get("Retry-After") if response is not None else None
+        if retry_after:
+            try:
+                return min(self.max_backoff, float(retry_after))
+            except ValueError:
+                pass
+        # Full jitter keeps many workers from retrying in lock-step
+        return random.uniform(0, min(self.max_backoff, self.backoff * (2 ** attempt)))
+
+    def _host(self, hostname):
+        with self.lock:
+            host = self.hosts.get(hostname)
+            if host is None:
+                host = self.hosts[hostname] = _Host(upstream_name(hostname), self.host_policies.get(hostname, FALLBACK_POLICY))
+            return host
+
+    def _add(self, host, name, value):
+        with self.lock:
+            host.stats[name] += value
+
+
+_client = None
+_client_lock = threading.Lock()
+
+def get_http_client():
+    """
+    Process-wide shared client (so the connection pool is shared too).
+    """
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = HttpClient()
+        return _client
@@ -0,0 +1,201 @@
+import os
+import csv
+import json
+import time
+import argparse
+import threading
+
+from .storage import connect, transaction
+
+# Places we look for the bundled state board export (cwd first, like before)
+_BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_JSON_CANDIDATES = [
+    "mock_db.json",
+    "mock-db.json",
+    "../mock_db.json",
+    "../mock-db.json",
+    os.path.join(_BACKEND_DIR, "mock-db.json"),
+]
+
+class JsonLicenseStore:
+    """
+    State license export held in memory as a dict keyed by NPI.
+    - `.json` files (one object keyed by NPI) are re-parsed when their mtime changes.
+    - `.jsonl` files (one {"npi": ...} record per line) are treated as append-only:
+      when the file grows only the new lines are read.
+    The mtime is checked at most once every `check_interval` seconds.
+    """
+    def __init__(self, path, check_interval=1.0):
+        self.path = path
+        self.check_interval = check_interval
+        self.records = {}
+        self.lock = threading.Lock()
+        self.mtime = None
+        self.offset = 0
+        self.inode = None
+        self.last_check = 0.0
+        self.counters = {"full_loads": 0, "incremental_loads": 0, "last_load_seconds": 0.0}
+
+    def lookup(self, npi):
+        self._maybe_reload()
+        return self.records.get(str(npi))
+
+    def lookup_many(self, npis):
+        self._maybe_reload()
+        records = self.records
+        return {str(n): records[str(n)] for n in npis if str(n) in records}
+
+    def stats(self):
+        return dict(self.counters, backend="json", path=self.path, records=len(self.records))
+
+    def _maybe_reload(self):
+        now = time.monotonic()
+        if self.mtime is not None and now - self.last_check < self.check_interval:
+            return
+        with self.lock:
+            if self.mtime is not None and now - self.last_check < self.check_interval:
+                return
+            self.last_check = now
+            st = os.stat(self.path)
+            if st.st_mtime == self.mtime and st.st_size == self.offset:
+                return
+
+            started = time.perf_counter()
+            if self.path.endswith(".jsonl") and st.st_ino == self.inode and st.st_size >= self.offset:
+                self._load_jsonl(self.offset, self.records)
+                self.counters["incremental_loads"] += 1
+            else:
+                records = {}
+                if self.path.endswith(".jsonl"):
+                    self._load_jsonl(0, records)
+                else:
+                    with open(self.path, "r") as f:
+                        records = {str(k): v for k, v in json.load(f).items()}
+                    self.offset = st.st_size
+                # Swap in one go so readers never see a half-built index
+                self.records = records
+                self.counters["full_loads"] += 1
+            self.counters["last_load_seconds"] = round(time.perf_counter() - started, 4)
+            self.mtime = st.st_mtime
+            self.inode = st.st_ino
+
+    def _load_jsonl(self, offset, records):
+        with open(self.path, "rb") as f:
+            f.seek(offset)
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break  # partially written line, pick it up next time
+                offset += len(line)
+                if line.strip():
+                    record = json.loads(line)
+                    records[str(record.pop("npi"))] = record
+        self.offset = offset
+
+
+class SqliteLicenseStore:
+    """
+    On-disk license index for exports too large to keep in memory.
+    NPI is the primary key of a WITHOUT ROWID table, so lookups are O(log n)
+    B-tree probes and only touched pages are read.
+    """
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self.conn = connect(db_path)
+        self.lock = threading.Lock()
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS licenses (
+                npi TEXT PRIMARY KEY,
+                record TEXT NOT NULL
+            ) WITHOUT ROWID
+        """)
+
+    def lookup(self, npi):
+        row = self.conn.execute("SELECT record FROM licenses WHERE npi = ?", (str(npi),)).fetchone()
+        return json.loads(row["record"]) if row else None
+
+    def lookup_many(self, npis, chunk_size=500):
+        npis = list(dict.fromkeys(str(n) for n in npis))
+        found = {}
+        for i in range(0, len(npis), chunk_size):
+            chunk = npis[i:i + chunk_size]
+            placeholders = ",".join("?" * len(chunk))
+            for row in self.conn.execute(f"SELECT npi, record FROM licenses WHERE npi IN ({placeholders})", chunk):
+                found[row["npi"]] = json.loads(row["record"])
+        return found
+
+    def import_file(self, source_path, batch_size=50000):
+        """
+        Upserts records from a .json, .jsonl or .csv export (CSV needs an `npi` column).
+        JSONL/CSV are streamed in batches so memory stays flat for any file size.
+        """
+        count = 0
+        batch = []
+        for npi, record in iter_license_records(source_path):
+            batch.append((npi, json.dumps(record)))
+            if len(batch) >= batch_size:
+                count += self._write(batch)
+                batch = []
+        if batch:
+            count += self._write(batch)
+        return count
+
+    def stats(self):
+        records = self.conn.execute("SELECT COUNT(*) FROM licenses").fetchone()[0]
+        return {"backend": "sqlite", "path": self.db_path, "records": records}
+
+    def _write(self, batch):
+        with self.lock, transaction(self.conn):
+            self.conn.executemany("INSERT OR REPLACE INTO licenses (npi, record) VALUES (?, ?)", batch)
+        return len(batch)
+
+
+def iter_license_records(source_path):
+    """
+    Yields (npi, record) pairs from a supported export file.
+    """
+    if source_path.endswith(".jsonl"):
+        with open(source_path, "r") as f:
+            for line in f:
+                if line.strip():
+                    record = json.loads(line)
+                    yield str(record.pop("npi")), record
+    elif source_path.endswith(".csv"):
+        with open(source_path, "r", newline="") as f:
+            for row in csv.DictReader(f):
+                yield str(row.pop("npi")), row
+    else:
+        # A single JSON object has to be parsed whole
+        with open(source_path, "r") as f:
+            for npi, record in json.load(f).items():
+                yield str(npi), record
+
+
+def open_license_store():
+    """
+    LICENSE_DB_PATH selects the SQLite backend, LICENSE_JSON_PATH a specific
+    JSON/JSONL file; otherwise the bundled mock-db.json is used.
+    """
+    db_path = os.getenv("LICENSE_DB_PATH")
+    if db_path:
+        return SqliteLicenseStore(db_path)
+
+    json_path = os.getenv("LICENSE_JSON_PATH")
+    if not json_path:
+        json_path = next((p for p in DEFAULT_JSON_CANDIDATES if os.path.exists(p)), "mock-db.json")
+    return JsonLicenseStore(json_path, check_interval=float(os.getenv("LICENSE_RELOAD_INTERVAL", "1.0")))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the SQLite state license index from an export file.")
+    parser.add_argument("source", help="State board export (.json, .jsonl or .csv)")
+    parser.add_argument("--db", required=True, help="SQLite index to create or update")
+    parser.add_argument("--batch-size", type=int, default=50000)
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    count = SqliteLicenseStore(args.db).import_file(args.source, batch_size=args.batch_size)
+    print(f"📜 Imported {count} license records into {args.db} in {time.perf_counter() - started:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
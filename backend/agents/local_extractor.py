@@ -0,0 +1,162 @@
+import re
+import functools
+
+from .data_validation_agent import npi_checksum_ok
+
+@functools.cache
+def load_pypdf():
+    """
+    pypdf, imported on first use (it is a noticeable part of start-up time).
+    Returns None when it is not installed: the fast path is simply skipped.
+    """
+    try:
+        import pypdf
+    except ImportError:
+        return None
+    return pypdf
+
+# Field-anchored patterns for digitally generated application forms ("Label: value")
+# Labels are anchored at the start of a line, so "Practice Name:", "Contact Name:"
+# and the like never match; a role-labelled name wins over a bare "Name:"
+PROVIDER_NAME_PATTERN = re.compile(
+    r"^[ \t]*(?:provider|practitioner|applicant|physician)(?:'s)?\s+(?:full\s+)?(?:legal\s+)?name\s*[:\-]\s*(?P<value>[^\n]+)",
+    re.IGNORECASE | re.MULTILINE,
+)
+NAME_PATTERN = re.compile(
+    r"^[ \t]*(?:full\s+)?(?:legal\s+)?name\s*[:\-]\s*(?P<value>[^\n]+)",
+    re.IGNORECASE | re.MULTILINE,
+)
+# NPI, phone and address labels are anchored too, with up to three qualifier words
+# in front ("Practice Address:", "Individual NPI Number:"). Qualifiers naming some
+# other party or channel ("Group NPI:", "Contact Phone:", "Email Address:") never
+# count, and practice/office/individual labels win over unqualified ones.
+LABEL_QUALIFIER = r"^[ \t]*(?P<qualifier>(?:[\w'\-]+[ \t]+){0,3}?)"
+NPI_PATTERN = re.compile(
+    LABEL_QUALIFIER + r"NPI(?:[ \t]*(?:number|no\.?|#))?[ \t]*[:\-]?[ \t]*(?P<value>\d{10})\b",
+    re.IGNORECASE | re.MULTILINE,
+)
+BARE_NPI_PATTERN = re.compile(r"\b(?P<value>\d{10})\b")
+PHONE_PATTERN = re.compile(
+    LABEL_QUALIFIER + r"(?:phone|telephone|tel)\b(?:[ \t]*(?:number|no\.?|#))?[ \t]*[:\-]?[ \t]*"
+    r"(?P<value>\(?\d{3}\)?[\s.\-]?\d{3}[\s.\-]?\d{4})",
+    re.IGNORECASE | re.MULTILINE,
+)
+ADDRESS_PATTERN = re.compile(
+    LABEL_QUALIFIER + r"address[ \t]*[:\-][ \t]*(?P<value>[^\n]+)",
+    re.IGNORECASE | re.MULTILINE,
+)
+PREFERRED_QUALIFIERS = {"practice", "office", "individual", "provider", "practitioner"}
+REJECTED_QUALIFIERS = {"email", "e-mail", "mailing", "billing", "group", "contact", "organization", "organisation"}
+# Any "Label:" line; an address only continues onto a following line without one
+LABEL_LINE = re.compile(r"^[ \t]*[A-Za-z][\w .'/#\-]{0,40}:")
+STATE_ZIP = re.compile(r"\b[A-Z]{2}\s+\d{5}(?:-\d{4})?\b")
+
+# How much each field contributes to the confidence score
+FIELD_WEIGHTS = {"npi_number": 0.4, "provider_name": 0.2, "phone_number": 0.2, "address": 0.2}
+
+class LocalTextExtractor:
+    """
+    Tier 1 of extraction: reads the PDF text layer and pulls the four fields
+    with anchored patterns. Returns (fields, confidence); scanned documents
+    (no text layer) come back with confidence 0 so they go to the model.
+    """
+    VERSION = "local-v3"
+
+    def __init__(self, max_pages=5):
+        self.max_pages = max_pages
+
+    def extract(self, document):
+        if load_pypdf() is None or document.mime_type != "application/pdf":
+            return None, 0.0
+        text = self.extract_text(document)
+        if not text.strip():
+            return None, 0.0
+        return self.extract_fields(text)
+
+    def extract_text(self, document):
+        try:
+            with document.open() as stream:
+                reader = load_pypdf().PdfReader(stream)
+                return "\n".join((page.extract_text() or "") for page in reader.pages[:self.max_pages])
+        except Exception:
+            return ""
+
+    def extract_fields(self, text):
+        fields = {
+            "provider_name": self._match(PROVIDER_NAME_PATTERN, text) or self._match(NAME_PATTERN, text),
+            "npi_number": self._labelled(NPI_PATTERN, text),
+            "phone_number": self._labelled(PHONE_PATTERN, text),
+            "address": self._address(text),
+        }
+
+        # No labelled NPI: accept a lone 10-digit number only if it passes the checksum
+        # (and is not the group's or someone else's labelled NPI)
+        if not fields["npi_number"]:
+            rejected = {m.group("value") for m in NPI_PATTERN.finditer(text) if _qualifier_rank(m) is None}
+            candidates = {
+                m.group("value") for m in BARE_NPI_PATTERN.finditer(text)
+                if npi_checksum_ok(m.group("value")) and m.group("value") not in rejected
+            }
+            if len(candidates) == 1:
+                fields["npi_number"] = candidates.pop()
+
+        confidence = 0.0
+        for field, weight in FIELD_WEIGHTS.items():
+            if fields[field]:
+                # A checksum-failing NPI is more likely a misread than a real value
+                if field == "npi_number" and not npi_checksum_ok(fields[field]):
+                    weight /= 2
+                confidence += weight
+        return fields, round(confidence, 2)
+
+    def _match(self, pattern, text):
+        match = pattern.search(text)
+        if not match:
+            return None
+        value = match.group("value").strip(" \t,;")
+        return value or None
+
+    def _best_label(self, pattern, text, valid=None):
+        """
+        The match with the most specific acceptable label (earliest on ties).
+        """
+        best, best_rank = None, None
+        for match in pattern.finditer(text):
+            rank = _qualifier_rank(match)
+            if rank is None or (valid and not valid(match.group("value"))):
+                continue
+            if best_rank is None or rank < best_rank:
+                best, best_rank = match, rank
+        return best
+
+    def _labelled(self, pattern, text):
+        match = self._best_label(pattern, text)
+        if not match:
+            return None
+        return match.group("value").strip(" \t,;") or None
+
+    def _address(self, text):
+        match = self._best_label(ADDRESS_PATTERN, text, valid=lambda value: "@" not in value)
+        if not match:
+            return None
+        parts = [match.group("value").strip(" \t,;")]
+        # "City, ST 12345" on the next line, unless that line is a field of its own
+        following = text[match.end():].split("\n", 2)
+        if len(following) > 1 and not STATE_ZIP.search(parts[0]):
+            next_line = following[1]
+            if STATE_ZIP.search(next_line) and not LABEL_LINE.match(next_line):
+                parts.append(next_line.strip(" \t,;"))
+        return ", ".join(p for p in parts if p) or None
+
+
+def _qualifier_rank(match):
+    """
+    0 for practice/office/individual labels, 1 for unqualified or other
+    labels, None for labels that belong to someone or something else.
+    """
+    words = set(match.group("qualifier").lower().split())
+    if words & REJECTED_QUALIFIERS:
+        return None
+    if words & PREFERRED_QUALIFIERS:
+        return 0
+    return 1
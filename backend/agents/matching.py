@@ -0,0 +1,271 @@
+import os
+import re
+import json
+import hashlib
+import time
+import argparse
+import threading
+
+from .geocoding import normalize_address
+from .storage import connect, data_path, transaction
+
+# Titles and credentials that say nothing about who the provider is
+NAME_NOISE = {
+    "dr", "doctor", "mr", "mrs", "ms", "miss", "md", "do", "phd", "np", "pa", "rn", "lpn", "dds", "dmd",
+    "dpm", "od", "pharmd", "lcsw", "mba", "mph", "facp", "facs", "jr", "sr", "ii", "iii", "iv",
+}
+
+# How much each signal contributes to the duplicate score
+MATCH_WEIGHTS = {"name": 0.45, "npi": 0.25, "phone": 0.15, "address": 0.15}
+
+def normalize_name(name):
+    """
+    "Dr. Jessica  Bonet, MS" -> "bonet jessica": lowercase, no titles or
+    initials, tokens sorted so word order does not matter.
+    """
+    if not name:
+        return ""
+    tokens = re.sub(r"[^a-z0-9\s]", " ", str(name).lower()).split()
+    return " ".join(sorted(t for t in tokens if len(t) > 1 and t not in NAME_NOISE))
+
+def name_trigrams(normalized):
+    return {normalized[i:i + 3] for i in range(len(normalized) - 2)} if normalized else set()
+
+def name_similarity(a, b):
+    """
+    Dice coefficient over character trigrams of the normalised names (0..1).
+    Tolerates typos, credentials, titles and word order.
+    """
+    grams_a = name_trigrams(f"  {normalize_name(a)} ")
+    grams_b = name_trigrams(f"  {normalize_name(b)} ")
+    if not grams_a or not grams_b:
+        return 0.0
+    return round(2 * len(grams_a & grams_b) / (len(grams_a) + len(grams_b)), 3)
+
+def phone_digits(phone):
+    digits = re.sub(r"\D", "", str(phone or ""))
+    return digits[-10:] if len(digits) >= 10 else ""
+
+def npi_variants(npi):
+    """
+    Deletion neighbourhood: two NPIs one substitution or adjacent swap apart
+    share at least one of these keys.
+    """
+    return {npi[:i] + npi[i + 1:] for i in range(len(npi))}
+
+def npi_relation(a, b):
+    if not a or not b:
+        return None
+    if a == b:
+        return "same_npi"
+    if len(a) == len(b) and (
+        sum(x != y for x, y in zip(a, b)) == 1
+        or any(a[:i] + a[i + 1] + a[i] + a[i + 2:] == b for i in range(len(a) - 1))
+    ):
+        return "npi_typo"
+    return None
+
+
+class ProviderMatcher:
+    """
+    Incremental blocking index over the providers in our directory (one entry
+    per NPI, updated as reports arrive). A new document is only compared with
+    providers sharing a blocking key (name trigrams, phone, address tokens,
+    NPI typo neighbourhood); keys shared by more than `max_block` providers
+    are skipped, so the work per lookup stays bounded as the directory grows.
+    """
+    def __init__(self, db_path=None, max_block=None, max_candidates=None, threshold=None):
+        self.db_path = db_path or os.getenv("MATCH_DB_PATH") or data_path("matching.sqlite")
+        self.max_block = max_block or int(os.getenv("MATCH_MAX_BLOCK", "1000"))
+        self.max_candidates = max_candidates or int(os.getenv("MATCH_MAX_CANDIDATES", "200"))
+        self.threshold = threshold if threshold is not None else float(os.getenv("MATCH_THRESHOLD", "0.6"))
+        self.conn = connect(self.db_path)
+        self.lock = threading.Lock()
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS providers (
+                id INTEGER PRIMARY KEY,
+                npi TEXT UNIQUE,
+                entry_key TEXT,
+                provider_name TEXT,
+                phone TEXT,
+                address TEXT,
+                report_id INTEGER,
+                updated_at REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS blocks (
+                key TEXT NOT NULL,
+                provider_id INTEGER NOT NULL,
+                PRIMARY KEY (key, provider_id)
+            ) WITHOUT ROWID;
+            CREATE INDEX IF NOT EXISTS idx_blocks_provider ON blocks(provider_id);
+            CREATE TABLE IF NOT EXISTS block_sizes (
+                key TEXT PRIMARY KEY,
+                size INTEGER NOT NULL
+            ) WITHOUT ROWID;
+        """)
+        # Columns added after the first release of this table
+        columns = {row["name"] for row in self.conn.execute("PRAGMA table_info(providers)")}
+        if "entry_key" not in columns:
+            self.conn.execute("ALTER TABLE providers ADD COLUMN entry_key TEXT")
+            self.conn.execute("UPDATE providers SET entry_key = 'npi:' || npi WHERE npi IS NOT NULL")
+        self.conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_providers_entry ON providers(entry_key)")
+
+    def find_duplicates(self, provider_name=None, npi=None, phone=None, address=None, limit=5, exclude_npi=None):
+        """
+        Likely duplicates of a provider already in the directory, best first.
+        `exclude_npi` skips the provider's own entry (a resubmission is an update).
+        """
+        keys = _block_keys(provider_name, npi, phone, address)
+        if not keys:
+            return []
+        marks = ",".join("?" * len(keys))
+        usable = [row[0] for row in self.conn.execute(
+            f"SELECT key FROM block_sizes WHERE key IN ({marks}) AND size <= ?", [*keys, self.max_block]
+        )]
+        if not usable:
+            return []
+        marks = ",".join("?" * len(usable))
+        candidates = self.conn.execute(
+            f"SELECT p.id, p.npi, p.provider_name, p.phone, p.address, p.report_id FROM providers p"
+            f" JOIN (SELECT provider_id, COUNT(*) AS shared FROM blocks WHERE key IN ({marks})"
+            f" GROUP BY provider_id ORDER BY shared DESC LIMIT ?) c ON c.provider_id = p.id",
+            [*usable, self.max_candidates],
+        ).fetchall()
+
+        phone = phone_digits(phone)
+        address_tokens = set(normalize_address(address).split())
+        matches = []
+        for row in candidates:
+            if exclude_npi and row["npi"] == str(exclude_npi):
+                continue
+            similarity = name_similarity(provider_name, row["provider_name"])
+            relation = npi_relation(str(npi or ""), row["npi"] or "")
+            same_phone = bool(phone) and phone == row["phone"]
+            other_tokens = set((row["address"] or "").split())
+            address_overlap = (
+                len(address_tokens & other_tokens) / len(address_tokens | other_tokens)
+                if address_tokens and other_tokens else 0.0
+            )
+            score = (
+                MATCH_WEIGHTS["name"] * similarity
+                + MATCH_WEIGHTS["npi"] * {"same_npi": 1.0, "npi_typo": 0.8}.get(relation, 0.0)
+                + MATCH_WEIGHTS["phone"] * same_phone
+                + MATCH_WEIGHTS["address"] * address_overlap
+            )
+            if score < self.threshold:
+                continue
+            reasons = [relation] if relation else []
+            if similarity >= 0.8:
+                reasons.append("similar_name")
+            if same_phone:
+                reasons.append("same_phone")
+            if address_overlap >= 0.8:
+                reasons.append("same_address")
+            matches.append({
+                "npi": row["npi"],
+                "provider_name": row["provider_name"],
+                "report_id": row["report_id"],
+                "score": round(score, 3),
+                "name_similarity": similarity,
+                "reasons": reasons,
+            })
+        matches.sort(key=lambda m: m["score"], reverse=True)
+        return matches[:limit]
+
+    def add(self, provider_name=None, npi=None, phone=None, address=None, report_id=None):
+        """
+        Adds or updates one directory entry and its blocking keys. Entries are
+        keyed by NPI, or without one by the normalised name, phone and
+        address, so re-adding the same application updates it in place.
+        Returns None when there is nothing to key the entry on.
+        """
+        npi = str(npi) if npi else None
+        record = (provider_name, phone_digits(phone), normalize_address(address))
+        entry_key = _entry_key(npi, provider_name, *record[1:])
+        if entry_key is None:
+            return None
+        keys = _block_keys(provider_name, npi, phone, address)
+        with self.lock, transaction(self.conn):
+            existing = self.conn.execute("SELECT id FROM providers WHERE entry_key = ?", (entry_key,)).fetchone()
+            if existing:
+                provider_id = existing["id"]
+                old_keys = [row[0] for row in self.conn.execute("SELECT key FROM blocks WHERE provider_id = ?", (provider_id,))]
+                self.conn.execute("DELETE FROM blocks WHERE provider_id = ?", (provider_id,))
+                self.conn.executemany("UPDATE block_sizes SET size = size - 1 WHERE key = ?", [(k,) for k in old_keys])
+                self.conn.execute(
+                    "UPDATE providers SET provider_name = ?, phone = ?, address = ?, report_id = ?, updated_at = ? WHERE id = ?",
+                    (*record, report_id, time.time(), provider_id),
+                )
+            else:
+                provider_id = self.conn.execute(
+                    "INSERT INTO providers (npi, entry_key, provider_name, phone, address, report_id, updated_at)"
+                    " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (npi, entry_key, *record, report_id, time.time()),
+                ).lastrowid
+            self.conn.executemany("INSERT OR IGNORE INTO blocks (key, provider_id) VALUES (?, ?)", [(k, provider_id) for k in keys])
+            self.conn.executemany(
+                "INSERT INTO block_sizes (key, size) VALUES (?, 1) ON CONFLICT(key) DO UPDATE SET size = size + 1",
+                [(k,) for k in keys],
+            )
+        return provider_id
+
+    def stats(self):
+        providers = self.conn.execute("SELECT COUNT(*) FROM providers").fetchone()[0]
+        oversized = self.conn.execute("SELECT COUNT(*) FROM block_sizes WHERE size > ?", (self.max_block,)).fetchone()[0]
+        return {"providers": providers, "oversized_blocks": oversized, "max_block": self.max_block, "threshold": self.threshold}
+
+
+def _entry_key(npi, provider_name, phone, address):
+    if npi:
+        return f"npi:{npi}"
+    identity = [normalize_name(provider_name), phone, address]
+    if not any(identity):
+        return None
+    return "doc:" + hashlib.sha256(json.dumps(identity).encode()).hexdigest()[:32]
+
+
+def _block_keys(provider_name, npi, phone, address):
+    keys = {f"ng:{gram}" for gram in name_trigrams(normalize_name(provider_name))}
+    npi = str(npi or "")
+    if len(npi) == 10 and npi.isdigit():
+        keys.add(f"npi:{npi}")
+        keys.update(f"nd:{variant}" for variant in npi_variants(npi))
+    digits = phone_digits(phone)
+    if digits:
+        keys.add(f"ph:{digits}")
+    tokens = normalize_address(address).split()
+    if len(tokens) >= 2 and tokens[0].isdigit():
+        keys.add(f"ad:{tokens[0]}:{tokens[1]}")  # house number + street name
+    zips = [t for t in tokens if len(t) == 5 and t.isdigit()]
+    if tokens and tokens[0].isdigit() and zips:
+        keys.add(f"az:{tokens[0]}:{zips[-1]}")  # house number + ZIP
+    return sorted(keys)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rebuild the duplicate-matching index from the stored reports.")
+    parser.add_argument("--reports-db", help="Report store (default: REPORT_DB_PATH or DATA_DIR/reports.sqlite)")
+    parser.add_argument("--db", help="Matching index (default: MATCH_DB_PATH or DATA_DIR/matching.sqlite)")
+    args = parser.parse_args()
+
+    from .data_validation_agent import registry_verified
+    from .report_store import ReportStore
+
+    reports = ReportStore(args.reports_db)
+    matcher = ProviderMatcher(args.db)
+    started = time.perf_counter()
+    count = 0
+    for row in reports.conn.execute("SELECT id, report FROM reports ORDER BY id"):
+        report = json.loads(row["report"])
+        # Same rule as DirectoryManagementAgent.record: registry-verified providers only
+        if not registry_verified(report.get("official")):
+            continue
+        extracted = report.get("extracted") or {}
+        matcher.add(extracted.get("provider_name"), extracted.get("npi_number"),
+                    extracted.get("phone_number"), extracted.get("address"), report_id=row["id"])
+        count += 1
+    print(f"🔗 Indexed {count} reports ({matcher.stats()['providers']} providers) in {time.perf_counter() - started:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
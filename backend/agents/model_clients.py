@@ -0,0 +1,109 @@
+import os
+import abc
+import json
+import time
+from .http_client import get_http_client
+from .telemetry import upstream_call
+
+class ModelClient(abc.ABC):
+    """
+    What ExtractionAgent needs from a vision model: take a Document and a
+    prompt, return the model's raw text answer (expected to be JSON).
+    """
+    name = "base"
+
+    @abc.abstractmethod
+    def generate(self, document, prompt):
+        """
+        The model's raw text answer for one document.
+        """
+
+
+class GeminiModelClient(ModelClient):
+    def __init__(self, api_key, model_name="gemini-2.5-flash"):
+        if not api_key:
+            raise ValueError("API Key is required for Extraction Agent")
+        # The SDK takes ~0.3s to import, so only processes that use Gemini pay for it
+        import google.generativeai as genai
+        from google.generativeai.types import HarmBlockThreshold, HarmCategory
+
+        genai.configure(api_key=api_key)
+        self.genai = genai
+        self.name = model_name
+        self.model = genai.GenerativeModel(model_name)
+        # Disable safety filters to ensure medical forms are processed
+        self.safety_settings = {
+            HarmCategory.HARM_CATEGORY_HATE_SPEECH: HarmBlockThreshold.BLOCK_NONE,
+            HarmCategory.HARM_CATEGORY_HARASSMENT: HarmBlockThreshold.BLOCK_NONE,
+            HarmCategory.HARM_CATEGORY_SEXUALLY_EXPLICIT: HarmBlockThreshold.BLOCK_NONE,
+            HarmCategory.HARM_CATEGORY_DANGEROUS_CONTENT: HarmBlockThreshold.BLOCK_NONE,
+        }
+
+    def generate(self, document, prompt):
+        # Streams straight from the in-memory buffer or spilled file
+        with upstream_call("gemini_upload"), document.open() as stream:
+            uploaded_file = self.genai.upload_file(stream, mime_type=document.mime_type, display_name=document.filename)
+
+        with upstream_call("gemini"):
+            response = self.model.generate_content([prompt, uploaded_file], safety_settings=self.safety_settings)
+            return response.text
+
+
+class LocalStandInModelClient(ModelClient):
+    """
+    Offline stand-in for benchmarks and load tests: sleeps for a configurable
+    latency and answers with a fixed provider record, so throughput can be
+    measured without API keys or network.
+    """
+    name = "local-stand-in"
+
+    def __init__(self, latency=None, response=None):
+        self.latency = float(os.getenv("STANDIN_MODEL_LATENCY", "1.5")) if latency is None else latency
+        self.response = response or {
+            "provider_name": "JESSICA BONET MS",
+            "npi_number": "1134527302",
+            "phone_number": "212-674-9120",
+            "address": "123 Main St, New York, NY 10003",
+        }
+
+    def generate(self, document, prompt):
+        with upstream_call(self.name):
+            if self.latency:
+                time.sleep(self.latency)
+            return json.dumps(self.response)
+
+
+class HttpModelClient(ModelClient):
+    """
+    Posts the document to an HTTP endpoint answering {"text": "<json>"}, e.g.
+    the fake upstream in benchmarks/fake_upstreams.py. Goes through the shared
+    HttpClient, so load tests see real pooling, retries and upstream metrics.
+    """
+    name = "http"
+
+    def __init__(self, url=None, http_client=None):
+        self.url = url or os.getenv("EXTRACTION_MODEL_URL", "http://127.0.0.1:8900/model/generate")
+        self.http = http_client or get_http_client()
+
+    def generate(self, document, prompt):
+        with document.open() as stream:
+            response = self.http.request(
+                "POST", self.url,
+                data=stream.read(),
+                headers={"Content-Type": document.mime_type},
+            )
+        response.raise_for_status()
+        return response.json()["text"]
+
+
+def create_model_client(api_key, model_name):
+    """
+    EXTRACTION_MODEL_CLIENT=local swaps Gemini for the offline stand-in;
+    EXTRACTION_MODEL_CLIENT=http for an HTTP model endpoint (EXTRACTION_MODEL_URL).
+    """
+    choice = os.getenv("EXTRACTION_MODEL_CLIENT", "gemini")
+    if choice == "local":
+        return LocalStandInModelClient()
+    if choice == "http":
+        return HttpModelClient()
+    return GeminiModelClient(api_key, model_name)
@@ -1,43 +1,312 @@
+import os
+import json
+import time
+import random
+import asyncio
+import hashlib
 import smtplib
+import threading
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
-import os
+
+from .storage import connect, data_path, transaction
+from .telemetry import NOTIFICATION_QUEUE, NOTIFICATIONS, SMTP_CONNECTIONS, get_logger
+
+logger = get_logger("notification")
+
+# Per-message rejections: the session is still usable for the rest of the batch
+MESSAGE_ERRORS = (smtplib.SMTPRecipientsRefused, smtplib.SMTPSenderRefused, smtplib.SMTPDataError)
+
+def notice_key(npi, mismatches, recipient, report_id=None):
+    """
+    Dedupe key for a correction notice: same provider (the report when there
+    is no NPI), same discrepancies, same recipient address.
+    """
+    provider = f"npi:{npi}" if npi else f"report:{report_id}"
+    address = (recipient or "").strip().lower()
+    return hashlib.sha256(json.dumps([provider, sorted(mismatches or []), address]).encode()).hexdigest()[:32]
 
 class NotificationAgent:
-    def __init__(self):
-        self.smtp_server = "smtp.gmail.com"
-        self.smtp_port = 587
+    """
+    Outbound email through a persistent outbox (DATA_DIR/outbox.sqlite).
+    send_email only queues the message; a background sender delivers the
+    queue in batches over one reused, authenticated SMTP session, retries
+    temporary failures with exponential backoff and picks undelivered mail
+    up again after a restart. A notice whose dedupe key was already queued
+    or sent within NOTIFY_DEDUPE_WINDOW is not queued twice. Senders claim
+    due rows before delivering them, so several workers sharing DATA_DIR
+    never send the same message; claims older than NOTIFY_CLAIM_TIMEOUT
+    (a sender that died mid-batch) are queued again.
+    """
+    def __init__(self, db_path=None):
+        self.smtp_server = os.getenv("SMTP_HOST", "smtp.gmail.com")
+        self.smtp_port = int(os.getenv("SMTP_PORT", "587"))
+        self.starttls = os.getenv("SMTP_STARTTLS", "1") == "1"
+        self.timeout = float(os.getenv("SMTP_TIMEOUT", "10"))
+        # Servers drop idle sessions; reconnect instead of finding out on the next send
+        self.idle_timeout = float(os.getenv("SMTP_IDLE_TIMEOUT", "30"))
         self.sender_email = os.getenv("EMAIL_USER")
         self.password = os.getenv("EMAIL_PASS")
 
-    def send_email(self, recipient, subject, html_body):
+        self.batch_size = int(os.getenv("NOTIFY_BATCH_SIZE", "50"))
+        self.max_attempts = int(os.getenv("NOTIFY_MAX_ATTEMPTS", "6"))
+        self.backoff = float(os.getenv("NOTIFY_BACKOFF", "30"))
+        self.max_backoff = float(os.getenv("NOTIFY_MAX_BACKOFF", "3600"))
+        self.dedupe_window = float(os.getenv("NOTIFY_DEDUPE_WINDOW", str(7 * 86400)))
+        self.poll_interval = float(os.getenv("NOTIFY_POLL_INTERVAL", "1"))
+        self.claim_timeout = float(os.getenv("NOTIFY_CLAIM_TIMEOUT", "600"))
+
+        self.smtp = None
+        self.last_used = 0.0
+        self.task = None
+        self.lock = threading.Lock()
+        self.send_lock = threading.Lock()
+        self.counters = {"sent": 0, "retried": 0, "failed": 0, "duplicates": 0, "connections": 0, "batches": 0, "send_seconds": 0.0}
+
+        self.db_path = db_path or os.getenv("OUTBOX_DB_PATH") or data_path("outbox.sqlite")
+        self.conn = connect(self.db_path)
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS outbox (
+                id INTEGER PRIMARY KEY,
+                recipient TEXT NOT NULL,
+                subject TEXT NOT NULL,
+                html_body TEXT NOT NULL,
+                dedupe_key TEXT,
+                status TEXT NOT NULL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                next_attempt_at REAL NOT NULL,
+                created_at REAL NOT NULL,
+                sent_at REAL,
+                last_error TEXT,
+                claimed_at REAL
+            );
+            CREATE INDEX IF NOT EXISTS idx_outbox_due ON outbox(status, next_attempt_at);
+            CREATE INDEX IF NOT EXISTS idx_outbox_dedupe ON outbox(dedupe_key, created_at);
+        """)
+        # Columns added after the first release of this table
+        columns = {row["name"] for row in self.conn.execute("PRAGMA table_info(outbox)")}
+        if "claimed_at" not in columns:
+            self.conn.execute("ALTER TABLE outbox ADD COLUMN claimed_at REAL")
+        self._update_depth()
+
+    def send_email(self, recipient, subject, html_body, dedupe_key=None):
         """
-        Sends a real HTML email using Gmail SMTP.
+        Queues an HTML email for the background sender.
         """
-        print(f"📧 [NotificationAgent] Sending email to {recipient}...")
-        
+        logger.debug("queueing email", extra={"recipient": recipient})
+
         if not self.sender_email or not self.password:
             return {"status": "error", "message": "Email credentials missing in .env"}
 
-        try:
-            # Create Message
-            msg = MIMEMultipart("alternative")
-            msg["Subject"] = subject
-            msg["From"] = self.sender_email
-            msg["To"] = recipient
-
-            # Attach HTML Body
-            msg.attach(MIMEText(html_body, "html"))
-
-            # Send via Gmail SMTP
-            with smtplib.SMTP(self.smtp_server, self.smtp_port) as server:
-                server.starttls() # Secure connection
+        now = time.time()
+        with self.lock, transaction(self.conn, immediate=True):
+            if dedupe_key:
+                existing = self.conn.execute(
+                    "SELECT id FROM outbox WHERE dedupe_key = ? AND created_at >= ? AND status != 'failed'"
+                    " ORDER BY id DESC LIMIT 1",
+                    (dedupe_key, now - self.dedupe_window),
+                ).fetchone()
+                if existing:
+                    self.counters["duplicates"] += 1
+                    NOTIFICATIONS.labels("duplicate").inc()
+                    return {"status": "duplicate", "message": "Same notice already sent to this provider", "id": existing["id"]}
+            message_id = self.conn.execute(
+                "INSERT INTO outbox (recipient, subject, html_body, dedupe_key, status, next_attempt_at, created_at)"
+                " VALUES (?, ?, ?, ?, 'queued', ?, ?)",
+                (recipient, subject, html_body, dedupe_key, now, now),
+            ).lastrowid
+        self._update_depth()
+        return {"status": "queued", "message": "Email queued", "id": message_id}
+
+    async def start(self):
+        self.task = asyncio.create_task(self._loop())
+
+    async def stop(self):
+        if self.task:
+            self.task.cancel()
+            await asyncio.gather(self.task, return_exceptions=True)
+            self.task = None
+        await asyncio.to_thread(self.close)
+
+    def deliver_batch(self):
+        """
+        Sends up to `batch_size` due messages over the shared session.
+        Returns how many were attempted.
+        """
+        with self.send_lock:
+            rows = self._claim()
+            if not rows:
+                self._close_if_idle()
+                return 0
+
+            started = time.perf_counter()
+            updates = []
+            session_error = None
+            for row in rows:
+                try:
+                    if session_error:
+                        raise session_error  # no point reconnecting for every message
+                    self._send(row)
+                    updates.append(("sent", row["attempts"] + 1, row["next_attempt_at"], time.time(), None, row["id"]))
+                except Exception as e:
+                    if not isinstance(e, MESSAGE_ERRORS):
+                        session_error = e
+                        self._drop_connection()
+                    updates.append(self._failure(row, e))
+
+            with self.lock, transaction(self.conn):
+                self.conn.executemany(
+                    "UPDATE outbox SET status = ?, attempts = ?, next_attempt_at = ?, sent_at = ?, last_error = ?,"
+                    " claimed_at = NULL WHERE id = ?",
+                    updates,
+                )
+            with self.lock:
+                self.counters["batches"] += 1
+                self.counters["send_seconds"] += time.perf_counter() - started
+            self._update_depth()
+            return len(rows)
+
+    def deliver_pending(self):
+        """
+        Drains everything that is due now (CLI, tests, benchmarks).
+        """
+        total = 0
+        while True:
+            sent = self.deliver_batch()
+            if not sent:
+                return total
+            total += sent
+
+    def close(self):
+        with self.send_lock:
+            self._drop_connection(quit=True)
+
+    def stats(self):
+        depth = {row["status"]: row["count"] for row in self.conn.execute("SELECT status, COUNT(*) AS count FROM outbox GROUP BY status")}
+        oldest = self.conn.execute("SELECT MIN(created_at) FROM outbox WHERE status = 'queued'").fetchone()[0]
+        with self.lock:
+            counters = dict(self.counters)
+        return {
+            "queued": depth.get("queued", 0),
+            "sending": depth.get("sending", 0),
+            "sent_total": depth.get("sent", 0),
+            "failed_total": depth.get("failed", 0),
+            "oldest_queued_age_seconds": round(time.time() - oldest, 1) if oldest else None,
+            "messages_per_second": round(counters["sent"] / counters["send_seconds"], 1) if counters["send_seconds"] else None,
+            **counters,
+        }
+
+    async def _loop(self):
+        while True:
+            try:
+                sent = await asyncio.to_thread(self.deliver_batch)
+            except Exception:
+                logger.exception("email batch failed")
+                sent = 0
+            if not sent:
+                await asyncio.sleep(self.poll_interval)
+
+    def _claim(self):
+        """
+        Atomically marks up to `batch_size` due messages as 'sending' and
+        returns them; one UPDATE, so no other sender can claim the same rows.
+        """
+        now = time.time()
+        with self.lock, transaction(self.conn, immediate=True):
+            stale = self.conn.execute(
+                "UPDATE outbox SET status = 'queued', claimed_at = NULL WHERE status = 'sending' AND claimed_at < ?",
+                (now - self.claim_timeout,),
+            ).rowcount
+            rows = self.conn.execute(
+                "UPDATE outbox SET status = 'sending', claimed_at = ? WHERE id IN ("
+                " SELECT id FROM outbox WHERE status = 'queued' AND next_attempt_at <= ? ORDER BY next_attempt_at LIMIT ?"
+                ") RETURNING *",
+                (now, now, self.batch_size),
+            ).fetchall()
+        if stale:
+            logger.warning("requeued stale outbox claims", extra={"messages": stale})
+        return sorted(rows, key=lambda row: row["next_attempt_at"])
+
+    def _send(self, row):
+        msg = MIMEMultipart("alternative")
+        msg["Subject"] = row["subject"]
+        msg["From"] = self.sender_email
+        msg["To"] = row["recipient"]
+        msg.attach(MIMEText(row["html_body"], "html"))
+
+        for retry in (False, True):
+            server = self._connection()
+            try:
+                server.sendmail(self.sender_email, row["recipient"], msg.as_string())
+                break
+            except smtplib.SMTPServerDisconnected:
+                # The server closed a session we thought was alive: reconnect once
+                self._drop_connection()
+                if retry:
+                    raise
+        self.last_used = time.monotonic()
+        with self.lock:
+            self.counters["sent"] += 1
+        NOTIFICATIONS.labels("sent").inc()
+        logger.info("email sent", extra={"recipient": row["recipient"], "outbox_id": row["id"]})
+
+    def _failure(self, row, error):
+        attempts = row["attempts"] + 1
+        permanent = isinstance(error, MESSAGE_ERRORS) and _smtp_code(error) >= 500
+        if permanent or attempts >= self.max_attempts:
+            outcome, status, retry_at = "failed", "failed", row["next_attempt_at"]
+        else:
+            # Jittered exponential backoff so a flapping server is not hammered in lock-step
+            delay = min(self.max_backoff, self.backoff * 2 ** (attempts - 1)) * random.uniform(0.5, 1.0)
+            outcome, status, retry_at = "retried", "queued", time.time() + delay
+        with self.lock:
+            self.counters[outcome] += 1
+        NOTIFICATIONS.labels(outcome).inc()
+        logger.warning("email send failed", extra={
+            "recipient": row["recipient"], "outbox_id": row["id"], "attempt": attempts, "outcome": outcome, "error": str(error),
+        })
+        return (status, attempts, retry_at, None, str(error), row["id"])
+
+    def _connection(self):
+        if self.smtp is not None and time.monotonic() - self.last_used > self.idle_timeout:
+            self._drop_connection(quit=True)
+        if self.smtp is None:
+            server = smtplib.SMTP(self.smtp_server, self.smtp_port, timeout=self.timeout)
+            try:
+                if self.starttls:
+                    server.starttls()  # Secure connection
                 server.login(self.sender_email, self.password)
-                server.sendmail(self.sender_email, recipient, msg.as_string())
-            
-            print("✅ [NotificationAgent] Email sent successfully!")
-            return {"status": "success", "message": "Email sent"}
-
-        except Exception as e:
-            print(f"❌ [NotificationAgent] Failed to send: {e}")
-            return {"status": "error", "message": str(e)}
\ No newline at end of file
+            except Exception:
+                server.close()
+                raise
+            self.smtp = server
+            self.last_used = time.monotonic()
+            with self.lock:
+                self.counters["connections"] += 1
+            SMTP_CONNECTIONS.inc()
+        return self.smtp
+
+    def _drop_connection(self, quit=False):
+        if self.smtp is None:
+            return
+        try:
+            if quit:
+                self.smtp.quit()
+            else:
+                self.smtp.close()
+        except Exception:
+            self.smtp.close()
+        self.smtp = None
+
+    def _close_if_idle(self):
+        if self.smtp is not None and time.monotonic() - self.last_used > self.idle_timeout:
+            self._drop_connection(quit=True)
+
+    def _update_depth(self):
+        NOTIFICATION_QUEUE.set(self.conn.execute("SELECT COUNT(*) FROM outbox WHERE status = 'queued'").fetchone()[0])
+
+
+def _smtp_code(error):
+    if isinstance(error, smtplib.SMTPRecipientsRefused):
+        return min(code for code, _ in error.recipients.values())
+    return error.smtp_code
@@ -0,0 +1,92 @@
+import csv
+import argparse
+import numpy as np
+
+# Per-row verdicts (int8 so a 500k roster costs 500 KB)
+VALID = 0
+INVALID_FORMAT = 1
+CHECKSUM_FAIL = 2
+VERDICT_LABELS = np.array(["Valid", "Invalid Format", "Checksum Fail"])
+
+NPI_PREFIX = "80840"
+
+def _prefix_luhn_sum():
+    """
+    Luhn contribution of the CMS '80840' prefix. The prefix sits at positions
+    10..14 counted from the right of the 15-digit number, so it is a constant.
+    """
+    total = 0
+    for pos, ch in enumerate(reversed(NPI_PREFIX), start=10):
+        d = int(ch)
+        total += sum(divmod(d * 2, 10)) if pos % 2 else d
+    return total
+
+PREFIX_SUM = _prefix_luhn_sum()
+
+# NPI digit j (0 = leftmost) sits at position 9 - j from the right; odd positions are doubled
+DOUBLED_COLUMNS = np.array([(9 - j) % 2 == 1 for j in range(10)])
+
+def prescreen_npis(npis):
+    """
+    Vectorized format + prefixed-Luhn check for a whole roster.
+    Returns a dict with:
+    - verdicts: int8 array, one of VALID / INVALID_FORMAT / CHECKSUM_FAIL per row
+    - unique_npis: the distinct valid NPIs (downstream lookups run once per entry)
+    - unique_index: per row, the position in unique_npis (-1 for rejected rows)
+    """
+    # 'U11' keeps one extra character so over-long values cannot pass as 10 digits
+    values = np.char.strip(np.asarray(npis, dtype=str)).astype("U11")
+    codes = values.view(np.uint32).reshape(len(values), 11).astype(np.int32)
+
+    digits = codes[:, :10] - ord("0")
+    well_formed = ((digits >= 0) & (digits <= 9)).all(axis=1) & (codes[:, 10] == 0)
+
+    doubled = np.where(DOUBLED_COLUMNS, digits * 2, digits)
+    doubled = np.where(doubled > 9, doubled - 9, doubled)
+    checksum_ok = (doubled.sum(axis=1) + PREFIX_SUM) % 10 == 0
+
+    verdicts = np.full(len(values), INVALID_FORMAT, dtype=np.int8)
+    verdicts[well_formed] = CHECKSUM_FAIL
+    verdicts[well_formed & checksum_ok] = VALID
+
+    valid_rows = verdicts == VALID
+    unique_npis, inverse = np.unique(values[valid_rows], return_inverse=True)
+    unique_index = np.full(len(values), -1, dtype=np.int64)
+    unique_index[valid_rows] = inverse
+
+    return {"verdicts": verdicts, "unique_npis": unique_npis, "unique_index": unique_index}
+
+def summarize(result):
+    counts = np.bincount(result["verdicts"], minlength=len(VERDICT_LABELS))
+    summary = {str(label): int(n) for label, n in zip(VERDICT_LABELS, counts)}
+    summary["Unique Valid"] = int(len(result["unique_npis"]))
+    return summary
+
+def main():
+    parser = argparse.ArgumentParser(description="Pre-screen a roster CSV column of NPIs (format + Luhn) before validation.")
+    parser.add_argument("roster", help="CSV file with a header row")
+    parser.add_argument("--column", default="npi", help="Name of the NPI column (default: npi)")
+    parser.add_argument("--out", help="Write the roster back out with a `prescreen` verdict column")
+    args = parser.parse_args()
+
+    with open(args.roster, "r", newline="") as f:
+        reader = csv.DictReader(f)
+        rows = list(reader)
+        fieldnames = reader.fieldnames
+
+    result = prescreen_npis([row.get(args.column) or "" for row in rows])
+
+    if args.out:
+        labels = VERDICT_LABELS[result["verdicts"]]
+        with open(args.out, "w", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=fieldnames + ["prescreen"])
+            writer.writeheader()
+            for row, label in zip(rows, labels):
+                row["prescreen"] = label
+                writer.writerow(row)
+
+    for label, count in summarize(result).items():
+        print(f"{label}: {count}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,201 @@
+import os
+import csv
+import sys
+import time
+import argparse
+import threading
+
+from .storage import connect, data_path, transaction
+
+# NPPES dissemination file columns we keep (everything else is skipped while streaming)
+COL_NPI = "NPI"
+COL_ENTITY_TYPE = "Entity Type Code"
+COL_ORG_NAME = "Provider Organization Name (Legal Business Name)"
+COL_LAST_NAME = "Provider Last Name (Legal Name)"
+COL_FIRST_NAME = "Provider First Name"
+COL_ADDRESS = "Provider First Line Business Practice Location Address"
+COL_CITY = "Provider Business Practice Location Address City Name"
+COL_STATE = "Provider Business Practice Location Address State Name"
+COL_POSTAL_CODE = "Provider Business Practice Location Address Postal Code"
+COL_PHONE = "Provider Business Practice Location Address Telephone Number"
+COL_DEACTIVATED = "NPI Deactivation Date"
+COL_REACTIVATED = "NPI Reactivation Date"
+
+# PRAGMA user_version of the npi_records layout; 2 added city, state and ZIP
+SCHEMA_VERSION = 2
+
+class NPPESStore:
+    """
+    Local copy of the CMS NPPES file, reduced to the fields validate_npi returns.
+    Rows are keyed by NPI in a WITHOUT ROWID table, so a lookup is a single
+    B-tree probe (tens of microseconds) and re-ingesting a weekly update file
+    simply upserts the changed providers.
+    """
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self.conn = connect(db_path)
+        self.lock = threading.Lock()
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS npi_records (
+                npi TEXT PRIMARY KEY,
+                official_name TEXT,
+                official_phone TEXT,
+                official_address TEXT,
+                official_city TEXT,
+                official_state TEXT,
+                official_postal_code TEXT,
+                status TEXT NOT NULL
+            ) WITHOUT ROWID;
+            CREATE TABLE IF NOT EXISTS ingested_files (
+                filename TEXT NOT NULL,
+                rows INTEGER NOT NULL,
+                ingested_at REAL NOT NULL
+            );
+        """)
+        self._migrate()
+
+    def lookup(self, npi):
+        row = self.conn.execute(
+            "SELECT official_name, official_phone, official_address, official_city, official_state, "
+            "official_postal_code, status FROM npi_records WHERE npi = ?",
+            (str(npi),),
+        ).fetchone()
+        return dict(row) if row else None
+
+    def ingest(self, csv_path, chunk_size=50000, progress=None):
+        """
+        Streams an NPPES full or weekly incremental CSV into the store.
+        Memory use is bounded by `chunk_size` rows regardless of file size.
+        """
+        total = 0
+        batch = []
+        with open(csv_path, "r", newline="", encoding="utf-8", errors="replace") as f:
+            reader = csv.reader(f)
+            header = next(reader)
+            idx = {name: header.index(name) for name in (
+                COL_NPI, COL_ENTITY_TYPE, COL_ORG_NAME, COL_LAST_NAME, COL_FIRST_NAME,
+                COL_ADDRESS, COL_CITY, COL_STATE, COL_POSTAL_CODE, COL_PHONE, COL_DEACTIVATED, COL_REACTIVATED,
+            )}
+            for row in reader:
+                batch.append(_to_record(row, idx))
+                if len(batch) >= chunk_size:
+                    total += self._write(batch)
+                    batch = []
+                    if progress:
+                        progress(total)
+            if batch:
+                total += self._write(batch)
+
+        with self.lock:
+            self.conn.execute(
+                "INSERT INTO ingested_files (filename, rows, ingested_at) VALUES (?, ?, ?)",
+                (os.path.basename(csv_path), total, time.time()),
+            )
+        return total
+
+    def stats(self):
+        records = self.conn.execute("SELECT COUNT(*) FROM npi_records").fetchone()[0]
+        last = self.conn.execute("SELECT filename, ingested_at FROM ingested_files ORDER BY ingested_at DESC LIMIT 1").fetchone()
+        return {
+            "path": self.db_path,
+            "schema_version": SCHEMA_VERSION,
+            "records": records,
+            "last_file": last["filename"] if last else None,
+            "last_ingested_at": last["ingested_at"] if last else None,
+        }
+
+    def _write(self, batch):
+        with self.lock, transaction(self.conn):
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO npi_records (npi, official_name, official_phone, official_address, "
+                "official_city, official_state, official_postal_code, status) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                batch,
+            )
+        return len(batch)
+
+    def _migrate(self):
+        """
+        Brings a store ingested by an older release up to SCHEMA_VERSION.
+        Rows from before version 2 have no city/state/ZIP until the next
+        full file is ingested.
+        """
+        version = self.conn.execute("PRAGMA user_version").fetchone()[0]
+        if version >= SCHEMA_VERSION:
+            return
+        columns = {row["name"] for row in self.conn.execute("PRAGMA table_info(npi_records)")}
+        with transaction(self.conn):
+            for column in ("official_city", "official_state", "official_postal_code"):
+                if column not in columns:
+                    self.conn.execute(f"ALTER TABLE npi_records ADD COLUMN {column} TEXT")
+            self.conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+
+
+def _to_record(row, idx):
+    if row[idx[COL_ENTITY_TYPE]] == "2":
+        name = row[idx[COL_ORG_NAME]]
+    else:
+        name = f"{row[idx[COL_FIRST_NAME]]} {row[idx[COL_LAST_NAME]]}".strip()
+
+    # Deactivated unless a later reactivation exists (dates are MM/DD/YYYY)
+    deactivated = row[idx[COL_DEACTIVATED]]
+    reactivated = row[idx[COL_REACTIVATED]]
+    status = "Active"
+    if deactivated and (not reactivated or _date_key(reactivated) < _date_key(deactivated)):
+        status = "Deactivated"
+
+    return (
+        row[idx[COL_NPI]],
+        name or "N/A",
+        _format_phone(row[idx[COL_PHONE]]),
+        row[idx[COL_ADDRESS]] or "N/A",
+        row[idx[COL_CITY]] or None,
+        row[idx[COL_STATE]] or None,
+        # NPPES stores ZIP+4 without the dash ("100031234")
+        row[idx[COL_POSTAL_CODE]][:5] or None,
+        status,
+    )
+
+
+def _date_key(value):
+    month, day, year = value.split("/")
+    return (year, month, day)
+
+
+def _format_phone(digits):
+    # The live registry API returns 212-674-9120; NPPES stores 2126749120
+    if len(digits) == 10 and digits.isdigit():
+        return f"{digits[:3]}-{digits[3:6]}-{digits[6:]}"
+    return digits or "N/A"
+
+
+def open_nppes_store():
+    """
+    Returns the local NPPES store if one has been ingested, else None.
+    """
+    db_path = os.getenv("NPPES_DB_PATH") or data_path("nppes.sqlite")
+    if not os.path.exists(db_path):
+        return None
+    return NPPESStore(db_path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Ingest CMS NPPES dissemination files into the local NPI store.")
+    parser.add_argument("files", nargs="+", help="NPPES full or weekly update CSV files, applied in order")
+    parser.add_argument("--db", default=os.getenv("NPPES_DB_PATH") or data_path("nppes.sqlite"))
+    parser.add_argument("--chunk-size", type=int, default=50000)
+    args = parser.parse_args()
+
+    store = NPPESStore(args.db)
+    for path in args.files:
+        started = time.perf_counter()
+        rows = store.ingest(
+            path,
+            chunk_size=args.chunk_size,
+            progress=lambda n: print(f"   ↳ {n:,} rows", file=sys.stderr),
+        )
+        print(f"🗂️ Ingested {rows:,} rows from {os.path.basename(path)} in {time.perf_counter() - started:.1f}s")
+    print(store.stats())
+
+
+if __name__ == "__main__":
+    main()
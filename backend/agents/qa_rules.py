@@ -0,0 +1,327 @@
+import os
+import json
+import time
+import string
+import argparse
+
+import numpy as np
+
+# Review order: Critical first. Rules can only escalate a report's priority.
+PRIORITY_RANK = {"Critical": 0, "High": 1, "Medium": 2, "Low": 3}
+PRIORITIES = sorted(PRIORITY_RANK, key=PRIORITY_RANK.get)
+
+DEFAULT_RULES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "qa_rules.json")
+
+# --- Normalisers: (scalar, vectorized) pairs. All of them treat None as "". ---
+def _text(value):
+    return "" if value is None else str(value)
+
+def _text_series(series):
+    return series.where(series.notna(), "").astype(str)
+
+NORMALIZERS = {
+    "text": (_text, _text_series),
+    "strip": (lambda v: _text(v).strip(), lambda s: _text_series(s).str.strip()),
+    "lower": (lambda v: _text(v).lower(), lambda s: _text_series(s).str.lower()),
+    "upper": (lambda v: _text(v).upper(), lambda s: _text_series(s).str.upper()),
+    "digits": (lambda v: "".join(ch for ch in _text(v) if ch.isdigit()), lambda s: _text_series(s).str.replace(r"\D", "", regex=True)),
+    "collapse_spaces": (lambda v: " ".join(_text(v).split()), lambda s: _text_series(s).str.split().str.join(" ")),
+}
+
+def _remove_chars(chars):
+    table = str.maketrans("", "", chars)
+
+    def vector(series):
+        series = _text_series(series)
+        for ch in chars:  # a few literal replaces beat one str.translate
+            series = series.str.replace(ch, "", regex=False)
+        return series
+
+    return (lambda v: _text(v).translate(table), vector)
+
+def _compile_normalizer(spec):
+    if isinstance(spec, str) and spec in NORMALIZERS:
+        return NORMALIZERS[spec]
+    if isinstance(spec, dict) and set(spec) == {"remove"}:
+        return _remove_chars(spec["remove"])
+    raise ValueError(f"Unknown normaliser {spec!r}")
+
+# --- Conditions: each compiles to (scalar(values) -> bool, vector(columns) -> bool array) ---
+def _numeric(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+NUMERIC_OPS = {
+    "lt": (lambda a, b: a < b),
+    "le": (lambda a, b: a <= b),
+    "gt": (lambda a, b: a > b),
+    "ge": (lambda a, b: a >= b),
+}
+
+def _compile_condition(spec, fields):
+    if "all" in spec or "any" in spec:
+        combine = "all" if "all" in spec else "any"
+        parts = [_compile_condition(part, fields) for part in spec[combine]]
+        if not parts:
+            raise ValueError(f"Empty '{combine}' condition")
+        if combine == "all":
+            return (lambda v: all(p[0](v) for p in parts),
+                    lambda c: np.logical_and.reduce([p[1](c) for p in parts]))
+        return (lambda v: any(p[0](v) for p in parts),
+                lambda c: np.logical_or.reduce([p[1](c) for p in parts]))
+    if "not" in spec:
+        scalar, vector = _compile_condition(spec["not"], fields)
+        return (lambda v: not scalar(v), lambda c: ~vector(c))
+
+    op, field = spec.get("op"), spec.get("field")
+    if field not in fields:
+        raise ValueError(f"Condition {spec!r} refers to unknown field {field!r}")
+    other = spec.get("other")
+    if other is not None and other not in fields:
+        raise ValueError(f"Condition {spec!r} refers to unknown field {other!r}")
+    value = spec.get("value")
+
+    if op in ("eq", "ne"):
+        negate = op == "ne"
+        if other is not None:
+            scalar = lambda v: v[field] == v[other]
+            vector = lambda c: np.asarray(c[field], dtype=object) == np.asarray(c[other], dtype=object)
+        else:
+            scalar = lambda v: v[field] == value
+            vector = lambda c: np.asarray(c[field], dtype=object) == value
+        if negate:
+            return (lambda v: not scalar(v), lambda c: ~vector(c))
+        return scalar, vector
+    if op in ("in", "not_in"):
+        values = list(value or [])
+        negate = op == "not_in"
+        scalar = lambda v: v[field] in values
+        vector = lambda c: c[field].isin(values).to_numpy()
+        if negate:
+            return (lambda v: not scalar(v), lambda c: ~vector(c))
+        return scalar, vector
+    if op in ("empty", "not_empty"):
+        negate = op == "not_empty"
+        scalar = lambda v: v[field] is None or v[field] == ""
+        vector = lambda c: (c[field].isna() | (c[field] == "")).to_numpy()
+        if negate:
+            return (lambda v: not scalar(v), lambda c: ~vector(c))
+        return scalar, vector
+    if op == "contains":
+        needle = str(value)
+        return (lambda v: needle in _text(v[field]),
+                lambda c: _text_series(c[field]).str.contains(needle, regex=False).to_numpy())
+    if op in NUMERIC_OPS:
+        compare = NUMERIC_OPS[op]
+
+        def scalar(v):
+            a = _numeric(v[field])
+            b = _numeric(v[other]) if other is not None else value
+            return a is not None and b is not None and compare(a, b)
+
+        def vector(c):
+            import pandas as pd  # only rescoring needs pandas; keep it out of API start-up
+
+            a = pd.to_numeric(c[field], errors="coerce").to_numpy(float)
+            b = pd.to_numeric(c[other], errors="coerce").to_numpy(float) if other is not None else float(value)
+            with np.errstate(invalid="ignore"):
+                return compare(a, b)  # NaN compares False
+
+        return scalar, vector
+    raise ValueError(f"Unknown condition operator {op!r} in {spec!r}")
+
+
+class Rule:
+    def __init__(self, spec, fields):
+        self.id = spec["id"]
+        self.unless = list(spec.get("unless", []))
+        self.check, self.check_columns = _compile_condition(spec["when"], fields)
+        score = spec.get("score", {})
+        if set(score) - {"set", "add"}:
+            raise ValueError(f"Rule {self.id}: score must be {{'set': n}} or {{'add': n}}")
+        self.score_set = score.get("set")
+        self.score_add = score.get("add", 0)
+        self.priority = spec.get("priority")
+        if self.priority is not None and self.priority not in PRIORITY_RANK:
+            raise ValueError(f"Rule {self.id}: unknown priority {self.priority!r}")
+        self.message = spec.get("message")
+        # Pre-split "Phone ({pdf_phone})" into literals and field references
+        self.template = []
+        for literal, name, _, _ in string.Formatter().parse(self.message or ""):
+            if name and name not in fields:
+                raise ValueError(f"Rule {self.id}: message refers to unknown field {name!r}")
+            self.template.append((literal, name))
+
+    def format(self, values):
+        return "".join(literal + (str(values[name]) if name else "") for literal, name in self.template)
+
+    def format_columns(self, columns, mask):
+        out = np.full(int(mask.sum()), "", dtype=object)
+        for literal, name in self.template:
+            if literal:
+                out = out + literal
+            if name:
+                out = out + np.array([str(v) for v in np.asarray(columns[name], dtype=object)[mask]], dtype=object)
+        return out.tolist()
+
+
+class RuleSet:
+    """
+    A compiled, versioned set of QA rules (see qa_rules.json). Fields pull a
+    value out of the report and normalise it; rules test fields, adjust the
+    score, escalate the priority and add a mismatch message. The same rules
+    evaluate one report (the pipeline) or whole columns of stored reports at
+    once (rescoring), so a weight change never needs a pipeline re-run.
+    """
+    def __init__(self, definition):
+        self.version = definition["version"]
+        self.base_score = definition.get("base_score", 100)
+        self.min_score = definition.get("min_score")
+        self.max_score = definition.get("max_score")
+        self.default_priority = definition.get("default_priority", "Low")
+        if self.default_priority not in PRIORITY_RANK:
+            raise ValueError(f"Unknown default priority {self.default_priority!r}")
+
+        self.fields = {}
+        for name, spec in definition["fields"].items():
+            normalizers = [_compile_normalizer(n) for n in spec.get("normalize", [])]
+            self.fields[name] = (spec["source"], normalizers)
+
+        self.rules = [Rule(spec, self.fields) for spec in definition["rules"]]
+        ids = [rule.id for rule in self.rules]
+        if len(set(ids)) != len(ids):
+            raise ValueError("Rule ids must be unique")
+        for index, rule in enumerate(self.rules):
+            unknown = [r for r in rule.unless if r not in ids[:index]]
+            if unknown:
+                raise ValueError(f"Rule {rule.id}: 'unless' must name earlier rules, got {unknown}")
+
+    @property
+    def sources(self):
+        """
+        Report paths ("official.official_phone") the rules read.
+        """
+        return sorted({source for source, _ in self.fields.values()})
+
+    def evaluate(self, report):
+        """
+        Scores one report dict (extracted / official / state_board / web_enrichment).
+        """
+        values = {}
+        for name, (source, normalizers) in self.fields.items():
+            value = _get_path(report, source)
+            for scalar, _ in normalizers:
+                value = scalar(value)
+            values[name] = value
+
+        score = self.base_score
+        rank = PRIORITY_RANK[self.default_priority]
+        fired, mismatches = set(), []
+        for rule in self.rules:
+            if any(r in fired for r in rule.unless) or not rule.check(values):
+                continue
+            fired.add(rule.id)
+            score = rule.score_set if rule.score_set is not None else score
+            score += rule.score_add
+            if rule.priority:
+                rank = min(rank, PRIORITY_RANK[rule.priority])
+            if rule.message:
+                mismatches.append(rule.format(values))
+
+        if self.min_score is not None:
+            score = max(score, self.min_score)
+        if self.max_score is not None:
+            score = min(score, self.max_score)
+        return {
+            "score": int(round(score)),
+            "priority": PRIORITIES[rank],
+            "mismatches": mismatches,
+            "rules_version": self.version,
+        }
+
+    def evaluate_frame(self, frame):
+        """
+        Vectorized evaluate over many reports. `frame` has one column per
+        source path (see `sources`). Returns a DataFrame with score, priority,
+        priority_rank and mismatches (a list per row), in the input order.
+        """
+        import pandas as pd
+
+        inputs = {source: np.asarray(frame[source], dtype=object) for source in self.sources}
+        count = len(next(iter(inputs.values()))) if inputs else 0
+        columns = {}
+        for name, (source, normalizers) in self.fields.items():
+            series = pd.Series(inputs[source], dtype=object)
+            for _, vector in normalizers:
+                series = vector(series)
+            columns[name] = series
+
+        score = np.full(count, float(self.base_score))
+        rank = np.full(count, PRIORITY_RANK[self.default_priority], dtype=np.int8)
+        mismatches = [[] for _ in range(count)]
+        fired = {}
+        for rule in self.rules:
+            mask = np.asarray(rule.check_columns(columns), dtype=bool)
+            for earlier in rule.unless:
+                mask &= ~fired[earlier]
+            fired[rule.id] = mask
+            if not mask.any():
+                continue
+            if rule.score_set is not None:
+                score[mask] = rule.score_set
+            if rule.score_add:
+                score[mask] += rule.score_add
+            if rule.priority:
+                np.minimum(rank, np.where(mask, PRIORITY_RANK[rule.priority], rank), out=rank)
+            if rule.message:
+                for index, message in zip(np.flatnonzero(mask), rule.format_columns(columns, mask)):
+                    mismatches[index].append(message)
+
+        if self.min_score is not None or self.max_score is not None:
+            score = np.clip(score, self.min_score, self.max_score)
+        return pd.DataFrame({
+            "score": np.rint(score).astype(np.int64),
+            "priority": np.asarray(PRIORITIES, dtype=object)[rank],
+            "priority_rank": rank,
+            "mismatches": mismatches,
+        })
+
+
+def _get_path(report, path):
+    value = report
+    for key in path.split("."):
+        if not isinstance(value, dict):
+            return None
+        value = value.get(key)
+    return value
+
+def load_rules(path=None):
+    """
+    Compiles the rule file at `path`, QA_RULES_PATH, or the bundled qa_rules.json.
+    """
+    path = path or os.getenv("QA_RULES_PATH") or DEFAULT_RULES_PATH
+    with open(path) as f:
+        return RuleSet(json.load(f))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check a QA rule file or rescore stored reports with it.")
+    parser.add_argument("command", choices=["check", "rescore"])
+    parser.add_argument("--rules", help="Rule file (default: QA_RULES_PATH or agents/qa_rules.json)")
+    parser.add_argument("--db", help="Report store (default: REPORT_DB_PATH or DATA_DIR/reports.sqlite)")
+    args = parser.parse_args()
+
+    rules = load_rules(args.rules)
+    print(f"⚖️ Rules {rules.version}: {len(rules.rules)} rules over {len(rules.fields)} fields ({', '.join(rules.sources)})")
+    if args.command == "rescore":
+        from .report_store import ReportStore
+
+        started = time.perf_counter()
+        result = ReportStore(args.db).rescore(rules)
+        print(f"⚖️ Rescored {result['rescored']} reports ({result['changed']} changed) in {time.perf_counter() - started:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,292 @@
+import os
+import json
+import time
+import threading
+
+import numpy as np
+
+from .qa_rules import PRIORITY_RANK
+from .storage import connect, data_path, transaction
+
+# Public sort keys -> indexed columns (anything else is rejected)
+SORT_COLUMNS = {
+    "score": "score",
+    "priority": "priority_rank",
+    "created_at": "created_at",
+    "npi": "npi",
+    "provider_name": "provider_name",
+}
+
+# Report paths kept as plain columns; rules reading any other path go through json_extract
+SOURCE_COLUMNS = {
+    "extracted.npi_number": "npi",
+    "extracted.provider_name": "provider_name",
+    "extracted.phone_number": "phone_number",
+    "official.official_name": "official_name",
+    "official.official_phone": "official_phone",
+    "state_board.state_license_status": "license_status",
+    "matching.name_similarity": "name_similarity",
+    "matching.duplicate_count": "duplicate_count",
+}
+
+class ReportStore:
+    """
+    Every QA report, persisted in a local SQLite table indexed on score,
+    priority, NPI and timestamp so the review queue can be filtered, sorted
+    and paged server-side. Per-day aggregates are updated in the same
+    transaction as each insert, so dashboard totals never scan the reports.
+    """
+    def __init__(self, db_path=None):
+        self.db_path = db_path or os.getenv("REPORT_DB_PATH") or data_path("reports.sqlite")
+        self.conn = connect(self.db_path)
+        self.lock = threading.Lock()
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS reports (
+                id INTEGER PRIMARY KEY,
+                created_at REAL NOT NULL,
+                source TEXT,
+                npi TEXT,
+                provider_name TEXT,
+                official_name TEXT,
+                phone_number TEXT,
+                official_phone TEXT,
+                license_status TEXT,
+                name_similarity REAL,
+                duplicate_count INTEGER,
+                score INTEGER NOT NULL,
+                priority TEXT NOT NULL,
+                priority_rank INTEGER NOT NULL,
+                mismatch_count INTEGER NOT NULL,
+                mismatches TEXT,
+                rules_version TEXT,
+                report TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_reports_score ON reports(score, id);
+            CREATE INDEX IF NOT EXISTS idx_reports_priority ON reports(priority_rank, score);
+            CREATE INDEX IF NOT EXISTS idx_reports_npi ON reports(npi, created_at);
+            CREATE INDEX IF NOT EXISTS idx_reports_created ON reports(created_at);
+            CREATE INDEX IF NOT EXISTS idx_reports_provider_name ON reports(provider_name, id);
+            CREATE TABLE IF NOT EXISTS report_daily (
+                day TEXT PRIMARY KEY,
+                reports INTEGER NOT NULL,
+                score_sum INTEGER NOT NULL,
+                critical INTEGER NOT NULL
+            ) WITHOUT ROWID;
+        """)
+        # Columns added after the first release of this table
+        columns = {row["name"] for row in self.conn.execute("PRAGMA table_info(reports)")}
+        for column, kind in (("mismatches", "TEXT"), ("rules_version", "TEXT"), ("name_similarity", "REAL"), ("duplicate_count", "INTEGER")):
+            if column not in columns:
+                self.conn.execute(f"ALTER TABLE reports ADD COLUMN {column} {kind}")
+
+    def add(self, report, source=None):
+        """
+        Stores one report from perform_quality_assurance. Returns its id.
+        """
+        row = _to_row(report, source, time.time())
+        day = time.strftime("%Y-%m-%d", time.localtime(row[0]))
+        with self.lock, transaction(self.conn):
+            cursor = self.conn.execute(
+                "INSERT INTO reports (created_at, source, npi, provider_name, official_name, phone_number,"
+                " official_phone, license_status, name_similarity, duplicate_count, score, priority, priority_rank,"
+                " mismatch_count, mismatches, rules_version, report) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                row,
+            )
+            self.conn.execute(
+                "INSERT INTO report_daily (day, reports, score_sum, critical) VALUES (?, 1, ?, ?)"
+                " ON CONFLICT(day) DO UPDATE SET reports = reports + 1,"
+                " score_sum = score_sum + excluded.score_sum, critical = critical + excluded.critical",
+                (day, row[10], int(row[11] == "Critical")),
+            )
+        return cursor.lastrowid
+
+    def get(self, report_id):
+        row = self.conn.execute("SELECT * FROM reports WHERE id = ?", (report_id,)).fetchone()
+        return _to_item(row, full=True) if row else None
+
+    def query(self, offset=0, limit=50, sort="score", order="asc", priority=None,
+              min_score=None, max_score=None, npi=None, since=None):
+        """
+        One page of reports plus the total matching the filters.
+        """
+        if sort not in SORT_COLUMNS:
+            raise ValueError(f"Unknown sort key {sort!r} (expected one of {sorted(SORT_COLUMNS)})")
+        direction = "DESC" if order == "desc" else "ASC"
+
+        where, params = [], []
+        if priority:
+            # The rank is indexed, the label is not
+            if priority not in PRIORITY_RANK:
+                raise ValueError(f"Unknown priority {priority!r} (expected one of {sorted(PRIORITY_RANK)})")
+            where.append("priority_rank = ?")
+            params.append(PRIORITY_RANK[priority])
+        if min_score is not None:
+            where.append("score >= ?")
+            params.append(min_score)
+        if max_score is not None:
+            where.append("score <= ?")
+            params.append(max_score)
+        if npi:
+            where.append("npi = ?")
+            params.append(str(npi))
+        if since is not None:
+            where.append("created_at >= ?")
+            params.append(since)
+        clause = f" WHERE {' AND '.join(where)}" if where else ""
+
+        total = self.conn.execute(f"SELECT COUNT(*) FROM reports{clause}", params).fetchone()[0]
+        rows = self.conn.execute(
+            f"SELECT id, created_at, source, npi, provider_name, official_name, score, priority, mismatch_count"
+            f" FROM reports{clause} ORDER BY {SORT_COLUMNS[sort]} {direction}, id {direction} LIMIT ? OFFSET ?",
+            params + [limit, offset],
+        ).fetchall()
+        return {"total": total, "items": [_to_item(row) for row in rows]}
+
+    def summary(self):
+        """
+        Dashboard totals from the per-day aggregates (a handful of rows).
+        """
+        totals = self.conn.execute(
+            "SELECT COALESCE(SUM(reports), 0) AS reports, COALESCE(SUM(score_sum), 0) AS score_sum,"
+            " COALESCE(SUM(critical), 0) AS critical FROM report_daily"
+        ).fetchone()
+        today = self.conn.execute(
+            "SELECT reports, score_sum, critical FROM report_daily WHERE day = ?",
+            (time.strftime("%Y-%m-%d"),),
+        ).fetchone()
+        average = round(totals["score_sum"] / totals["reports"], 1) if totals["reports"] else None
+        today_average = round(today["score_sum"] / today["reports"], 1) if today else None
+        return {
+            "reports": totals["reports"],
+            "reports_today": today["reports"] if today else 0,
+            "avg_score": average,
+            "avg_score_today": today_average,
+            "critical": totals["critical"],
+            "critical_today": today["critical"] if today else 0,
+        }
+
+    def latest_per_npi(self, after="", limit=100):
+        """
+        The newest report of each NPI, in NPI order after `after` (keyset
+        paging over the NPI index, used by the re-validation scheduler).
+        """
+        return self.conn.execute(
+            "SELECT npi, MAX(id) AS id, MAX(created_at) AS created_at FROM reports"
+            " WHERE npi > ? GROUP BY npi ORDER BY npi LIMIT ?",
+            (after or "", limit),
+        ).fetchall()
+
+    def rescore(self, rules, chunk_size=250000):
+        """
+        Re-evaluates every stored report with a RuleSet, vectorized one chunk
+        at a time from the stored columns (no pipeline, no network). Only rows
+        whose outcome changed are written (and stamped with the new rules
+        version); the daily aggregates are then rebuilt.
+        """
+        selects = [source_select(s) for s in rules.sources]
+        rescored = changed = 0
+        last_id = 0
+        while True:
+            rows = self.conn.execute(
+                f"SELECT id, score, priority, mismatches, {', '.join(selects)} FROM reports"
+                f" WHERE id > ? ORDER BY id LIMIT {int(chunk_size)}",
+                (last_id,),
+            ).fetchall()
+            if not rows:
+                break
+            last_id = rows[-1][0]
+            ids, old_scores, old_priorities, old_mismatches, *inputs = zip(*rows)
+            result = rules.evaluate_frame(dict(zip(rules.sources, inputs)))
+
+            scores = result["score"].to_numpy()
+            priorities = result["priority"].to_numpy()
+            mismatches = result["mismatches"].tolist()
+            serialized = np.array([json.dumps(m) for m in mismatches], dtype=object)
+            differs = (
+                (scores != np.asarray(old_scores))
+                | (priorities != np.asarray(old_priorities, dtype=object))
+                | (serialized != np.asarray(old_mismatches, dtype=object))  # reworded messages
+            )
+
+            ranks = result["priority_rank"].to_numpy()
+            updates = [
+                (int(scores[i]), priorities[i], int(ranks[i]), len(mismatches[i]), serialized[i], rules.version, ids[i])
+                for i in np.flatnonzero(differs)
+            ]
+            with self.lock, transaction(self.conn):
+                self.conn.executemany(
+                    "UPDATE reports SET score = ?, priority = ?, priority_rank = ?, mismatch_count = ?,"
+                    " mismatches = ?, rules_version = ? WHERE id = ?",
+                    updates,
+                )
+            rescored += len(rows)
+            changed += len(updates)
+
+        with self.lock, transaction(self.conn):
+            self.conn.execute("DELETE FROM report_daily")
+            self.conn.execute(
+                "INSERT INTO report_daily (day, reports, score_sum, critical)"
+                " SELECT date(created_at, 'unixepoch', 'localtime'), COUNT(*), SUM(score),"
+                " SUM(priority = 'Critical') FROM reports GROUP BY 1"
+            )
+        return {"rules_version": rules.version, "rescored": rescored, "changed": changed}
+
+    def stats(self):
+        return {"db_path": self.db_path, **self.summary()}
+
+
+def source_select(source):
+    """
+    SQL expression reading one rule source: its column, else the JSON report.
+    """
+    return SOURCE_COLUMNS.get(source) or f"json_extract(report, '$.{source}')"
+
+def _to_row(report, source, created_at):
+    extracted = report.get("extracted") or {}
+    official = report.get("official") or {}
+    license_data = report.get("state_board") or {}
+    matching = report.get("matching") or {}
+    result = report["validation_result"]
+    return (
+        created_at,
+        source,
+        str(extracted.get("npi_number")) if extracted.get("npi_number") else None,
+        extracted.get("provider_name"),
+        official.get("official_name"),
+        extracted.get("phone_number"),
+        official.get("official_phone"),
+        license_data.get("state_license_status"),
+        matching.get("name_similarity"),
+        matching.get("duplicate_count"),
+        int(result["score"]),
+        result["priority"],
+        PRIORITY_RANK.get(result["priority"], len(PRIORITY_RANK)),
+        len(result.get("mismatches", [])),
+        json.dumps(result.get("mismatches", [])),
+        result.get("rules_version"),
+        json.dumps(report, default=str),
+    )
+
+def _to_item(row, full=False):
+    item = {
+        "id": row["id"],
+        "created_at": row["created_at"],
+        "source": row["source"],
+        "npi": row["npi"],
+        "provider_name": row["provider_name"],
+        "official_name": row["official_name"],
+        "score": row["score"],
+        "priority": row["priority"],
+        "mismatch_count": row["mismatch_count"],
+    }
+    if full:
+        item["report"] = json.loads(row["report"])
+        # The columns are authoritative: they are updated when reports are rescored
+        if row["mismatches"] is not None:
+            item["report"]["validation_result"] = {
+                "score": row["score"],
+                "priority": row["priority"],
+                "mismatches": json.loads(row["mismatches"]),
+                "rules_version": row["rules_version"],
+            }
+    return item
@@ -0,0 +1,312 @@
+import os
+import json
+import time
+import uuid
+import socket
+import asyncio
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from .data_validation_agent import npi_checksum_ok
+from .http_client import TokenBucket
+from .storage import connect, data_path, transaction
+from .telemetry import REVALIDATIONS, get_logger, new_trace
+
+logger = get_logger("revalidation")
+
+# Official fields that trigger a new QA pass when they change
+WATCHED_FIELDS = {
+    "official": ("official_name", "official_phone", "official_address", "status"),
+    "state_board": ("state_license_status",),
+}
+
+class RevalidationScheduler:
+    """
+    Background re-validation of directory entries whose last verification is
+    older than `max_age` seconds. Walks the report store one batch of NPIs at
+    a time (the cursor is checkpointed, so a restart resumes where it left
+    off) and re-checks the NPI Registry and the state board within a rate
+    budget per upstream. Only entries whose official data changed get a new,
+    re-scored report; the others just get a new verification time.
+
+    Every API worker runs a scheduler, but only the holder of the lease on
+    the checkpoint walks the directory, so the cursor has one writer and the
+    per-upstream budgets apply to the deployment rather than each process.
+    """
+    def __init__(self, manager, db_path=None, max_age=None, batch_size=None, interval=None, budgets=None, workers=None):
+        self.manager = manager
+        self.db_path = db_path or os.getenv("REVALIDATE_DB_PATH") or data_path("revalidation.sqlite")
+        self.max_age = max_age if max_age is not None else float(os.getenv("REVALIDATE_MAX_AGE", str(30 * 86400)))
+        self.batch_size = batch_size or int(os.getenv("REVALIDATE_BATCH", "100"))
+        # Pause between passes over the directory (0 disables the background loop)
+        self.interval = interval if interval is not None else float(os.getenv("REVALIDATE_INTERVAL", "3600"))
+        # Lookups per second the background walk may spend per upstream; uploads keep the rest
+        self.rates = budgets or {
+            "npi_registry": float(os.getenv("REVALIDATE_NPI_RATE", "2")),
+            "state_license": float(os.getenv("REVALIDATE_LICENSE_RATE", "50")),
+        }
+        self.budgets = {name: TokenBucket(rate, int(rate)) for name, rate in self.rates.items()}
+        # A pass is abandoned to another process when its holder stops renewing the lease
+        self.lease_ttl = float(os.getenv("REVALIDATE_LEASE_SECONDS", "600"))
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.pool = ThreadPoolExecutor(max_workers=workers or int(os.getenv("REVALIDATE_WORKERS", "4")), thread_name_prefix="revalidate")
+        self.task = None
+        self.lock = threading.Lock()
+        self.conn = connect(self.db_path)
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS verifications (
+                npi TEXT PRIMARY KEY,
+                verified_at REAL NOT NULL,
+                report_id INTEGER
+            ) WITHOUT ROWID;
+            CREATE TABLE IF NOT EXISTS checkpoint (
+                name TEXT PRIMARY KEY,
+                value TEXT NOT NULL
+            ) WITHOUT ROWID;
+        """)
+
+    async def start(self):
+        if self.interval > 0:
+            self.task = asyncio.create_task(self._loop())
+
+    async def stop(self):
+        if self.task:
+            self.task.cancel()
+            await asyncio.gather(self.task, return_exceptions=True)
+            self.task = None
+        await asyncio.to_thread(self.release)
+
+    def run_pass(self):
+        """
+        Runs (or finishes, after a restart) one full pass. Returns its summary,
+        or None when another process holds the lease.
+        """
+        if not self._acquire():
+            return None
+        while self.run_batch():
+            pass
+        return self._load("last_pass")
+
+    def run_batch(self):
+        """
+        One checkpointed step over the next `batch_size` NPIs after the cursor.
+        Returns False once the pass is complete (the cursor is then reset) or
+        when another process holds the lease.
+        """
+        started = time.perf_counter()
+        with self.lock:
+            if not self._acquire():
+                return False
+            cursor = self._load("cursor") or ""
+            progress = self._load("progress") or _new_progress()
+            entries = self.manager.reports.latest_per_npi(after=cursor, limit=self.batch_size)
+            if not entries:
+                self._finish_pass(progress)
+                return False
+
+            now = time.time()
+            verified = self._verified_at([row["npi"] for row in entries])
+            stale = [row for row in entries if max(row["created_at"], verified.get(row["npi"], 0)) < now - self.max_age]
+            progress["skipped"] += len(entries) - len(stale)
+
+            updates = []
+            if stale:
+                npis = [row["npi"] for row in stale]
+                officials = list(self.pool.map(self._fetch_official, npis))
+                licenses = self._fetch_licenses(npis)
+                for row, (official, source) in zip(stale, officials):
+                    progress["sources"][source] = progress["sources"].get(source, 0) + 1
+                    outcome, report_id = self._revalidate(row, official, licenses[row["npi"]])
+                    progress[outcome] += 1
+                    REVALIDATIONS.labels(outcome).inc()
+                    if outcome != "errors":
+                        updates.append((row["npi"], now, report_id))
+
+            progress["busy_seconds"] += time.perf_counter() - started
+            # Verification times and the cursor move together, so a restart never skips or repeats work.
+            # A batch that outlived its lease is dropped; the new holder re-checks those entries.
+            with transaction(self.conn, immediate=True):
+                if not self._holds_lease():
+                    logger.warning("revalidation lease lost, batch discarded", extra={"owner": self.owner})
+                    return False
+                self.conn.executemany(
+                    "INSERT OR REPLACE INTO verifications (npi, verified_at, report_id) VALUES (?, ?, ?)", updates
+                )
+                self._save("cursor", entries[-1]["npi"])
+                self._save("progress", progress)
+            return True
+
+    def stats(self):
+        progress = self._load("progress") or _new_progress()
+        npi_rate = self.rates.get("npi_registry")
+        return {
+            "max_age_seconds": self.max_age,
+            "cursor": self._load("cursor"),
+            "current_pass": dict(progress, records_per_hour=_records_per_hour(progress)),
+            "last_pass": self._load("last_pass"),
+            # Upper bound when every stale entry needs a live registry lookup
+            "budget_records_per_hour": round(npi_rate * 3600) if npi_rate else None,
+            "budgets": self.rates,
+            "lease": self._load("lease"),
+        }
+
+    def release(self):
+        """
+        Gives up the lease (if held) so another process can continue the pass.
+        """
+        with self.lock, transaction(self.conn, immediate=True):
+            if self._holds_lease():
+                self.conn.execute("DELETE FROM checkpoint WHERE name = 'lease'")
+
+    async def _loop(self):
+        while True:
+            new_trace(f"revalidate-{int(time.time())}")
+            try:
+                more = await asyncio.to_thread(self.run_batch)
+            except Exception:
+                logger.exception("revalidation batch failed")
+                more = False
+            if not more:
+                await asyncio.sleep(self.interval)
+
+    def _fetch_official(self, npi):
+        """
+        Fresh registry data for one NPI: local NPPES copy, then a fresh cache
+        entry (an upload already paid for it), then the live registry within
+        the background budget. Returns (official, source).
+        """
+        validator = self.manager.validator
+        if len(npi) != 10 or not npi.isdigit() or not npi_checksum_ok(npi):
+            return validator.validate_npi(npi), "local"
+        if validator.nppes_store:
+            record = validator.nppes_store.lookup(npi)
+            if record:
+                return record, "nppes"
+        value, state = validator.npi_cache.get(npi)
+        if state == "fresh":
+            return value, "cache"
+
+        self.budgets["npi_registry"].acquire()
+        official = validator.query_registry(npi)
+        if "error" not in official:
+            validator.npi_cache.set(npi, official, negative=official.get("status") == "Not Found")
+        return official, "registry"
+
+    def _fetch_licenses(self, npis):
+        bucket = self.budgets["state_license"]
+        for _ in npis:
+            bucket.acquire()
+        # One bulk lookup for the whole batch
+        return self.manager.validator.check_state_licenses(npis)
+
+    def _revalidate(self, entry, official, license_data):
+        """
+        Compares fresh official data with the entry's last report and writes
+        a re-scored report if anything changed. Returns (outcome, report_id).
+        """
+        if "error" in official or license_data.get("state_license_status") == "Error":
+            return "errors", None
+        stored = self.manager.reports.get(entry["id"])
+        report = stored["report"]
+        fresh = {"official": official, "state_board": license_data}
+        changes = {
+            f"{section}.{field}": [(report.get(section) or {}).get(field), fresh[section].get(field)]
+            for section, fields in WATCHED_FIELDS.items()
+            for field in fields
+            if (report.get(section) or {}).get(field) != fresh[section].get(field)
+        }
+        if not changes:
+            return "unchanged", entry["id"]
+
+        extracted = report.get("extracted") or {}
+        matching = self.manager.match_provider(extracted, official, report.get("web_enrichment"))
+        updated = self.manager.perform_quality_assurance(
+            extracted, official, license_data, report.get("web_enrichment") or {}, matching
+        )
+        updated["revalidation"] = {"previous_report_id": entry["id"], "changes": changes}
+        # Through the manager, so a newly verified provider reaches the duplicate and location indexes
+        report_id = self.manager.record(updated, stored["source"])
+        logger.info("directory entry changed", extra={
+            "npi": entry["npi"], "report_id": report_id, "changes": sorted(changes),
+            "score": updated["validation_result"]["score"],
+        })
+        return "changed", report_id
+
+    def _acquire(self):
+        """
+        Takes or renews the lease on the checkpoint. False while another
+        process holds an unexpired one.
+        """
+        now = time.time()
+        with transaction(self.conn, immediate=True):
+            lease = self._load("lease")
+            if lease and lease["owner"] != self.owner and lease["expires_at"] > now:
+                return False
+            self._save("lease", {"owner": self.owner, "expires_at": now + self.lease_ttl})
+        return True
+
+    def _holds_lease(self):
+        lease = self._load("lease")
+        return bool(lease) and lease["owner"] == self.owner
+
+    def _verified_at(self, npis):
+        marks = ",".join("?" * len(npis))
+        return {
+            row["npi"]: row["verified_at"]
+            for row in self.conn.execute(f"SELECT npi, verified_at FROM verifications WHERE npi IN ({marks})", npis)
+        }
+
+    def _finish_pass(self, progress):
+        summary = dict(progress, finished_at=time.time(), records_per_hour=_records_per_hour(progress))
+        with transaction(self.conn, immediate=True):
+            if not self._holds_lease():
+                return
+            self._save("last_pass", summary)
+            self._save("cursor", "")
+            self._save("progress", _new_progress())
+            self.conn.execute("DELETE FROM checkpoint WHERE name = 'lease'")
+        logger.info("revalidation pass complete", extra={
+            k: summary[k] for k in ("unchanged", "changed", "errors", "skipped", "records_per_hour")
+        })
+
+    def _load(self, name):
+        row = self.conn.execute("SELECT value FROM checkpoint WHERE name = ?", (name,)).fetchone()
+        return json.loads(row["value"]) if row else None
+
+    def _save(self, name, value):
+        self.conn.execute("INSERT OR REPLACE INTO checkpoint (name, value) VALUES (?, ?)", (name, json.dumps(value)))
+
+
+def _new_progress():
+    return {
+        "started_at": time.time(), "unchanged": 0, "changed": 0, "errors": 0, "skipped": 0,
+        "sources": {}, "busy_seconds": 0.0,
+    }
+
+def _records_per_hour(progress):
+    checked = progress["unchanged"] + progress["changed"] + progress["errors"]
+    return round(checked / progress["busy_seconds"] * 3600) if progress["busy_seconds"] else None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Re-check stale directory entries (resumes from the last checkpoint).")
+    parser.add_argument("--max-age", type=float, help="Re-check entries verified longer ago than this many seconds")
+    parser.add_argument("--batch-size", type=int)
+    args = parser.parse_args()
+
+    from .directory_management_agent import DirectoryManagementAgent
+
+    scheduler = RevalidationScheduler(DirectoryManagementAgent(), max_age=args.max_age, batch_size=args.batch_size)
+    summary = scheduler.run_pass()
+    if summary is None:
+        lease = scheduler.stats()["lease"] or {}
+        print(f"⏳ Another process ({lease.get('owner', 'unknown')}) is running a pass; try again later")
+        return
+    print(f"🔁 Re-validated {summary['unchanged'] + summary['changed']} entries "
+          f"({summary['changed']} changed, {summary['errors']} errors, {summary['skipped']} still fresh)")
+    print(f"⏱️ {summary['records_per_hour']} records/hour (budget allows {scheduler.stats()['budget_records_per_hour']})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,379 @@
+import os
+import json
+import math
+import time
+import argparse
+import threading
+
+import numpy as np
+
+from .data_validation_agent import registry_verified
+from .geocoding import parse_coordinates
+from .matching import phone_digits
+from .storage import connect, data_path, transaction
+
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE = math.pi * EARTH_RADIUS_KM / 180  # one degree of latitude
+# Cell ranges per statement (SQLite turns the ORed BETWEENs into index range scans)
+RANGES_PER_QUERY = 200
+# Slack (degrees) so float rounding never drops a point lying on the circle
+EPSILON_DEGREES = 1e-9
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    a = (math.sin((phi2 - phi1) / 2) ** 2
+         + math.cos(phi1) * math.cos(phi2) * math.sin(math.radians(lon2 - lon1) / 2) ** 2)
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+def half_width(lat0, lat, radius_km):
+    """
+    Half the longitude span (degrees) of the circle of `radius_km` around
+    latitude `lat0` where it crosses latitude `lat`; None if it does not.
+    """
+    cos_d = math.cos(radius_km / EARTH_RADIUS_KM)
+    phi0, phi = math.radians(lat0), math.radians(lat)
+    denominator = math.cos(phi0) * math.cos(phi)
+    if denominator < 1e-12:
+        return 180.0 if abs(lat - lat0) * KM_PER_DEGREE <= radius_km else None
+    x = (cos_d - math.sin(phi0) * math.sin(phi)) / denominator
+    if x > 1:
+        return None
+    return math.degrees(math.acos(max(-1.0, x)))
+
+
+class SpatialIndex:
+    """
+    Validated practice locations (one per NPI) on a fixed lat/lon grid in
+    SQLite. A location's key is its grid cell (row * columns + column), so the
+    cells covering a query circle are a few index ranges per grid row.
+    Per-cell counts let radius totals skip cells lying entirely inside the
+    circle; only providers in cells straddling its edge are distance-checked,
+    straight from the covering (cell, lat, lon) index. Updated as reports
+    arrive, like the duplicate index.
+    """
+    def __init__(self, db_path=None, cell_degrees=None, max_radius_km=None, colocated_meters=None):
+        self.db_path = db_path or os.getenv("SPATIAL_DB_PATH") or data_path("locations.sqlite")
+        self.max_radius_km = max_radius_km or float(os.getenv("SPATIAL_MAX_RADIUS_KM", "500"))
+        self.colocated_meters = colocated_meters or float(os.getenv("SPATIAL_COLOCATED_METERS", "50"))
+        self.conn = connect(self.db_path)
+        self.lock = threading.Lock()
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS locations (
+                npi TEXT PRIMARY KEY,
+                cell INTEGER NOT NULL,
+                lat REAL NOT NULL,
+                lon REAL NOT NULL,
+                provider_name TEXT,
+                phone TEXT,
+                address TEXT,
+                report_id INTEGER,
+                updated_at REAL NOT NULL
+            ) WITHOUT ROWID;
+            CREATE INDEX IF NOT EXISTS idx_locations_cell ON locations(cell, lat, lon);
+            CREATE TABLE IF NOT EXISTS cell_counts (
+                cell INTEGER PRIMARY KEY,
+                size INTEGER NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS settings (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL
+            ) WITHOUT ROWID;
+        """)
+        # The grid size is fixed when the index is created (cells are stored keys)
+        requested = str(cell_degrees or float(os.getenv("SPATIAL_CELL_DEGREES", "0.01")))
+        self.conn.execute("INSERT OR IGNORE INTO settings (key, value) VALUES ('cell_degrees', ?)", (requested,))
+        self.cell_degrees = float(self.conn.execute("SELECT value FROM settings WHERE key = 'cell_degrees'").fetchone()[0])
+        self.columns = math.ceil(360 / self.cell_degrees)
+        self.rows = math.ceil(180 / self.cell_degrees)
+
+    def add(self, npi, lat, lon, provider_name=None, phone=None, address=None, report_id=None):
+        """
+        Adds or moves (same NPI) one provider. Returns False without a usable NPI or point.
+        """
+        return self.add_many([(npi, lat, lon, provider_name, phone, address, report_id)]) == 1
+
+    def add_many(self, entries):
+        """
+        Bulk upsert of (npi, lat, lon, provider_name, phone, address, report_id)
+        tuples in one transaction (rebuilds, benchmarks). Returns rows written.
+        """
+        now = time.time()
+        # Last entry wins when a batch moves the same NPI twice
+        rows = list({
+            str(npi): (str(npi), self._cell(lat, lon), lat, lon, provider_name, phone_digits(phone), address, report_id, now)
+            for npi, lat, lon, provider_name, phone, address, report_id in entries
+            if npi and _valid_point(lat, lon)
+        }.values())
+        with self.lock, transaction(self.conn):
+            moved = []
+            for start in range(0, len(rows), 500):
+                npis = [row[0] for row in rows[start:start + 500]]
+                moved += self.conn.execute(
+                    f"SELECT cell FROM locations WHERE npi IN ({','.join('?' * len(npis))})", npis
+                ).fetchall()
+            self.conn.executemany("UPDATE cell_counts SET size = size - 1 WHERE cell = ?", moved)
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO locations (npi, cell, lat, lon, provider_name, phone, address, report_id, updated_at)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+            self.conn.executemany(
+                "INSERT INTO cell_counts (cell, size) VALUES (?, 1) ON CONFLICT(cell) DO UPDATE SET size = size + 1",
+                [(row[1],) for row in rows],
+            )
+        return len(rows)
+
+    def within(self, lat, lon, radius_km, limit=50):
+        """
+        Providers within `radius_km` of a point: the total and the `limit` nearest.
+        """
+        self._check_query(lat, lon, radius_km)
+        inner, boundary = self._spans(lat, lon, radius_km)
+        total = self._count(inner) + len(self._scan(boundary, lat, lon, radius_km))
+        return {"total": total, "items": self._details(self._nearest(lat, lon, limit, radius_km))}
+
+    def nearest(self, lat, lon, k=10, exclude_npi=None):
+        """
+        The k nearest providers (up to max_radius_km away).
+        """
+        self._check_query(lat, lon)
+        return self._details(self._nearest(lat, lon, k, self.max_radius_km, exclude_npi))
+
+    def colocated(self, lat, lon, exclude_npi=None, phone=None):
+        """
+        Other NPIs within colocated_meters of a point. Providers sharing the
+        given phone number are counted as one practice (`related`); the rest
+        are `unrelated`.
+        """
+        if not _valid_point(lat, lon):
+            return {"unrelated": 0, "related": 0, "npis": []}
+        found = self._candidates(lat, lon, self.colocated_meters / 1000, exclude_npi)
+        phone = phone_digits(phone)
+        related = unrelated = 0
+        npis = []
+        for item in self._details(found):
+            if phone and item["phone"] == phone:
+                related += 1
+            else:
+                unrelated += 1
+                npis.append(item["npi"])
+        return {"unrelated": unrelated, "related": related, "npis": npis[:20]}
+
+    def stats(self):
+        locations = self.conn.execute("SELECT COUNT(*) FROM locations").fetchone()[0]
+        return {
+            "locations": locations,
+            "cell_degrees": self.cell_degrees,
+            "max_radius_km": self.max_radius_km,
+            "colocated_meters": self.colocated_meters,
+        }
+
+    def _cell(self, lat, lon):
+        row = min(self.rows - 1, int((lat + 90) // self.cell_degrees))
+        column = int((lon + 180) // self.cell_degrees) % self.columns
+        return row * self.columns + column
+
+    def _check_query(self, lat, lon, radius_km=None):
+        if not _valid_point(lat, lon):
+            raise ValueError("lat must be within [-90, 90] and lon within [-180, 180]")
+        if radius_km is not None and not 0 < radius_km <= self.max_radius_km:
+            raise ValueError(f"radius_km must be within (0, {self.max_radius_km:g}]")
+
+    def _spans(self, lat, lon, radius_km):
+        """
+        Grid cells covering the circle, as (inner, boundary) lists of
+        (first_cell, last_cell) ranges: inner cells lie entirely inside the
+        circle, boundary cells straddle its edge. Per grid row the circle's
+        exact longitude span is used, not its bounding box.
+        """
+        dlat = radius_km / KM_PER_DEGREE
+        first_row = max(0, int((lat - dlat + 90) // self.cell_degrees))
+        last_row = min(self.rows - 1, int((lat + dlat + 90) // self.cell_degrees))
+        # Latitude where the circle is widest (slightly poleward of its centre)
+        widest = math.degrees(math.asin(max(-1.0, min(1.0,
+            math.sin(math.radians(lat)) / math.cos(radius_km / EARTH_RADIUS_KM)))))
+        inner, boundary = [], []
+        for row in range(first_row, last_row + 1):
+            south = row * self.cell_degrees - 90
+            north = south + self.cell_degrees
+            # Half-width over the row: largest at the widest latitude or a clipped edge, smallest at an edge
+            edges = [half_width(lat, max(south, lat - dlat), radius_km), half_width(lat, min(north, lat + dlat), radius_km)]
+            if south <= widest <= north:
+                edges.append(half_width(lat, widest, radius_km))
+            outer = max([w for w in edges if w is not None], default=0.0) + EPSILON_DEGREES
+            first_col = int((lon - outer + 180) // self.cell_degrees)
+            last_col = int((lon + outer + 180) // self.cell_degrees)
+            south_width, north_width = half_width(lat, south, radius_km), half_width(lat, north, radius_km)
+            core = None
+            if south_width is not None and north_width is not None:
+                width = min(south_width, north_width) - EPSILON_DEGREES
+                core = (math.ceil((lon - width + 180) / self.cell_degrees), math.floor((lon + width + 180) / self.cell_degrees) - 1)
+            base = row * self.columns
+            if core and core[0] <= core[1] and core[1] - core[0] + 1 < self.columns:
+                inner += [(base + a, base + b) for a, b in self._wrap(*core)]
+                edges = [(first_col, core[0] - 1), (core[1] + 1, last_col)]
+            elif core and core[0] <= core[1]:
+                inner.append((base, base + self.columns - 1))
+                edges = []
+            else:
+                edges = [(first_col, last_col)]
+            boundary += [(base + a, base + b) for first, last in edges if first <= last for a, b in self._wrap(first, last)]
+        return inner, boundary
+
+    def _wrap(self, first_col, last_col):
+        """
+        Column span -> spans inside [0, columns), split at the antimeridian.
+        """
+        if last_col - first_col + 1 >= self.columns:
+            return [(0, self.columns - 1)]
+        if first_col < 0:
+            return [(first_col % self.columns, self.columns - 1), (0, last_col)] if last_col >= 0 else [(first_col % self.columns, last_col % self.columns)]
+        if last_col >= self.columns:
+            return [(first_col, self.columns - 1), (0, last_col % self.columns)] if first_col < self.columns else [(first_col % self.columns, last_col % self.columns)]
+        return [(first_col, last_col)]
+
+    def _count(self, ranges):
+        total = 0
+        for start in range(0, len(ranges), RANGES_PER_QUERY):
+            chunk = ranges[start:start + RANGES_PER_QUERY]
+            where = " OR ".join(["cell BETWEEN ? AND ?"] * len(chunk))
+            total += self.conn.execute(
+                f"SELECT COALESCE(SUM(size), 0) FROM cell_counts WHERE {where}", [b for span in chunk for b in span]
+            ).fetchone()[0]
+        return total
+
+    def _scan(self, ranges, lat, lon, radius_km, exclude_npi=None):
+        """
+        (npi, lat, lon, distance_km) of the providers in `ranges` within
+        radius_km, read from the covering index only.
+        """
+        rows = []
+        for start in range(0, len(ranges), RANGES_PER_QUERY):
+            chunk = ranges[start:start + RANGES_PER_QUERY]
+            where = " OR ".join(["cell BETWEEN ? AND ?"] * len(chunk))
+            rows += self.conn.execute(
+                f"SELECT npi, lat, lon FROM locations INDEXED BY idx_locations_cell WHERE {where}",
+                [b for span in chunk for b in span],
+            ).fetchall()
+        if not rows:
+            return []
+        npis, lats, lons = zip(*rows)
+        distances = _distances_km(lat, lon, np.array(lats), np.array(lons))
+        exclude = str(exclude_npi) if exclude_npi else None
+        return [
+            (npis[i], lats[i], lons[i], float(distances[i]))
+            for i in np.flatnonzero(distances <= radius_km)
+            if npis[i] != exclude
+        ]
+
+    def _candidates(self, lat, lon, radius_km, exclude_npi=None):
+        inner, boundary = self._spans(lat, lon, radius_km)
+        return self._scan(inner + boundary, lat, lon, radius_km, exclude_npi)
+
+    def _nearest(self, lat, lon, k, max_radius_km, exclude_npi=None):
+        """
+        The k nearest within max_radius_km, nearest first. The search radius
+        starts at one cell and doubles until the circle holds k providers, so
+        dense areas cost no more than sparse ones.
+        """
+        radius = min(max_radius_km, self.cell_degrees * KM_PER_DEGREE)
+        while True:
+            found = self._candidates(lat, lon, radius, exclude_npi)
+            if len(found) >= k or radius >= max_radius_km:
+                break
+            radius = min(max_radius_km, radius * 2)
+        found.sort(key=lambda c: c[3])
+        return found[:k]
+
+    def _details(self, found):
+        if not found:
+            return []
+        marks = ",".join("?" * len(found))
+        rows = {
+            row["npi"]: row
+            for row in self.conn.execute(
+                f"SELECT npi, provider_name, phone, address, report_id FROM locations WHERE npi IN ({marks})",
+                [c[0] for c in found],
+            )
+        }
+        return [
+            {
+                "npi": npi,
+                "provider_name": rows[npi]["provider_name"],
+                "phone": rows[npi]["phone"],
+                "address": rows[npi]["address"],
+                "report_id": rows[npi]["report_id"],
+                "lat": lat,
+                "lon": lon,
+                "distance_km": round(distance, 4),
+            }
+            for npi, lat, lon, distance in found
+            if npi in rows
+        ]
+
+
+def _distances_km(lat, lon, lats, lons):
+    phi1, phi2 = np.radians(lat), np.radians(lats)
+    a = np.sin((phi2 - phi1) / 2) ** 2 + np.cos(phi1) * np.cos(phi2) * np.sin(np.radians(lons - lon) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.minimum(1.0, np.sqrt(a)))
+
+def _valid_point(lat, lon):
+    return (
+        isinstance(lat, (int, float)) and isinstance(lon, (int, float))
+        and -90 <= lat <= 90 and -180 <= lon <= 180
+    )
+
+def report_location(report):
+    """
+    (lat, lon) from a report's enrichment stage; older reports only carry the
+    "lat, lon" string.
+    """
+    web = report.get("web_enrichment") or {}
+    if web.get("latitude") is not None and web.get("longitude") is not None:
+        return web["latitude"], web["longitude"]
+    return parse_coordinates(web["coordinates"]) if web.get("coordinates") else None
+
+def indexed_location(report):
+    """
+    The point a report is indexed under, or None. Only verified practice
+    locations of registry-verified NPIs count, so "Not Found" or checksum
+    failures never inflate co-location counts.
+    """
+    if not registry_verified(report.get("official")):
+        return None
+    if (report.get("web_enrichment") or {}).get("verified_location") is not True:
+        return None
+    return report_location(report)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rebuild the provider location index from the stored reports.")
+    parser.add_argument("--reports-db", help="Report store (default: REPORT_DB_PATH or DATA_DIR/reports.sqlite)")
+    parser.add_argument("--db", help="Location index (default: SPATIAL_DB_PATH or DATA_DIR/locations.sqlite)")
+    parser.add_argument("--batch-size", type=int, default=50000)
+    args = parser.parse_args()
+
+    from .report_store import ReportStore
+
+    reports = ReportStore(args.reports_db)
+    index = SpatialIndex(args.db)
+    started = time.perf_counter()
+    count = 0
+    batch = []
+    # Oldest first, so each NPI ends up at its latest validated location
+    for row in reports.conn.execute("SELECT id, report FROM reports ORDER BY id"):
+        report = json.loads(row["report"])
+        point = indexed_location(report)
+        extracted = report.get("extracted") or {}
+        if point and extracted.get("npi_number"):
+            batch.append((extracted["npi_number"], *point, extracted.get("provider_name"),
+                          extracted.get("phone_number"), extracted.get("address"), row["id"]))
+        if len(batch) >= args.batch_size:
+            count += index.add_many(batch)
+            batch = []
+    count += index.add_many(batch)
+    print(f"📍 Indexed {count} located reports ({index.stats()['locations']} providers) in {time.perf_counter() - started:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,42 @@
+import os
+import sqlite3
+from contextlib import contextmanager
+
+# Every local store (jobs, caches, indexes) lives under one data directory
+DATA_DIR = os.getenv("DATA_DIR", os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data"))
+
+def data_path(*parts):
+    """
+    Returns a path inside DATA_DIR, creating the parent folder on demand.
+    """
+    path = os.path.join(DATA_DIR, *parts)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    return path
+
+def connect(path):
+    """
+    Opens a SQLite connection tuned for many readers + one writer.
+    Connections are shared across threads, so callers guard writes with a lock.
+    """
+    if path != ":memory:":
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
+
+@contextmanager
+def transaction(conn, immediate=False):
+    """
+    Groups several writes into one commit (connections run in autocommit mode).
+    `immediate` takes the write lock up front, for read-then-write checks that
+    other processes sharing the file must not interleave with.
+    """
+    conn.execute("BEGIN IMMEDIATE" if immediate else "BEGIN")
+    try:
+        yield conn
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
+    conn.execute("COMMIT")
@@ -0,0 +1,161 @@
+import os
+import json
+import time
+import uuid
+import logging
+import contextvars
+from contextlib import contextmanager
+
+from prometheus_client import Counter, Gauge, Histogram
+
+# --- Structured logging ---
+# LOG_LEVEL=WARNING silences all per-document chatter; LOG_FORMAT=text for local dev.
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_FORMAT = os.getenv("LOG_FORMAT", "json")
+
+trace_id_var = contextvars.ContextVar("trace_id", default=None)
+span_var = contextvars.ContextVar("span", default=None)
+
+# Attributes every LogRecord has; anything else came in through `extra=`
+_RESERVED = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime"}
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        payload = {
+            "ts": round(record.created, 3),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        trace_id = trace_id_var.get()
+        if trace_id:
+            payload["trace_id"] = trace_id
+        span = span_var.get()
+        if span:
+            payload["span"] = span
+        payload.update({k: v for k, v in vars(record).items() if k not in _RESERVED})
+        if record.exc_info:
+            payload["exc"] = self.formatException(record.exc_info)
+        return json.dumps(payload, default=str)
+
+def configure_logging():
+    root = logging.getLogger("provider_validator")
+    if root.handlers:
+        return
+    handler = logging.StreamHandler()
+    handler.setFormatter(JsonFormatter() if LOG_FORMAT == "json" else logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s"))
+    root.addHandler(handler)
+    root.setLevel(LOG_LEVEL)
+    root.propagate = False
+
+def get_logger(name):
+    configure_logging()
+    return logging.getLogger(f"provider_validator.{name}")
+
+logger = get_logger("trace")
+
+# --- Prometheus metrics ---
+STAGE_LATENCY = Histogram(
+    "pv_stage_duration_seconds", "Pipeline stage latency", ["stage"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60),
+)
+STAGE_ERRORS = Counter("pv_stage_errors_total", "Pipeline stages that returned or raised an error", ["stage"])
+STAGES_IN_FLIGHT = Gauge("pv_stages_in_flight", "Pipeline stages currently running", ["stage"])
+
+UPSTREAM_LATENCY = Histogram(
+    "pv_upstream_request_duration_seconds", "Outbound call latency per upstream", ["upstream"],
+    buckets=(0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60),
+)
+UPSTREAM_ERRORS = Counter("pv_upstream_errors_total", "Failed outbound calls", ["upstream", "kind"])
+UPSTREAM_THROTTLE = Counter("pv_upstream_throttle_wait_seconds_total", "Time spent waiting on rate limits", ["upstream"])
+
+CACHE_EVENTS = Counter("pv_cache_events_total", "Cache lookups by outcome", ["cache", "outcome"])
+
+REVALIDATIONS = Counter("pv_revalidations_total", "Directory entries re-checked in the background", ["outcome"])
+
+NOTIFICATIONS = Counter("pv_notifications_total", "Outbound email by outcome", ["outcome"])
+NOTIFICATION_QUEUE = Gauge("pv_notification_queue_depth", "Emails waiting in the outbox")
+SMTP_CONNECTIONS = Counter("pv_smtp_connections_total", "Authenticated SMTP sessions opened")
+
+REQUESTS_IN_FLIGHT = Gauge("pv_http_requests_in_flight", "API requests currently being served", ["endpoint"])
+REQUEST_LATENCY = Histogram("pv_http_request_duration_seconds", "API request latency", ["endpoint", "status"])
+
+# Hostnames -> short upstream labels (anything else is labelled by host)
+UPSTREAM_NAMES = {
+    "npiregistry.cms.hhs.gov": "cms_npi_registry",
+    "nominatim.openstreetmap.org": "nominatim",
+}
+
+def upstream_name(hostname):
+    return UPSTREAM_NAMES.get(hostname, hostname or "unknown")
+
+# --- Tracing ---
+def new_trace(trace_id=None):
+    """
+    Starts a trace for the current request/job (propagates into worker threads
+    through contextvars). Returns the trace id.
+    """
+    trace_id = trace_id or uuid.uuid4().hex[:16]
+    trace_id_var.set(trace_id)
+    return trace_id
+
+@contextmanager
+def span(name, **attrs):
+    """
+    Times a unit of work and logs it (DEBUG) with the trace id and attributes.
+    """
+    parent = span_var.get()
+    token = span_var.set(f"{parent}/{name}" if parent else name)
+    started = time.perf_counter()
+    error = None
+    try:
+        yield attrs
+    except BaseException as e:
+        error = repr(e)
+        raise
+    finally:
+        duration = time.perf_counter() - started
+        span_var.reset(token)
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("span", extra={"span_name": name, "duration_ms": round(duration * 1000, 2), "error": error, **attrs})
+
+@contextmanager
+def stage_span(stage):
+    """
+    Span for one pipeline stage, feeding the per-stage latency/error/in-flight metrics.
+    Callers can set result["error"] = True on the yielded dict to count a soft failure.
+    """
+    gauge = STAGES_IN_FLIGHT.labels(stage)
+    gauge.inc()
+    started = time.perf_counter()
+    outcome = {}
+    try:
+        with span(f"stage.{stage}", stage=stage) as attrs:
+            yield outcome
+            attrs["failed"] = bool(outcome.get("error"))
+    except BaseException:
+        outcome["error"] = True
+        raise
+    finally:
+        gauge.dec()
+        STAGE_LATENCY.labels(stage).observe(time.perf_counter() - started)
+        if outcome.get("error"):
+            STAGE_ERRORS.labels(stage).inc()
+
+@contextmanager
+def upstream_call(upstream):
+    """
+    Span + latency/error metrics for one outbound call (one attempt).
+    """
+    started = time.perf_counter()
+    try:
+        with span(f"upstream.{upstream}", upstream=upstream):
+            yield
+    except TimeoutError:
+        UPSTREAM_ERRORS.labels(upstream, "timeout").inc()
+        raise
+    except Exception:
+        UPSTREAM_ERRORS.labels(upstream, "error").inc()
+        raise
+    finally:
+        UPSTREAM_LATENCY.labels(upstream).observe(time.perf_counter() - started)
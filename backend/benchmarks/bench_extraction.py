@@ -0,0 +1,60 @@
+"""
+Offline extraction throughput: text-layer PDFs through the local fast path
+versus the same documents forced through a model client stand-in.
+
+    cd backend && python -m benchmarks.bench_extraction --documents 200 --model-latency 1.5
+"""
+import json
+import time
+import argparse
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+from agents.cache import TieredCache
+from agents.extraction_agent import ExtractionAgent
+from agents.model_clients import LocalStandInModelClient
+from benchmarks.sample_documents import write_samples
+
+def run(agent, paths, workers):
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        results = list(pool.map(agent.process_document, paths))
+    seconds = time.perf_counter() - started
+    return results, {"seconds": round(seconds, 3), "docs_per_second": round(len(paths) / seconds, 1)}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--documents", type=int, default=200)
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--model-latency", type=float, default=1.5, help="Seconds per stand-in model call")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        samples = write_samples(directory, args.documents)
+        paths = [path for path, _ in samples]
+
+        def agent(min_confidence):
+            extractor = ExtractionAgent(None, model_client=LocalStandInModelClient(latency=args.model_latency))
+            extractor.min_local_confidence = min_confidence
+            # Fresh throwaway cache so every document is a miss
+            extractor.cache = TieredCache("bench", ttl=60, db_path=f"{directory}/cache-{min_confidence}.sqlite")
+            return extractor
+
+        tiered = agent(0.8)
+        results, tiered_stats = run(tiered, paths, args.workers)
+        correct = sum(r.get("npi_number") == p["npi_number"] for r, (_, p) in zip(results, samples))
+        tiered_stats.update(tiered.counters, fields_correct=correct)
+
+        model_only = agent(2.0)  # unreachable threshold: everything escalates
+        _, model_stats = run(model_only, paths, args.workers)
+
+    print(json.dumps({
+        "documents": args.documents,
+        "workers": args.workers,
+        "model_latency_seconds": args.model_latency,
+        "tiered": tiered_stats,
+        "model_only": model_stats,
+    }, indent=2))
+
+if __name__ == "__main__":
+    main()
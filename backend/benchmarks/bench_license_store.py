@@ -0,0 +1,91 @@
+"""
+Measures startup time, memory and lookup latency of the license store backends
+on a synthetic state board export.
+
+    cd backend && python -m benchmarks.bench_license_store --records 2000000
+"""
+import os
+import gc
+import json
+import time
+import random
+import argparse
+import tempfile
+import tracemalloc
+
+from agents.license_store import JsonLicenseStore, SqliteLicenseStore
+
+STATUSES = ["Active", "Active", "Active", "Expired", "Suspended"]
+
+def write_exports(directory, records):
+    json_path = os.path.join(directory, "licenses.json")
+    jsonl_path = os.path.join(directory, "licenses.jsonl")
+    npis = [str(1000000000 + i * 7) for i in range(records)]
+    with open(json_path, "w") as fj, open(jsonl_path, "w") as fl:
+        fj.write("{")
+        for i, npi in enumerate(npis):
+            record = {"doctor_name": f"Dr. Provider {i}", "state_license_status": STATUSES[i % len(STATUSES)], "notes": "Synthetic"}
+            fj.write(("," if i else "") + json.dumps(npi) + ":" + json.dumps(record))
+            fl.write(json.dumps(dict(record, npi=npi)) + "\n")
+        fj.write("}")
+    return npis, json_path, jsonl_path
+
+def measure_load(factory):
+    gc.collect()
+    tracemalloc.start()
+    started = time.perf_counter()
+    store = factory()
+    seconds = time.perf_counter() - started
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return store, {"load_seconds": round(seconds, 3), "memory_mb": round(current / 1e6, 1), "peak_memory_mb": round(peak / 1e6, 1)}
+
+def measure_lookups(store, npis, samples, batch):
+    probe = random.sample(npis, min(samples, len(npis)))
+    started = time.perf_counter()
+    for npi in probe:
+        store.lookup(npi)
+    single_us = (time.perf_counter() - started) / len(probe) * 1e6
+
+    started = time.perf_counter()
+    store.lookup_many(probe[:batch])
+    many_ms = (time.perf_counter() - started) * 1e3
+    return {"lookup_us": round(single_us, 2), f"lookup_many_{batch}_ms": round(many_ms, 2)}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--records", type=int, default=1000000)
+    parser.add_argument("--samples", type=int, default=20000)
+    parser.add_argument("--batch", type=int, default=1000)
+    args = parser.parse_args()
+
+    results = {"records": args.records}
+    with tempfile.TemporaryDirectory() as directory:
+        npis, json_path, jsonl_path = write_exports(directory, args.records)
+        results["json_file_mb"] = round(os.path.getsize(json_path) / 1e6, 1)
+
+        def load_json(path):
+            store = JsonLicenseStore(path, check_interval=3600)
+            store.lookup("warmup")  # first lookup triggers the load
+            return store
+
+        for label, path in (("json", json_path), ("jsonl", jsonl_path)):
+            store, stats = measure_load(lambda: load_json(path))
+            stats.update(measure_lookups(store, npis, args.samples, args.batch))
+            results[label] = stats
+            del store
+
+        db_path = os.path.join(directory, "licenses.sqlite")
+        started = time.perf_counter()
+        SqliteLicenseStore(db_path).import_file(jsonl_path)
+        build_seconds = time.perf_counter() - started
+        store, stats = measure_load(lambda: SqliteLicenseStore(db_path))
+        stats.update(measure_lookups(store, npis, args.samples, args.batch))
+        stats["build_seconds"] = round(build_seconds, 2)
+        stats["db_file_mb"] = round(os.path.getsize(db_path) / 1e6, 1)
+        results["sqlite"] = stats
+
+    print(json.dumps(results, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""
+Outbound email throughput against the local SMTP stand-in: the old
+one-session-per-message send versus the outbox sender reusing one session
+per batch (with duplicates, rejected recipients and temporary failures).
+
+    cd backend && python -m benchmarks.bench_notifications --messages 500 --session-latency 0.2
+"""
+import os
+import json
+import time
+import smtplib
+import argparse
+import tempfile
+
+def legacy_send(env, count):
+    """
+    What NotificationAgent did before: connect, log in and quit per message.
+    """
+    started = time.perf_counter()
+    for i in range(count):
+        with smtplib.SMTP(env["SMTP_HOST"], int(env["SMTP_PORT"])) as server:
+            server.login(env["EMAIL_USER"], env["EMAIL_PASS"])
+            server.sendmail(env["EMAIL_USER"], f"legacy{i}@example.com", f"Subject: Notice {i}\r\n\r\nHello")
+    return count / (time.perf_counter() - started)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", type=int, default=500)
+    parser.add_argument("--legacy-messages", type=int, default=50)
+    parser.add_argument("--session-latency", type=float, default=0.2, help="TLS + login cost per SMTP session")
+    parser.add_argument("--error-rate", type=float, default=0.02)
+    parser.add_argument("--duplicates", type=float, default=0.1)
+    args = parser.parse_args()
+
+    from benchmarks.fake_smtp import FakeSmtp
+
+    smtp = FakeSmtp(session_latency=args.session_latency).start()
+    os.environ.update(smtp.env(), DATA_DIR=tempfile.mkdtemp(prefix="bench-notifications-"), NOTIFY_BACKOFF="0")
+    os.environ.setdefault("LOG_LEVEL", "ERROR")
+
+    from agents.notification_agent import NotificationAgent, notice_key
+
+    legacy_rate = legacy_send(smtp.env(), args.legacy_messages)
+    smtp.error_rate = args.error_rate
+
+    agent = NotificationAgent()
+    started = time.perf_counter()
+    outcomes = {}
+    unique = int(args.messages * (1 - args.duplicates))
+    for i in range(args.messages):
+        provider = i % unique
+        domain = "invalid.example" if provider % 100 == 99 else "example.com"
+        result = agent.send_email(
+            f"provider{provider}@{domain}", f"Data discrepancy {provider}", "<p>Please confirm your phone number.</p>",
+            dedupe_key=notice_key(str(provider), ["Phone Discrepancy"], f"provider{provider}@{domain}"),
+        )
+        outcomes[result["status"]] = outcomes.get(result["status"], 0) + 1
+    enqueue_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    while agent.stats()["queued"]:
+        agent.deliver_pending()
+    drain_seconds = time.perf_counter() - started
+    agent.close()
+    smtp.stop()
+
+    stats = agent.stats()
+    print(json.dumps({
+        "legacy_messages_per_second": round(legacy_rate, 1),
+        "enqueue": outcomes,
+        "enqueue_per_second": round(args.messages / enqueue_seconds),
+        "outbox_messages_per_second": round(stats["sent"] / drain_seconds, 1),
+        "outbox": {k: stats[k] for k in ("sent", "retried", "failed", "duplicates", "connections", "batches")},
+        "smtp_server": smtp.stats(),
+    }, indent=2))
+
+if __name__ == "__main__":
+    main()
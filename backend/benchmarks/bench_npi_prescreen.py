@@ -0,0 +1,65 @@
+"""
+Compares the vectorized roster pre-screen with the scalar _luhn_check loop.
+
+    cd backend && python -m benchmarks.bench_npi_prescreen --rows 500000
+"""
+import json
+import time
+import random
+import argparse
+
+from agents.data_validation_agent import DataValidationAgent
+from agents.npi_prescreen import prescreen_npis, summarize
+
+def make_roster(rows, duplicate_ratio):
+    rng = random.Random(42)
+    roster = []
+    for _ in range(rows):
+        r = rng.random()
+        if roster and r < duplicate_ratio:
+            roster.append(rng.choice(roster))
+        elif r < duplicate_ratio + 0.01:
+            roster.append(rng.choice(["", "12345", "ABC1234567", "123456789012"]))
+        else:
+            roster.append(str(rng.randrange(10**9, 10**10)))
+    return roster
+
+def scalar_prescreen(roster):
+    # Same checks validate_npi runs one NPI at a time (no network)
+    luhn_check = DataValidationAgent._luhn_check
+    unique = set()
+    for npi in roster:
+        if len(npi) == 10 and npi.isdigit() and luhn_check(None, npi):
+            unique.add(npi)
+    return unique
+
+def best_of(repeat, func, *args):
+    times = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func(*args)
+        times.append(time.perf_counter() - started)
+    return min(times), result
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=500000)
+    parser.add_argument("--duplicates", type=float, default=0.2, help="Fraction of rows repeating an earlier NPI")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    roster = make_roster(args.rows, args.duplicates)
+    scalar_seconds, scalar_unique = best_of(args.repeat, scalar_prescreen, roster)
+    vector_seconds, result = best_of(args.repeat, prescreen_npis, roster)
+    assert set(result["unique_npis"].tolist()) == scalar_unique
+
+    print(json.dumps({
+        "rows": args.rows,
+        "scalar_seconds": round(scalar_seconds, 4),
+        "vectorized_seconds": round(vector_seconds, 4),
+        "speedup": round(scalar_seconds / vector_seconds, 1),
+        "summary": summarize(result),
+    }, indent=2))
+
+if __name__ == "__main__":
+    main()
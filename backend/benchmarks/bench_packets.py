@@ -0,0 +1,79 @@
+"""
+Multi-provider packets: one PDF with many applications, processed as
+sequential single-provider pipeline runs versus the splitter + parallel
+per-provider fan-out. Extraction is forced to the stand-in model (with its
+latency) so the comparison reflects model-bound scanned packets.
+
+    cd backend && python -m benchmarks.bench_packets --providers 50 --model-latency 0.5
+"""
+import os
+import json
+import time
+import random
+import asyncio
+import argparse
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--providers", type=int, default=50)
+    parser.add_argument("--continuation-pages", type=int, default=1)
+    parser.add_argument("--model-latency", type=float, default=0.5)
+    parser.add_argument("--concurrency", type=int, default=50, help="SPLIT_EXTRACTION_CONCURRENCY")
+    parser.add_argument("--seed", type=int, default=9)
+    args = parser.parse_args()
+
+    # Agents read their configuration at import time; registry/geocoder fail fast offline
+    os.environ.update(
+        DATA_DIR=tempfile.mkdtemp(prefix="bench-packets-"),
+        EXTRACTION_MODEL_CLIENT="local",
+        STANDIN_MODEL_LATENCY=str(args.model_latency),
+        LOCAL_EXTRACTION_MIN_CONFIDENCE="1.01",
+        SPLIT_EXTRACTION_CONCURRENCY=str(args.concurrency),
+        NPI_REGISTRY_URL="http://127.0.0.1:9/api/",
+        NOMINATIM_URL="http://127.0.0.1:9/search",
+        HTTP_MAX_RETRIES="0",
+    )
+    os.environ.setdefault("LOG_LEVEL", "ERROR")
+
+    from agents.document import Document
+    from agents.directory_management_agent import DirectoryManagementAgent
+    from benchmarks.sample_documents import application_pdf, packet_pdf, sample_provider
+
+    rng = random.Random(args.seed)
+    providers = [sample_provider(rng, i) for i in range(args.providers)]
+    packet = Document("packet.pdf", data=packet_pdf(providers, args.continuation_pages))
+    manager = DirectoryManagementAgent()
+
+    async def sequential():
+        # A different NPI per document keeps the extraction cache out of the comparison
+        for i, provider in enumerate(providers):
+            await manager.process_application_async(Document(f"single_{i}.pdf", data=application_pdf(dict(provider, npi_number=f"seq{i}"))))
+
+    async def with_io_threads(coroutine):
+        # Same worker pool size as the API (main.py, AGENT_IO_THREADS)
+        asyncio.get_running_loop().set_default_executor(ThreadPoolExecutor(max_workers=64))
+        return await coroutine
+
+    started = time.perf_counter()
+    asyncio.run(with_io_threads(sequential()))
+    sequential_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    reports = asyncio.run(with_io_threads(manager.process_packet_async(packet)))
+    packet_seconds = time.perf_counter() - started
+
+    print(json.dumps({
+        "providers": args.providers,
+        "pages": args.providers * (1 + args.continuation_pages),
+        "segments": len(reports),
+        "segment_pages_ok": all(r["segment"]["pages"][1] - r["segment"]["pages"][0] == args.continuation_pages for r in reports),
+        "sequential_seconds": round(sequential_seconds, 2),
+        "packet_seconds": round(packet_seconds, 2),
+        "model_latency": args.model_latency,
+        "speedup": round(sequential_seconds / packet_seconds, 1),
+    }, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""
+Rescoring stored reports after a rule change: fills a report store with
+synthetic reports scored by the bundled rules, changes a penalty, and times
+the vectorized evaluation and the full ReportStore.rescore pass.
+
+    cd backend && python -m benchmarks.bench_rescore --records 1000000
+"""
+import os
+import json
+import time
+import random
+import argparse
+import tempfile
+
+from agents.qa_rules import DEFAULT_RULES_PATH, RuleSet
+from agents.report_store import ReportStore, _to_row, source_select
+
+LICENSE_STATUSES = ["Active", "Active", "Active", "Expired", "Unverified", None]
+
+def synthetic_reports(count, seed):
+    rng = random.Random(seed)
+    for i in range(count):
+        phone = f"212-555-{rng.randrange(10000):04d}"
+        found = rng.random() > 0.03
+        yield {
+            "extracted": {"npi_number": str(1000000000 + i), "provider_name": f"Dr. Provider {i}", "phone_number": phone},
+            "official": {
+                "official_name": f"Provider {i}" if found else "Not Found",
+                "official_phone": (phone if rng.random() > 0.2 else "212-555-0000") if found else None,
+            },
+            "state_board": {"state_license_status": rng.choice(LICENSE_STATUSES)},
+            "web_enrichment": {},
+            "matching": {
+                "name_similarity": 1.0 if found else None,
+                "duplicate_count": int(rng.random() < 0.02),
+                "colocated_count": int(rng.random() < 0.01) * 20,
+                "registry_distance_km": round(rng.expovariate(1), 1) if found else None,
+            },
+        }
+
+def fill(store, rules, count, seed, batch=50000):
+    rows = []
+    now = time.time()
+    for report in synthetic_reports(count, seed):
+        report["validation_result"] = rules.evaluate(report)
+        rows.append(_to_row(report, "synthetic.pdf", now))
+        if len(rows) >= batch:
+            _insert(store, rows)
+            rows = []
+    if rows:
+        _insert(store, rows)
+
+def _insert(store, rows):
+    store.conn.execute("BEGIN")
+    store.conn.executemany(
+        "INSERT INTO reports (created_at, source, npi, provider_name, official_name, phone_number,"
+        " official_phone, license_status, name_similarity, duplicate_count, score, priority, priority_rank,"
+        " mismatch_count, mismatches, rules_version, report) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+        rows,
+    )
+    store.conn.execute("COMMIT")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--records", type=int, default=1000000)
+    parser.add_argument("--seed", type=int, default=3)
+    args = parser.parse_args()
+
+    with open(DEFAULT_RULES_PATH) as f:
+        definition = json.load(f)
+    current = RuleSet(definition)
+
+    # Compliance lowers the phone penalty: a new rules version
+    changed = json.loads(json.dumps(definition))
+    changed["version"] = "bench-v2"
+    for rule in changed["rules"]:
+        if rule["id"] == "phone_mismatch":
+            rule["score"] = {"add": -30}
+    updated = RuleSet(changed)
+
+    with tempfile.TemporaryDirectory() as directory:
+        store = ReportStore(os.path.join(directory, "reports.sqlite"))
+        started = time.perf_counter()
+        fill(store, current, args.records, args.seed)
+        fill_seconds = time.perf_counter() - started
+
+        # Evaluation alone (inputs already in memory)
+        selects = ", ".join(source_select(source) for source in updated.sources)
+        rows = store.conn.execute(f"SELECT {selects} FROM reports").fetchall()
+        columns = dict(zip(updated.sources, zip(*rows)))
+        del rows
+        started = time.perf_counter()
+        updated.evaluate_frame(columns)
+        evaluate_seconds = time.perf_counter() - started
+
+        started = time.perf_counter()
+        result = store.rescore(updated)
+        rescore_seconds = time.perf_counter() - started
+
+    print(json.dumps({
+        "records": args.records,
+        "fill_seconds": round(fill_seconds, 2),
+        "evaluate_frame_seconds": round(evaluate_seconds, 2),
+        "evaluate_records_per_second": round(args.records / evaluate_seconds),
+        "rescore_seconds": round(rescore_seconds, 2),
+        "rescore": result,
+    }, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+"""
+Location index at directory scale: fills a SpatialIndex with synthetic
+providers clustered around US metro areas (plus a few crowded buildings),
+then times radius, nearest-neighbour and co-location queries and checks
+them against a brute-force scan over every provider (the cost of answering
+the same question without an index).
+
+    cd backend && python -m benchmarks.bench_spatial --providers 1000000
+"""
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import tempfile
+import statistics
+
+import numpy as np
+
+from agents.spatial_index import EARTH_RADIUS_KM, SpatialIndex
+from benchmarks.load_test import RESULTS_DIR, git_revision
+
+# (lat, lon, share of providers) for a handful of metro areas; the rest are spread over the US
+METROS = [
+    (40.75, -73.98, 0.12), (34.05, -118.24, 0.08), (41.88, -87.63, 0.06), (29.76, -95.37, 0.04),
+    (33.45, -112.07, 0.03), (39.95, -75.17, 0.03), (47.61, -122.33, 0.02), (25.76, -80.19, 0.03),
+    (42.36, -71.06, 0.03), (32.78, -96.80, 0.03),
+]
+
+def synthetic_locations(count, seed, crowded_buildings=50, per_building=40):
+    rng = random.Random(seed)
+    for i in range(count):
+        if i < crowded_buildings * per_building:
+            # Same point for many NPIs: the "one address, many providers" pattern
+            building = random.Random(i // per_building)
+            lat, lon = building.uniform(30, 45), building.uniform(-120, -75)
+        else:
+            pick = rng.random()
+            for metro_lat, metro_lon, share in METROS:
+                pick -= share
+                if pick < 0:
+                    lat, lon = rng.gauss(metro_lat, 0.25), rng.gauss(metro_lon, 0.3)
+                    break
+            else:
+                lat, lon = rng.uniform(25, 49), rng.uniform(-124, -67)
+        yield (str(1000000000 + i), lat, lon, f"Dr. Provider {i}", f"212{i:07d}", None, None)
+
+def brute_force(lats, lons, lat, lon):
+    phi1, phi2 = np.radians(lat), np.radians(lats)
+    a = np.sin((phi2 - phi1) / 2) ** 2 + np.cos(phi1) * np.cos(phi2) * np.sin(np.radians(lons - lon) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.minimum(1.0, np.sqrt(a)))
+
+def summarize(samples):
+    samples = sorted(samples)
+    return {
+        "p50_ms": round(statistics.median(samples) * 1000, 3),
+        "p95_ms": round(samples[int(0.95 * (len(samples) - 1))] * 1000, 3),
+        "max_ms": round(samples[-1] * 1000, 3),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--providers", type=int, default=1000000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=5)
+    parser.add_argument("--out", help="Result file (default: benchmarks/results/spatial-<timestamp>.json)")
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed + 1)
+    with tempfile.TemporaryDirectory() as directory:
+        index = SpatialIndex(os.path.join(directory, "locations.sqlite"))
+        started = time.perf_counter()
+        batch = []
+        for entry in synthetic_locations(args.providers, args.seed):
+            batch.append(entry)
+            if len(batch) >= 50000:
+                index.add_many(batch)
+                batch = []
+        index.add_many(batch)
+        build_seconds = time.perf_counter() - started
+
+        lats, lons = (np.array(column) for column in zip(*index.conn.execute("SELECT lat, lon FROM locations")))
+        # Query points: half at existing providers (dense areas), half anywhere in the US
+        points = [
+            (float(lats[i]), float(lons[i])) if q % 2 == 0 else (rng.uniform(25, 49), rng.uniform(-124, -67))
+            for q, i in enumerate(rng.sample(range(len(lats)), args.queries))
+        ]
+
+        results = {}
+        mismatches = 0
+        brute_seconds = []
+        for radius in (1, 10, 50):
+            timings, totals = [], []
+            for lat, lon in points:
+                started = time.perf_counter()
+                answer = index.within(lat, lon, radius, limit=50)
+                timings.append(time.perf_counter() - started)
+                totals.append(answer["total"])
+                started = time.perf_counter()
+                expected = int((brute_force(lats, lons, lat, lon) <= radius).sum())
+                brute_seconds.append(time.perf_counter() - started)
+                mismatches += expected != answer["total"]
+            results[f"within_{radius}km"] = dict(summarize(timings), mean_matches=round(statistics.mean(totals), 1))
+
+        timings = []
+        for lat, lon in points:
+            started = time.perf_counter()
+            answer = index.nearest(lat, lon, k=10)
+            timings.append(time.perf_counter() - started)
+            # Compared by distance: NPIs sharing a building tie
+            expected = np.sort(brute_force(lats, lons, lat, lon))[:10]
+            mismatches += not np.allclose([item["distance_km"] for item in answer], expected, atol=1e-3)
+        results["nearest_10"] = summarize(timings)
+
+        timings = []
+        for lat, lon in points:
+            started = time.perf_counter()
+            index.colocated(lat, lon)
+            timings.append(time.perf_counter() - started)
+        results["colocated"] = summarize(timings)
+
+        started = time.perf_counter()
+        index.add("1999999999", 40.7, -74.0, "Dr. New Provider", "2125550000")
+        results["incremental_add_ms"] = round((time.perf_counter() - started) * 1000, 3)
+
+    run = {
+        "benchmark": "spatial",
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "revision": git_revision(),
+        "providers": args.providers,
+        "queries_per_kind": args.queries,
+        "build_seconds": round(build_seconds, 2),
+        "queries": results,
+        "brute_force_scan": summarize(brute_seconds),
+        "mismatches_vs_brute_force": mismatches,
+    }
+    out = args.out or os.path.join(RESULTS_DIR, f"spatial-{time.strftime('%Y%m%d-%H%M%S')}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+    with open(out, "w") as f:
+        json.dump(run, f, indent=2)
+    print(json.dumps(run, indent=2))
+    print(f"results written to {out}", file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+"""
+Cold-start benchmark for short-lived API workers, against the fake upstreams:
+- import time of `main` in a fresh interpreter (plus the slowest imports)
+- a fresh uvicorn process: time until /healthz answers, until /readyz is 200,
+  and the latency of the first and second /validate_document requests
+
+Each trial uses an empty DATA_DIR, like a new container. Results go to
+benchmarks/results/startup-<timestamp>.json.
+
+    cd backend && python -m benchmarks.bench_startup --trials 5
+"""
+import os
+import sys
+import json
+import time
+import socket
+import tempfile
+import argparse
+import statistics
+import subprocess
+
+import requests
+
+from benchmarks.fake_upstreams import DEFAULT_PROVIDER, FakeUpstreams
+from benchmarks.load_test import RESULTS_DIR, git_revision
+from benchmarks.sample_documents import application_pdf
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+IMPORT_PROBE = "import time; t = time.perf_counter(); import main; print(time.perf_counter() - t)"
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def measure_import(env):
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-W", "ignore", "-c", IMPORT_PROBE],
+        cwd=BACKEND_DIR, env=env, capture_output=True, text=True, check=True,
+    )
+    # -X importtime lines: "import time: self | cumulative | module"
+    modules = []
+    for line in result.stderr.splitlines():
+        if line.startswith("import time:") and "|" in line:
+            _, cumulative, name = line.split("|")
+            if cumulative.strip().isdigit():
+                modules.append((int(cumulative), name.rstrip()))
+    # Modules imported directly by main (one indent level below it)
+    direct = [(us, name.strip()) for us, name in modules if len(name) - len(name.lstrip()) == 3]
+    return float(result.stdout.strip().splitlines()[-1]), sorted(direct, reverse=True)[:8]
+
+def measure_server(env, document):
+    port = free_port()
+    base = f"http://127.0.0.1:{port}"
+    started = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "-W", "ignore", "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"],
+        cwd=BACKEND_DIR, env=env,
+    )
+    timings = {}
+    try:
+        timings["healthz_seconds"] = wait_for(f"{base}/healthz", started)
+        timings["readyz_seconds"] = wait_for(f"{base}/readyz", started)
+        for name in ("first_request_seconds", "second_request_seconds"):
+            request_started = time.perf_counter()
+            response = requests.post(f"{base}/validate_document", files={"file": ("application.pdf", document)}, timeout=60)
+            response.raise_for_status()
+            timings[name] = time.perf_counter() - request_started
+        timings["dependencies"] = requests.get(f"{base}/readyz", timeout=5).json()["dependencies"]
+    finally:
+        process.terminate()
+        process.wait(timeout=10)
+    return timings
+
+def wait_for(url, started, timeout=60):
+    while time.perf_counter() - started < timeout:
+        try:
+            if requests.get(url, timeout=1).status_code == 200:
+                return time.perf_counter() - started
+        except requests.ConnectionError:
+            pass
+        time.sleep(0.01)
+    raise TimeoutError(f"{url} not ready after {timeout}s")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--trials", type=int, default=5)
+    parser.add_argument("--out", help="Result file (default: benchmarks/results/startup-<timestamp>.json)")
+    args = parser.parse_args()
+
+    with FakeUpstreams(providers={DEFAULT_PROVIDER["npi_number"]: DEFAULT_PROVIDER}) as upstreams:
+        trials = []
+        for _ in range(args.trials):
+            with tempfile.TemporaryDirectory() as data_dir:
+                env = dict(os.environ, **upstreams.env(), DATA_DIR=data_dir, LOG_LEVEL="ERROR")
+                import_seconds, slowest = measure_import(env)
+            with tempfile.TemporaryDirectory() as data_dir:
+                env = dict(os.environ, **upstreams.env(), DATA_DIR=data_dir, LOG_LEVEL="ERROR")
+                trials.append(dict(measure_server(env, application_pdf(DEFAULT_PROVIDER)), import_seconds=import_seconds))
+
+    keys = ["import_seconds", "healthz_seconds", "readyz_seconds", "first_request_seconds", "second_request_seconds"]
+    run = {
+        "benchmark": "startup",
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "revision": git_revision(),
+        "python": sys.version.split()[0],
+        "trials": args.trials,
+        "median": {key: round(statistics.median(t[key] for t in trials), 4) for key in keys},
+        "max": {key: round(max(t[key] for t in trials), 4) for key in keys},
+        "slowest_imports_ms": {name: round(us / 1000, 1) for us, name in slowest},
+        "dependencies": trials[-1]["dependencies"],
+    }
+    out = args.out or os.path.join(RESULTS_DIR, f"startup-{time.strftime('%Y%m%d-%H%M%S')}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+    with open(out, "w") as f:
+        json.dump(run, f, indent=2)
+    print(json.dumps(run, indent=2))
+    print(f"results written to {out}", file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
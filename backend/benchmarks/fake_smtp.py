@@ -0,0 +1,175 @@
+"""
+Local SMTP stand-in for the notification outbox: accepts any login, keeps
+delivered messages in memory, and can add a per-session handshake delay
+(TLS + login on a real server), reject recipients and fail a fraction of
+messages with a temporary 451.
+
+    cd backend && python -m benchmarks.fake_smtp --port 8925 --session-latency 0.3
+
+then point the API at it:
+
+    SMTP_HOST=127.0.0.1 SMTP_PORT=8925 SMTP_STARTTLS=0 EMAIL_USER=network@example.com EMAIL_PASS=x
+"""
+import time
+import random
+import argparse
+import threading
+import socketserver
+from email import message_from_bytes
+
+class FakeSmtp:
+    """
+    Threaded SMTP server speaking just enough ESMTP for smtplib
+    (EHLO, AUTH PLAIN/LOGIN, MAIL, RCPT, DATA, RSET, NOOP, QUIT).
+    Recipients at `reject_domain` get a permanent 550.
+    """
+    def __init__(self, host="127.0.0.1", port=0, session_latency=0.0, error_rate=0.0, reject_domain="invalid.example", seed=13):
+        self.session_latency = session_latency
+        self.error_rate = error_rate
+        self.reject_domain = reject_domain
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.messages = []
+        self.counters = {"sessions": 0, "logins": 0, "messages": 0, "rejected": 0, "temporary_errors": 0}
+        self.server = socketserver.ThreadingTCPServer((host, port), self._handler())
+        self.server.daemon_threads = True
+        self.thread = None
+
+    def env(self):
+        """
+        Environment variables that route NotificationAgent to this server.
+        """
+        host, port = self.server.server_address[:2]
+        return {
+            "SMTP_HOST": host,
+            "SMTP_PORT": str(port),
+            "SMTP_STARTTLS": "0",
+            "EMAIL_USER": "network@example.com",
+            "EMAIL_PASS": "stand-in",
+        }
+
+    def start(self):
+        self.thread = threading.Thread(target=self.server.serve_forever, name="fake-smtp", daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def stats(self):
+        with self.lock:
+            return dict(self.counters)
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _count(self, name):
+        with self.lock:
+            self.counters[name] += 1
+
+    def _handler(self):
+        fake = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def handle(self):
+                fake._count("sessions")
+                self.reply("220 fake-smtp ESMTP ready")
+                recipients = []
+                while True:
+                    line = self.rfile.readline()
+                    if not line:
+                        return
+                    command, _, argument = line.decode().strip().partition(" ")
+                    command = command.upper()
+                    if command == "EHLO":
+                        self.reply("250-fake-smtp", "250-AUTH PLAIN LOGIN", "250 8BITMIME")
+                    elif command == "HELO":
+                        self.reply("250 fake-smtp")
+                    elif command == "AUTH":
+                        self.authenticate(argument)
+                    elif command == "MAIL":
+                        recipients = []
+                        self.reply("250 OK")
+                    elif command == "RCPT":
+                        address = argument.partition(":")[2].strip(" <>")
+                        if address.endswith("@" + fake.reject_domain):
+                            fake._count("rejected")
+                            self.reply("550 No such user")
+                        else:
+                            recipients.append(address)
+                            self.reply("250 OK")
+                    elif command == "DATA":
+                        self.reply("354 End data with <CR><LF>.<CR><LF>")
+                        self.receive(recipients)
+                    elif command in ("RSET", "NOOP"):
+                        self.reply("250 OK")
+                    elif command == "QUIT":
+                        self.reply("221 Bye")
+                        return
+                    else:
+                        self.reply("502 Command not implemented")
+
+            def authenticate(self, argument):
+                mechanism, _, initial = argument.partition(" ")
+                if mechanism.upper() == "LOGIN":
+                    self.reply("334 VXNlcm5hbWU6")
+                    self.rfile.readline()
+                    self.reply("334 UGFzc3dvcmQ6")
+                    self.rfile.readline()
+                elif not initial:
+                    self.reply("334 ")
+                    self.rfile.readline()
+                # Stands in for the TLS handshake + login round-trips of a real provider
+                if fake.session_latency:
+                    time.sleep(fake.session_latency)
+                fake._count("logins")
+                self.reply("235 Authentication successful")
+
+            def receive(self, recipients):
+                data = []
+                for line in self.rfile:
+                    if line in (b".\r\n", b".\n"):
+                        break
+                    data.append(line[1:] if line.startswith(b"..") else line)
+                with fake.lock:
+                    fail = fake.rng.random() < fake.error_rate
+                if fail:
+                    fake._count("temporary_errors")
+                    self.reply("451 Temporary local problem, try again")
+                    return
+                message = message_from_bytes(b"".join(data))
+                with fake.lock:
+                    fake.messages.append({"to": recipients, "subject": message["Subject"]})
+                    fake.counters["messages"] += 1
+                self.reply("250 OK queued")
+
+            def reply(self, *lines):
+                self.wfile.write("".join(f"{line}\r\n" for line in lines).encode())
+
+        return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8925)
+    parser.add_argument("--session-latency", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    args = parser.parse_args()
+
+    server = FakeSmtp(args.host, args.port, session_latency=args.session_latency, error_rate=args.error_rate)
+    print(f"📮 Fake SMTP server on {args.host}:{args.port} (Ctrl+C to stop)")
+    for key, value in server.env().items():
+        print(f"   {key}={value}")
+    try:
+        server.server.serve_forever()
+    except KeyboardInterrupt:
+        server.server.server_close()
+
+
+if __name__ == "__main__":
+    main()
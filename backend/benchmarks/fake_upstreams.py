@@ -0,0 +1,222 @@
+"""
+Local stand-ins for the three upstreams the pipeline calls: the CMS NPI
+Registry, Nominatim and the extraction model. Each has a configurable latency
+and error rate, so load tests run offline and repeatably.
+
+    cd backend && python -m benchmarks.fake_upstreams --port 8900 --npi-latency 0.2 --error-rate 0.05
+
+then point the API at it:
+
+    NPI_REGISTRY_URL=http://127.0.0.1:8900/npi/api/
+    NOMINATIM_URL=http://127.0.0.1:8900/nominatim/search
+    EXTRACTION_MODEL_CLIENT=http EXTRACTION_MODEL_URL=http://127.0.0.1:8900/model/generate
+"""
+import json
+import time
+import random
+import hashlib
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+# Scanned stand-ins are an image header followed by the provider record as JSON,
+# which the fake model "reads" back (see scanned_document below)
+PNG_HEADER = b"\x89PNG\r\n\x1a\n"
+
+DEFAULT_PROVIDER = {
+    "provider_name": "JESSICA BONET MS",
+    "npi_number": "1134527302",
+    "phone_number": "212-674-9120",
+    "address": "123 Main St, New York, NY 10003",
+}
+
+def scanned_document(provider):
+    """
+    Bytes of a fake scanned application: no text layer, so extraction escalates to the model.
+    """
+    return PNG_HEADER + json.dumps(provider).encode()
+
+class FakeUpstreams:
+    """
+    One threaded HTTP server answering all three upstreams under path prefixes.
+    `latency` maps npi/geocode/model to seconds (jittered +-25%); `error_rate`
+    is the fraction of requests answered with a 503.
+    """
+    def __init__(self, host="127.0.0.1", port=0, latency=None, error_rate=0.0, providers=None, seed=11):
+        self.latency = {"npi": 0.0, "geocode": 0.0, "model": 0.0}
+        self.latency.update(latency or {})
+        self.error_rate = error_rate
+        self.providers = dict(providers or {})
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.counters = {"npi": 0, "geocode": 0, "model": 0, "errors": 0}
+        self.server = ThreadingHTTPServer((host, port), self._handler())
+        self.server.daemon_threads = True
+        self.thread = None
+
+    @property
+    def base_url(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def env(self):
+        """
+        Environment variables that route the agents to this server.
+        """
+        return {
+            "NPI_REGISTRY_URL": f"{self.base_url}/npi/api/",
+            "NOMINATIM_URL": f"{self.base_url}/nominatim/search",
+            "EXTRACTION_MODEL_CLIENT": "http",
+            "EXTRACTION_MODEL_URL": f"{self.base_url}/model/generate",
+        }
+
+    def add_providers(self, providers):
+        with self.lock:
+            for provider in providers:
+                self.providers[provider["npi_number"]] = provider
+
+    def start(self):
+        self.thread = threading.Thread(target=self.server.serve_forever, name="fake-upstreams", daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def stats(self):
+        with self.lock:
+            return dict(self.counters)
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    # --- Upstream behaviour ---
+    def _delay(self, kind):
+        """
+        Sleeps for the configured latency; returns True if this request should fail.
+        """
+        with self.lock:
+            self.counters[kind] += 1
+            jitter = self.rng.uniform(0.75, 1.25)
+            fail = self.rng.random() < self.error_rate
+            if fail:
+                self.counters["errors"] += 1
+        if self.latency[kind]:
+            time.sleep(self.latency[kind] * jitter)
+        return fail
+
+    def npi_registry(self, query):
+        npi = query.get("number", [""])[0]
+        with self.lock:
+            provider = self.providers.get(npi)
+        if provider is None:
+            return {"result_count": 0, "results": []}
+        first, _, last = provider["provider_name"].rpartition(" ")
+        # "123 Main St, New York, NY 10003" -> street line, city, state, ZIP
+        street, city, region = (provider["address"].split(",") + ["", ""])[:3]
+        state, _, postal_code = region.strip().partition(" ")
+        return {
+            "result_count": 1,
+            "results": [{
+                "number": npi,
+                "basic": {"first_name": first or last, "last_name": last},
+                "addresses": [{
+                    "address_1": street,
+                    "city": city.strip(),
+                    "state": state,
+                    "postal_code": postal_code,
+                    "telephone_number": provider["phone_number"],
+                }],
+            }],
+        }
+
+    def nominatim(self, query):
+        address = query.get("q", [""])[0]
+        if not address.strip():
+            return []
+        # Stable pseudo-coordinates per address, roughly inside the continental US
+        digest = hashlib.sha256(address.lower().encode()).digest()
+        lat = 25 + int.from_bytes(digest[:4], "big") / 2**32 * 24
+        lon = -124 + int.from_bytes(digest[4:8], "big") / 2**32 * 57
+        return [{"lat": f"{lat:.6f}", "lon": f"{lon:.6f}", "display_name": address}]
+
+    def model(self, body):
+        start = body.find(b"{")
+        try:
+            provider = json.loads(body[start:body.rindex(b"}") + 1]) if start >= 0 else DEFAULT_PROVIDER
+        except ValueError:
+            provider = DEFAULT_PROVIDER
+        fields = {k: provider.get(k) for k in DEFAULT_PROVIDER}
+        return {"text": json.dumps(fields)}
+
+    def _handler(self):
+        upstreams = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                url = urlparse(self.path)
+                query = parse_qs(url.query)
+                if url.path.startswith("/npi"):
+                    self._answer("npi", lambda: upstreams.npi_registry(query))
+                elif url.path.startswith("/nominatim"):
+                    self._answer("geocode", lambda: upstreams.nominatim(query))
+                else:
+                    self._send(404, {"error": "unknown path"})
+
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                if self.path.startswith("/model"):
+                    self._answer("model", lambda: upstreams.model(body))
+                else:
+                    self._send(404, {"error": "unknown path"})
+
+            def _answer(self, kind, build):
+                if upstreams._delay(kind):
+                    self._send(503, {"error": "injected failure"})
+                else:
+                    self._send(200, build())
+
+            def _send(self, status, payload):
+                body = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=8900)
+    parser.add_argument("--npi-latency", type=float, default=0.1)
+    parser.add_argument("--geocode-latency", type=float, default=0.1)
+    parser.add_argument("--model-latency", type=float, default=1.5)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    args = parser.parse_args()
+
+    upstreams = FakeUpstreams(
+        port=args.port,
+        latency={"npi": args.npi_latency, "geocode": args.geocode_latency, "model": args.model_latency},
+        error_rate=args.error_rate,
+        providers={DEFAULT_PROVIDER["npi_number"]: DEFAULT_PROVIDER},
+    )
+    print(json.dumps(upstreams.env(), indent=2))
+    try:
+        upstreams.server.serve_forever()
+    except KeyboardInterrupt:
+        upstreams.stop()
+
+if __name__ == "__main__":
+    main()
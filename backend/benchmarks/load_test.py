@@ -0,0 +1,302 @@
+"""
+Offline load test: pushes N concurrent documents through the pipeline with the
+NPI Registry, Nominatim and the extraction model replaced by local fakes
+(benchmarks/fake_upstreams.py). Reports throughput, p50/p95/p99 latency per
+stage, upstream call counts and memory, and writes the run as JSON so later
+runs can be compared against it.
+
+    cd backend && python -m benchmarks.load_test --mode agent --documents 500 --concurrency 32
+    cd backend && python -m benchmarks.load_test --mode api --documents 200 --concurrency 16 \\
+        --model-latency 1.5 --error-rate 0.02 --compare benchmarks/results/baseline.json
+
+--mode agent awaits DirectoryManagementAgent.process_application_async directly;
+--mode api serves main.app with uvicorn and POSTs to /validate_document.
+"""
+import os
+import sys
+import json
+import time
+import random
+import asyncio
+import argparse
+import resource
+import tempfile
+import threading
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.fake_upstreams import FakeUpstreams, scanned_document
+
+STAGES = ["extraction", "npi_registry", "state_license", "enrichment", "matching", "qa"]
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+
+def percentiles(samples):
+    if not samples:
+        return {"count": 0}
+    ordered = sorted(samples)
+    pick = lambda q: ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+    return {
+        "count": len(ordered),
+        "p50_ms": round(pick(0.50) * 1000, 2),
+        "p95_ms": round(pick(0.95) * 1000, 2),
+        "p99_ms": round(pick(0.99) * 1000, 2),
+        "max_ms": round(ordered[-1] * 1000, 2),
+    }
+
+def rss_mb():
+    try:
+        with open("/proc/self/statm") as f:
+            return round(int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20, 1)
+    except OSError:
+        return None
+
+def peak_rss_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS bytes
+    return round(peak / (2**20 if sys.platform == "darwin" else 2**10), 1)
+
+def build_documents(count, scanned_ratio, duplicate_ratio, seed):
+    """
+    Returns [(filename, bytes, provider)]. Text-layer PDFs take the local
+    extraction path; "scanned" ones escalate to the (fake) model.
+    """
+    from benchmarks.sample_documents import application_pdf, sample_provider
+
+    rng = random.Random(seed)
+    documents = []
+    for i in range(count):
+        if documents and rng.random() < duplicate_ratio:
+            documents.append(rng.choice(documents))
+            continue
+        provider = sample_provider(rng, i)
+        if rng.random() < scanned_ratio:
+            documents.append((f"scan_{i:05d}.png", scanned_document(provider), provider))
+        else:
+            documents.append((f"application_{i:05d}.pdf", application_pdf(provider), provider))
+    return documents
+
+def histogram_snapshot(histogram):
+    """
+    {label: (count, sum, [(upper_bound, cumulative_count)])} from a prometheus Histogram.
+    """
+    snapshot = {}
+    for metric in histogram.collect():
+        for sample in metric.samples:
+            label = next(iter(v for k, v in sample.labels.items() if k != "le"), "")
+            count, total, buckets = snapshot.get(label, (0, 0.0, []))
+            if sample.name.endswith("_bucket"):
+                buckets.append((float(sample.labels["le"]), sample.value))
+            elif sample.name.endswith("_count"):
+                count = sample.value
+            elif sample.name.endswith("_sum"):
+                total = sample.value
+            snapshot[label] = (count, total, buckets)
+    return snapshot
+
+def histogram_percentiles(before, after):
+    """
+    Per-label percentile estimates (bucket upper bounds) for observations made
+    between two snapshots. Used in api mode, where stages run inside the server.
+    """
+    out = {}
+    for label, (count, _, buckets) in after.items():
+        prev_count, _, prev_buckets = before.get(label, (0, 0.0, []))
+        prev = dict(prev_buckets)
+        delta = [(le, n - prev.get(le, 0)) for le, n in buckets]
+        observed = count - prev_count
+        if observed <= 0:
+            continue
+        estimate = lambda q: next((le for le, n in delta if n >= q * observed), float("inf"))
+        out[label] = {
+            "count": int(observed),
+            "p50_ms_le": round(estimate(0.50) * 1000, 2),
+            "p95_ms_le": round(estimate(0.95) * 1000, 2),
+            "p99_ms_le": round(estimate(0.99) * 1000, 2),
+        }
+    return out
+
+async def run_agent_mode(documents, concurrency):
+    from agents.directory_management_agent import DirectoryManagementAgent
+    from agents.document import Document
+
+    manager = DirectoryManagementAgent()
+    loop = asyncio.get_running_loop()
+    loop.set_default_executor(ThreadPoolExecutor(max_workers=int(os.getenv("AGENT_IO_THREADS", "64"))))
+    gate = asyncio.Semaphore(concurrency)
+    stage_samples = {stage: [] for stage in STAGES}
+    latencies, outcomes = [], {"ok": 0, "error": 0}
+
+    async def collect(event):
+        stage_samples[event["stage"]].append(event["duration_ms"] / 1000)
+
+    async def one(filename, data):
+        async with gate:
+            started = time.perf_counter()
+            report = await manager.process_application_async(Document(filename, data=data), emit=collect)
+            latencies.append(time.perf_counter() - started)
+            outcomes["error" if "error" in report else "ok"] += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(filename, data) for filename, data, _ in documents))
+    seconds = time.perf_counter() - started
+    return {
+        "seconds": round(seconds, 3),
+        "documents_per_second": round(len(documents) / seconds, 2),
+        "outcomes": outcomes,
+        "end_to_end": percentiles(latencies),
+        "stages": {stage: percentiles(samples) for stage, samples in stage_samples.items()},
+        "extraction": manager.extractor.stats(),
+    }
+
+def run_api_mode(documents, concurrency):
+    import requests
+    import uvicorn
+    from agents.telemetry import STAGE_LATENCY
+    from main import app
+
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=0, log_level="warning", lifespan="on"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.05)
+    port = server.servers[0].sockets[0].getsockname()[1]
+    url = f"http://127.0.0.1:{port}/validate_document"
+
+    session = requests.Session()
+    # Agents are built and warmed after the server starts listening
+    while session.get(f"http://127.0.0.1:{port}/readyz").status_code != 200:
+        time.sleep(0.05)
+    session.mount("http://", requests.adapters.HTTPAdapter(pool_maxsize=concurrency))
+    lock = threading.Lock()
+    latencies, outcomes = [], {"ok": 0, "error": 0, "http_error": 0}
+
+    def one(document):
+        filename, data, _ = document
+        started = time.perf_counter()
+        response = session.post(url, files={"file": (filename, data)}, timeout=300)
+        elapsed = time.perf_counter() - started
+        with lock:
+            latencies.append(elapsed)
+            if response.status_code != 200:
+                outcomes["http_error"] += 1
+            else:
+                outcomes["error" if any("error" in report for report in response.json()) else "ok"] += 1
+
+    before = histogram_snapshot(STAGE_LATENCY)
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(one, documents))
+    seconds = time.perf_counter() - started
+    stats = session.get(f"http://127.0.0.1:{port}/stats").json()
+
+    server.should_exit = True
+    thread.join(timeout=10)
+    return {
+        "seconds": round(seconds, 3),
+        "documents_per_second": round(len(documents) / seconds, 2),
+        "outcomes": outcomes,
+        "end_to_end": percentiles(latencies),
+        # Stages run inside the server: percentiles are histogram bucket bounds
+        "stages": histogram_percentiles(before, histogram_snapshot(STAGE_LATENCY)),
+        "extraction": stats.get("extraction"),
+    }
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, timeout=5, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+def compare(baseline, current):
+    """
+    Relative change of the headline numbers (positive = slower / more memory,
+    except throughput where positive = faster).
+    """
+    def change(old, new):
+        if not old or new is None:
+            return None
+        return round((new - old) / old * 100, 1)
+
+    base, cur = baseline["results"], current["results"]
+    report = {
+        "baseline": {"revision": baseline.get("revision"), "timestamp": baseline.get("timestamp")},
+        "documents_per_second_pct": change(base["documents_per_second"], cur["documents_per_second"]),
+        "end_to_end_p95_pct": change(base["end_to_end"].get("p95_ms"), cur["end_to_end"].get("p95_ms")),
+        "peak_rss_pct": change(baseline["memory"]["peak_rss_mb"], current["memory"]["peak_rss_mb"]),
+        "stages_p95_pct": {},
+    }
+    for stage, stats in cur["stages"].items():
+        key = "p95_ms" if "p95_ms" in stats else "p95_ms_le"
+        old = base["stages"].get(stage, {}).get(key)
+        report["stages_p95_pct"][stage] = change(old, stats.get(key))
+    return report
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mode", choices=["agent", "api"], default="agent")
+    parser.add_argument("--documents", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--npi-latency", type=float, default=0.1, help="Seconds per fake NPI Registry call")
+    parser.add_argument("--geocode-latency", type=float, default=0.1, help="Seconds per fake Nominatim call")
+    parser.add_argument("--model-latency", type=float, default=1.5, help="Seconds per fake model call")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of upstream calls answered with 503")
+    parser.add_argument("--scanned-ratio", type=float, default=0.3, help="Fraction of documents without a text layer")
+    parser.add_argument("--duplicate-ratio", type=float, default=0.1, help="Fraction of resubmitted documents")
+    parser.add_argument("--unknown-ratio", type=float, default=0.05, help="Fraction of NPIs the fake registry does not know")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--out", help="Result file (default: benchmarks/results/<mode>-<timestamp>.json)")
+    parser.add_argument("--compare", help="Earlier result file to compare against")
+    args = parser.parse_args()
+
+    upstreams = FakeUpstreams(
+        latency={"npi": args.npi_latency, "geocode": args.geocode_latency, "model": args.model_latency},
+        error_rate=args.error_rate,
+    )
+
+    with upstreams, tempfile.TemporaryDirectory() as data_dir:
+        # Cold, isolated stores. This must happen before anything imports
+        # `agents`, since DATA_DIR and LOG_LEVEL are read at import time. The
+        # fakes (127.0.0.1) get enough concurrency for the test.
+        os.environ.update(upstreams.env())
+        os.environ["DATA_DIR"] = data_dir
+        os.environ.setdefault("LOG_LEVEL", "WARNING")
+        os.environ.setdefault("HTTP_HOST_POLICIES", json.dumps({"127.0.0.1": {"rate": None, "max_concurrency": 4 * args.concurrency}}))
+        os.environ.setdefault("HTTP_POOL_SIZE", str(4 * args.concurrency))
+
+        documents = build_documents(args.documents, args.scanned_ratio, args.duplicate_ratio, args.seed)
+        rng = random.Random(args.seed)
+        upstreams.add_providers(p for _, _, p in documents if rng.random() >= args.unknown_ratio)
+
+        rss_before = rss_mb()
+        if args.mode == "agent":
+            results = asyncio.run(run_agent_mode(documents, args.concurrency))
+        else:
+            results = run_api_mode(documents, args.concurrency)
+        upstream_calls = upstreams.stats()
+
+    run = {
+        "benchmark": "load_test",
+        "mode": args.mode,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "revision": git_revision(),
+        "python": sys.version.split()[0],
+        "config": {k: v for k, v in vars(args).items() if k not in ("out", "compare")},
+        "results": results,
+        "upstream_calls": upstream_calls,
+        "memory": {"rss_before_mb": rss_before, "rss_after_mb": rss_mb(), "peak_rss_mb": peak_rss_mb()},
+    }
+    if args.compare:
+        with open(args.compare) as f:
+            run["comparison"] = compare(json.load(f), run)
+
+    out = args.out or os.path.join(RESULTS_DIR, f"{args.mode}-{time.strftime('%Y%m%d-%H%M%S')}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+    with open(out, "w") as f:
+        json.dump(run, f, indent=2)
+    print(json.dumps(run, indent=2))
+    print(f"results written to {out}", file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
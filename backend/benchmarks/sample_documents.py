@@ -0,0 +1,89 @@
+"""
+Generates small provider application PDFs with a real text layer, so the
+extraction tiers can be exercised without scanned samples or extra packages.
+"""
+import os
+import random
+
+from agents.data_validation_agent import npi_checksum_ok
+
+def random_npi(rng):
+    while True:
+        npi = str(rng.randrange(10**9, 10**10))
+        if npi_checksum_ok(npi):
+            return npi
+
+def sample_provider(rng, index):
+    return {
+        "provider_name": f"Dr. Test Provider {index}",
+        "npi_number": random_npi(rng),
+        "phone_number": f"212-555-{rng.randrange(10000):04d}",
+        "address": f"{rng.randrange(1, 999)} Main St, New York, NY 10003",
+    }
+
+def application_lines(provider):
+    return [
+        "Provider Application Form",
+        f"Provider Name: {provider['provider_name']}",
+        f"NPI Number: {provider['npi_number']}",
+        f"Office Phone: {provider['phone_number']}",
+        f"Practice Address: {provider['address']}",
+    ]
+
+def build_pdf(pages):
+    """
+    pages: list of pages, each a list of text lines. Returns PDF bytes.
+    """
+    objects = ["<< /Type /Catalog /Pages 2 0 R >>", None, "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    page_ids = []
+    for lines in pages:
+        escaped = [line.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)") for line in lines]
+        stream = "BT /F1 12 Tf 14 TL 72 720 Td " + " ".join(f"({line}) Tj T*" for line in escaped) + " ET"
+        objects.append(f"<< /Length {len(stream)} >>\nstream\n{stream}\nendstream")
+        content_id = len(objects)
+        objects.append(
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+            f"/Resources << /Font << /F1 3 0 R >> >> /Contents {content_id} 0 R >>"
+        )
+        page_ids.append(len(objects))
+    objects[1] = f"<< /Type /Pages /Kids [{' '.join(f'{i} 0 R' for i in page_ids)}] /Count {len(page_ids)} >>"
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += f"{number} 0 obj\n{body}\nendobj\n".encode("latin-1")
+    xref = len(out)
+    out += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode()
+    for offset in offsets:
+        out += f"{offset:010d} 00000 n \n".encode()
+    out += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode()
+    return bytes(out)
+
+def application_pdf(provider):
+    return build_pdf([application_lines(provider)])
+
+def packet_pdf(providers, continuation_pages=0):
+    """
+    One PDF holding several applications (a group practice packet), each
+    optionally followed by continuation pages without identifying fields.
+    """
+    pages = []
+    for provider in providers:
+        pages.append(application_lines(provider))
+        pages.extend(["Attestation (continued)", "Signature: ______________"] for _ in range(continuation_pages))
+    return build_pdf(pages)
+
+def write_samples(directory, count, seed=7):
+    """
+    Writes `count` single-provider PDFs and returns [(path, provider)].
+    """
+    rng = random.Random(seed)
+    samples = []
+    for i in range(count):
+        provider = sample_provider(rng, i)
+        path = os.path.join(directory, f"application_{i:04d}.pdf")
+        with open(path, "wb") as f:
+            f.write(application_pdf(provider))
+        samples.append((path, provider))
+    return samples
@@ -0,0 +1,281 @@
+import os
+import io
+import json
+import time
+import uuid
+import shutil
+import asyncio
+import zipfile
+import threading
+
+from agents.storage import connect, data_path, transaction
+from agents.telemetry import get_logger, new_trace
+
+logger = get_logger("batch")
+
+# Files we know how to send through the pipeline (same as the dashboard uploader)
+SUPPORTED_EXTENSIONS = (".pdf", ".png", ".jpg", ".jpeg")
+
+class JobStore:
+    """
+    Local SQLite store for batch jobs and their per-file items.
+    Results are written as soon as each file finishes, so readers can page
+    through partial results while the job is still running. An item's result
+    is the list of reports for the providers found in that file.
+    """
+    def __init__(self, db_path=None, files_dir=None):
+        self.db_path = db_path or os.getenv("JOB_DB_PATH") or data_path("jobs.sqlite")
+        self.files_dir = files_dir or os.getenv("JOB_FILES_DIR") or os.path.join(os.path.dirname(self.db_path), "job_files")
+        self.conn = connect(self.db_path)
+        self.lock = threading.Lock()
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS jobs (
+                id TEXT PRIMARY KEY,
+                status TEXT NOT NULL,
+                total INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                finished_at REAL
+            );
+            CREATE TABLE IF NOT EXISTS job_items (
+                job_id TEXT NOT NULL,
+                idx INTEGER NOT NULL,
+                filename TEXT NOT NULL,
+                path TEXT NOT NULL,
+                status TEXT NOT NULL,
+                result TEXT,
+                error TEXT,
+                started_at REAL,
+                finished_at REAL,
+                PRIMARY KEY (job_id, idx)
+            );
+            CREATE INDEX IF NOT EXISTS idx_job_items_status ON job_items(status);
+        """)
+
+    def create_job(self, files):
+        """
+        files: list of (filename, bytes). Writes each file to disk and registers the job.
+        """
+        job_id = uuid.uuid4().hex
+        job_dir = os.path.join(self.files_dir, job_id)
+        os.makedirs(job_dir, exist_ok=True)
+
+        rows = []
+        for idx, (filename, content) in enumerate(files):
+            path = os.path.join(job_dir, f"{idx:05d}_{os.path.basename(filename)}")
+            with open(path, "wb") as f:
+                f.write(content)
+            rows.append((job_id, idx, filename, path, "pending"))
+
+        with self.lock, transaction(self.conn):
+            self.conn.execute(
+                "INSERT INTO jobs (id, status, total, created_at) VALUES (?, 'queued', ?, ?)",
+                (job_id, len(rows), time.time()),
+            )
+            self.conn.executemany(
+                "INSERT INTO job_items (job_id, idx, filename, path, status) VALUES (?, ?, ?, ?, ?)",
+                rows,
+            )
+        return job_id
+
+    def mark_running(self, job_id, idx):
+        with self.lock, transaction(self.conn):
+            self.conn.execute(
+                "UPDATE job_items SET status = 'running', started_at = ? WHERE job_id = ? AND idx = ?",
+                (time.time(), job_id, idx),
+            )
+            self.conn.execute("UPDATE jobs SET status = 'running' WHERE id = ? AND status = 'queued'", (job_id,))
+
+    def finish_item(self, job_id, idx, result=None, error=None):
+        status = "failed" if error else "done"
+        with self.lock, transaction(self.conn):
+            self.conn.execute(
+                "UPDATE job_items SET status = ?, result = ?, error = ?, finished_at = ? WHERE job_id = ? AND idx = ?",
+                (status, json.dumps(result) if result is not None else None, error, time.time(), job_id, idx),
+            )
+            remaining = self.conn.execute(
+                "SELECT COUNT(*) FROM job_items WHERE job_id = ? AND status IN ('pending', 'running')",
+                (job_id,),
+            ).fetchone()[0]
+            if remaining == 0:
+                self.conn.execute(
+                    "UPDATE jobs SET status = 'completed', finished_at = ? WHERE id = ?",
+                    (time.time(), job_id),
+                )
+        return remaining == 0
+
+    def get_item(self, job_id, idx):
+        return self.conn.execute(
+            "SELECT * FROM job_items WHERE job_id = ? AND idx = ?", (job_id, idx)
+        ).fetchone()
+
+    def get_job(self, job_id):
+        job = self.conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if job is None:
+            return None
+        counts = {row["status"]: row["n"] for row in self.conn.execute(
+            "SELECT status, COUNT(*) AS n FROM job_items WHERE job_id = ? GROUP BY status", (job_id,)
+        )}
+        return {
+            "job_id": job["id"],
+            "status": job["status"],
+            "total": job["total"],
+            "pending": counts.get("pending", 0),
+            "running": counts.get("running", 0),
+            "done": counts.get("done", 0),
+            "failed": counts.get("failed", 0),
+            "created_at": job["created_at"],
+            "finished_at": job["finished_at"],
+        }
+
+    def get_results(self, job_id, offset=0, limit=50, status=None):
+        query = "SELECT idx, filename, status, result, error, started_at, finished_at FROM job_items WHERE job_id = ?"
+        params = [job_id]
+        if status:
+            query += " AND status = ?"
+            params.append(status)
+        query += " ORDER BY idx LIMIT ? OFFSET ?"
+        params += [limit, offset]
+
+        items = []
+        for row in self.conn.execute(query, params):
+            result = json.loads(row["result"]) if row["result"] else None
+            items.append({
+                "index": row["idx"],
+                "filename": row["filename"],
+                "status": row["status"],
+                # Items finished before packets were split hold a single report
+                "reports": [result] if isinstance(result, dict) else result,
+                "error": row["error"],
+                "started_at": row["started_at"],
+                "finished_at": row["finished_at"],
+            })
+        return items
+
+    def unfinished_items(self):
+        """
+        Items left pending/running by a previous process (used to resume on startup).
+        """
+        return [(row["job_id"], row["idx"]) for row in self.conn.execute(
+            "SELECT job_id, idx FROM job_items WHERE status IN ('pending', 'running') ORDER BY job_id, idx"
+        )]
+
+    def cleanup_job_files(self, job_id):
+        shutil.rmtree(os.path.join(self.files_dir, job_id), ignore_errors=True)
+
+
+class BatchProcessor:
+    """
+    In-process job queue: a bounded pool of asyncio workers pulling items and
+    running them through DirectoryManagementAgent.process_packet_async, so a
+    multi-provider packet yields one report per provider.
+    Each pipeline stage has its own concurrency cap shared by all workers.
+    """
+    def __init__(self, manager, store, workers=None, stage_limits=None):
+        self.manager = manager
+        self.store = store
+        self.num_workers = workers or int(os.getenv("BATCH_WORKERS", "8"))
+        self.stage_limits = stage_limits or {
+            "extraction": int(os.getenv("BATCH_EXTRACTION_CONCURRENCY", "4")),
+            "npi_registry": int(os.getenv("BATCH_NPI_CONCURRENCY", "8")),
+            "state_license": int(os.getenv("BATCH_LICENSE_CONCURRENCY", "8")),
+            "enrichment": int(os.getenv("BATCH_ENRICHMENT_CONCURRENCY", "2")),
+        }
+        self.queue = None
+        self.semaphores = {}
+        self.tasks = []
+
+    async def start(self):
+        self.queue = asyncio.Queue()
+        self.semaphores = {stage: asyncio.Semaphore(n) for stage, n in self.stage_limits.items()}
+        self.tasks = [asyncio.create_task(self._worker()) for _ in range(self.num_workers)]
+
+        # Resume anything a previous process did not finish
+        for job_id, idx in self.store.unfinished_items():
+            self.queue.put_nowait((job_id, idx))
+
+    async def stop(self):
+        for task in self.tasks:
+            task.cancel()
+        await asyncio.gather(*self.tasks, return_exceptions=True)
+        self.tasks = []
+
+    def submit(self, job_id, total):
+        for idx in range(total):
+            self.queue.put_nowait((job_id, idx))
+
+    async def _worker(self):
+        while True:
+            job_id, idx = await self.queue.get()
+            try:
+                await self._process_item(job_id, idx)
+            finally:
+                self.queue.task_done()
+
+    async def _process_item(self, job_id, idx):
+        item = self.store.get_item(job_id, idx)
+        if item is None or item["status"] in ("done", "failed"):
+            return
+
+        new_trace(f"{job_id[:8]}-{idx}")
+        self.store.mark_running(job_id, idx)
+        try:
+            reports = await self.manager.process_packet_async(item["path"], limits=self.semaphores)
+            # The item fails only if no provider in it could be processed; the
+            # reports of failed segments still carry their own error
+            errors = [report["error"] for report in reports if "error" in report]
+            error = "; ".join(errors) if len(errors) == len(reports) else None
+            finished = self.store.finish_item(job_id, idx, result=reports, error=error)
+        except Exception as e:
+            logger.exception("batch item failed", extra={"job_id": job_id, "index": idx})
+            finished = self.store.finish_item(job_id, idx, error=str(e))
+
+        if finished:
+            self.store.cleanup_job_files(job_id)
+            logger.info("batch job completed", extra={"job_id": job_id})
+
+
+class UploadLimitExceeded(ValueError):
+    """
+    A batch upload expands past the file-count or size limits.
+    """
+
+
+def expand_uploads(uploads, max_files=None, max_file_bytes=None, max_total_bytes=None):
+    """
+    uploads: list of (filename, bytes). Zip archives are unpacked into their
+    supported members; anything else unsupported is dropped. The limits are
+    enforced while unpacking (a small archive can inflate to gigabytes), so
+    an oversized batch fails before it is held in memory.
+    """
+    files = []
+    total = 0
+
+    def check(name, size):
+        if max_files is not None and len(files) >= max_files:
+            raise UploadLimitExceeded(f"Batch exceeds {max_files} documents")
+        if max_file_bytes is not None and size > max_file_bytes:
+            raise UploadLimitExceeded(f"{name} exceeds {max_file_bytes} bytes")
+        if max_total_bytes is not None and total + size > max_total_bytes:
+            raise UploadLimitExceeded(f"Batch exceeds {max_total_bytes} bytes uncompressed")
+
+    for filename, content in uploads:
+        lower = filename.lower()
+        if lower.endswith(".zip"):
+            with zipfile.ZipFile(io.BytesIO(content)) as archive:
+                for member in archive.infolist():
+                    name = os.path.basename(member.filename)
+                    if member.is_dir() or not name.lower().endswith(SUPPORTED_EXTENSIONS):
+                        continue
+                    # The declared size is checked before reading; the read itself stops one
+                    # byte past the declared size in case the header understates it
+                    check(name, member.file_size)
+                    with archive.open(member) as f:
+                        data = f.read(member.file_size + 1)
+                    check(name, len(data))
+                    files.append((name, data))
+                    total += len(data)
+        elif lower.endswith(SUPPORTED_EXTENSIONS):
+            check(filename, len(content))
+            files.append((filename, content))
+            total += len(content)
+    return files
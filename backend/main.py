@@ -1,43 +1,366 @@
-from fastapi import FastAPI, UploadFile, File, HTTPException
+from fastapi import FastAPI, UploadFile, File, HTTPException, Request, Response
+from typing import List, Optional
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse, StreamingResponse
+from contextlib import asynccontextmanager
+from concurrent.futures import ThreadPoolExecutor
 # Import your new Orchestrator
 from agents.directory_management_agent import DirectoryManagementAgent
-import shutil
+from job_queue import JobStore, BatchProcessor, UploadLimitExceeded, expand_uploads
+from agents.http_client import get_http_client
+from agents.revalidation import RevalidationScheduler
+from agents.notification_agent import NotificationAgent, notice_key
+from uploads import UPLOAD_MAX_BYTES, receive_upload
+from startup import AgentSystem
+from agents.telemetry import REQUEST_LATENCY, REQUESTS_IN_FLIGHT, get_logger, new_trace
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
+from starlette.routing import Match
+from pydantic import BaseModel
+import html
+import time
+import asyncio
+import json
 import os
 from dotenv import load_dotenv
 
 # Load Environment
 load_dotenv()
 
-app = FastAPI(title="Provider Validator Agent System")
+logger = get_logger("api")
 
-# Initialize the Master Agent
-try:
-    manager = DirectoryManagementAgent()
-except Exception as e:
-    print(f"❌ Startup Error: {e}")
-    manager = None
+# Agent calls are blocking I/O offloaded to threads, so size the pool for
+# concurrent uploads (each document uses up to 3 threads at once).
+IO_THREADS = int(os.getenv("AGENT_IO_THREADS", "64"))
+BATCH_MAX_FILES = int(os.getenv("BATCH_MAX_FILES", "1000"))
+BATCH_UPLOAD_MAX_BYTES = int(os.getenv("BATCH_UPLOAD_MAX_BYTES", str(500 * 1024 * 1024)))
+# Uncompressed size of a batch once zip archives are unpacked
+BATCH_EXPANDED_MAX_BYTES = int(os.getenv("BATCH_EXPANDED_MAX_BYTES", str(BATCH_UPLOAD_MAX_BYTES)))
+
+@asynccontextmanager
+async def lifespan(app):
+    asyncio.get_running_loop().set_default_executor(ThreadPoolExecutor(max_workers=IO_THREADS))
+    # Agents are built and warmed in the background; /readyz flips once they are up
+    await agent_system.start(on_agents_ready)
+    yield
+    await agent_system.stop()
+    if revalidation:
+        await revalidation.stop()
+    if batch_processor:
+        await batch_processor.stop()
+    if notifier:
+        await notifier.stop()
+
+app = FastAPI(title="Provider Validator Agent System", lifespan=lifespan)
+
+def _route_label(scope):
+    # Route templates (/jobs/{job_id}) keep metric label cardinality bounded
+    for route in app.router.routes:
+        if route.matches(scope)[0] == Match.FULL:
+            return route.path
+    return "unmatched"
+
+@app.middleware("http")
+async def trace_requests(request: Request, call_next):
+    trace_id = new_trace(request.headers.get("X-Request-ID"))
+    endpoint = _route_label(request.scope)
+    in_flight = REQUESTS_IN_FLIGHT.labels(endpoint)
+    in_flight.inc()
+    started = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        response.headers["X-Trace-Id"] = trace_id
+        return response
+    finally:
+        in_flight.dec()
+        REQUEST_LATENCY.labels(endpoint, str(status)).observe(time.perf_counter() - started)
+
+# The Master Agent is built by the start-up task (see startup.py): until it is
+# ready, agent endpoints answer 503 and a failed build is retried with backoff
+agent_system = AgentSystem(DirectoryManagementAgent)
+manager = None
+
+# Batch jobs: local SQLite job store + in-process worker pool
+job_store = None
+batch_processor = None
+
+# Background re-checks of directory entries that have not been verified recently
+revalidation = None
+
+# Outbound email: persistent outbox + background SMTP sender
+notifier = None
+
+async def on_agents_ready(ready_manager):
+    """
+    Opens the stores and starts the background workers once the agents are
+    up (nothing touches DATA_DIR at import). The start-up task retries this
+    after a failure, so each piece is only built once.
+    """
+    global manager, job_store, batch_processor, revalidation, notifier
+    if job_store is None:
+        job_store = await asyncio.to_thread(JobStore)
+    if notifier is None:
+        outbox = await asyncio.to_thread(NotificationAgent)
+        await outbox.start()
+        notifier = outbox
+    if batch_processor is None:
+        processor = BatchProcessor(ready_manager, job_store)
+        await processor.start()
+        batch_processor = processor
+    if revalidation is None:
+        scheduler = RevalidationScheduler(ready_manager)
+        await scheduler.start()
+        revalidation = scheduler
+    manager = ready_manager
+
+def require_manager():
+    if manager is None:
+        error = agent_system.last_error()
+        detail = f"Agent system unavailable, retrying: {error}" if error else "Agent system is starting"
+        raise HTTPException(status_code=503, detail=detail, headers={"Retry-After": "2"})
+    return manager
+
+@app.get("/healthz")
+async def healthz():
+    """
+    Liveness: the process is up and its event loop answers.
+    """
+    return {"status": "ok", "uptime_seconds": round(time.time() - agent_system.started_at, 3)}
+
+@app.get("/readyz")
+async def readyz():
+    """
+    Readiness: agents built and every critical store warmed, with per-dependency
+    status and timings. 503 until then, so no traffic reaches a cold worker.
+    """
+    readiness = agent_system.readiness()
+    return JSONResponse(readiness, status_code=200 if readiness["ready"] else 503)
 
 @app.post("/validate_document")
 async def validate_document(file: UploadFile = File(...)):
-    if not manager:
-        raise HTTPException(status_code=500, detail="Agent System not initialized")
+    require_manager()
 
-    temp_filename = f"temp_{file.filename}"
-    
-    try:
-        # Save File
-        with open(temp_filename, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
+    # Stream + hash the upload (in memory, or a unique temp file when large)
+    document = await receive_upload(file)
 
-        # Delegate to the Master Agent
-        report = manager.process_application(temp_filename)
-        return report
+    try:
+        # Delegate to the Master Agent: one report per provider in the document
+        return await manager.process_packet_async(document)
 
     except Exception as e:
-        print(f"SERVER ERROR: {e}")
+        logger.exception("validation request failed")
         raise HTTPException(status_code=500, detail=str(e))
         
     finally:
-        # Cleanup
-        if os.path.exists(temp_filename):
-            os.remove(temp_filename)
\ No newline at end of file
+        # Cleanup (only spilled uploads own a temp file)
+        document.close()
+
+def _sse(event, payload):
+    return f"event: {event}\ndata: {json.dumps(payload, default=str)}\n\n"
+
+@app.post("/validate_document/stream")
+async def validate_document_stream(file: UploadFile = File(...)):
+    """
+    Server-Sent Events version of /validate_document: one `stage` event per
+    finished stage (extraction, npi_registry, state_license, enrichment,
+    matching, qa), then a `report` event per provider with its full report.
+    Multi-provider documents tag stage events with their `segment` index.
+    """
+    require_manager()
+
+    document = await receive_upload(file)
+    events = asyncio.Queue()
+
+    async def run_pipeline():
+        try:
+            for report in await manager.process_packet_async(document, emit=events.put):
+                await events.put(("report", report))
+        except Exception as e:
+            logger.exception("validation request failed")
+            await events.put(("error", {"detail": str(e)}))
+        finally:
+            document.close()
+            await events.put(None)
+
+    async def stream():
+        task = asyncio.create_task(run_pipeline())
+        try:
+            while True:
+                item = await events.get()
+                if item is None:
+                    break
+                if isinstance(item, tuple):
+                    yield _sse(*item)
+                else:
+                    yield _sse("stage", item)
+        finally:
+            if not task.done():
+                task.cancel()
+
+    return StreamingResponse(stream(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+@app.post("/validate_batch", status_code=202)
+async def validate_batch(files: List[UploadFile] = File(...)):
+    require_manager()
+
+    uploads = []
+    for f in files:
+        document = await receive_upload(f, max_bytes=BATCH_UPLOAD_MAX_BYTES)
+        uploads.append((document.filename, document.read_bytes()))
+        document.close()
+    try:
+        documents = await run_in_threadpool(
+            expand_uploads, uploads, max_files=BATCH_MAX_FILES,
+            max_file_bytes=UPLOAD_MAX_BYTES, max_total_bytes=BATCH_EXPANDED_MAX_BYTES,
+        )
+    except UploadLimitExceeded as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"Could not read upload: {e}")
+
+    if not documents:
+        raise HTTPException(status_code=400, detail="No supported documents (PDF/PNG/JPG) in upload")
+
+    job_id = await run_in_threadpool(job_store.create_job, documents)
+    batch_processor.submit(job_id, len(documents))
+    return job_store.get_job(job_id)
+
+@app.get("/jobs/{job_id}")
+async def get_job_status(job_id: str):
+    require_manager()
+    job = job_store.get_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+@app.get("/jobs/{job_id}/results")
+async def get_job_results(job_id: str, offset: int = 0, limit: int = 50, status: Optional[str] = None):
+    require_manager()
+    job = job_store.get_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    limit = max(1, min(limit, 500))
+    return {
+        "job": job,
+        "offset": offset,
+        "limit": limit,
+        "results": job_store.get_results(job_id, offset=offset, limit=limit, status=status),
+    }
+
+@app.get("/reports")
+async def list_reports(
+    offset: int = 0,
+    limit: int = 50,
+    sort: str = "score",
+    order: str = "asc",
+    priority: Optional[str] = None,
+    min_score: Optional[int] = None,
+    max_score: Optional[int] = None,
+    npi: Optional[str] = None,
+):
+    """
+    Review queue: stored QA reports, filtered, sorted and paged in the database.
+    """
+    require_manager()
+    limit = max(1, min(limit, 500))
+    try:
+        page = await run_in_threadpool(
+            manager.reports.query, offset=max(0, offset), limit=limit, sort=sort, order=order,
+            priority=priority, min_score=min_score, max_score=max_score, npi=npi,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"offset": offset, "limit": limit, **page}
+
+@app.get("/reports/summary")
+async def reports_summary():
+    require_manager()
+    return manager.reports.summary()
+
+@app.get("/reports/{report_id}")
+async def get_report(report_id: int):
+    require_manager()
+    report = manager.reports.get(report_id)
+    if report is None:
+        raise HTTPException(status_code=404, detail="Report not found")
+    return report
+
+@app.get("/locations/nearby")
+async def locations_nearby(lat: float, lon: float, radius_km: float = 5, limit: int = 50):
+    """
+    Validated providers within `radius_km` of a point: the total and the nearest `limit`.
+    """
+    require_manager()
+    limit = max(1, min(limit, 500))
+    try:
+        return await run_in_threadpool(manager.locations.within, lat, lon, radius_km, limit=limit)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@app.get("/locations/nearest")
+async def locations_nearest(lat: float, lon: float, k: int = 10):
+    """
+    The k validated providers nearest to a point.
+    """
+    require_manager()
+    k = max(1, min(k, 100))
+    try:
+        return {"items": await run_in_threadpool(manager.locations.nearest, lat, lon, k)}
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+class NotificationRequest(BaseModel):
+    report_id: int
+    recipient: str
+    subject: str
+    body: str
+
+@app.post("/notifications", status_code=202)
+async def send_notification(request: NotificationRequest):
+    """
+    Queues a correction email about one stored report. The same notice (same
+    provider, same discrepancies) is only sent once per dedupe window.
+    """
+    require_manager()
+    stored = await run_in_threadpool(manager.reports.get, request.report_id)
+    if stored is None:
+        raise HTTPException(status_code=404, detail="Report not found")
+    mismatches = stored["report"].get("validation_result", {}).get("mismatches", [])
+    html_body = html.escape(request.body).replace("\n", "<br>\n")
+    result = await run_in_threadpool(
+        notifier.send_email, request.recipient, request.subject, html_body, notice_key(stored["npi"], mismatches, request.recipient, report_id=request.report_id)
+    )
+    if result["status"] == "error":
+        raise HTTPException(status_code=503, detail=result["message"])
+    return result
+
+@app.get("/notifications/stats")
+async def notification_stats():
+    require_manager()
+    return notifier.stats()
+
+@app.get("/stats")
+async def get_stats():
+    require_manager()
+    return {
+        "http": get_http_client().metrics(),
+        "npi_cache": manager.validator.npi_cache.stats(),
+        "license_store": manager.validator.license_store.stats(),
+        "nppes_store": manager.validator.nppes_store.stats() if manager.validator.nppes_store else None,
+        "enrichment": manager.enricher.stats(),
+        "extraction": manager.extractor.stats(),
+        "reports": manager.reports.stats(),
+        "matching": manager.matcher.stats(),
+        "locations": manager.locations.stats(),
+        "revalidation": revalidation.stats(),
+        "notifications": notifier.stats(),
+    }
+
+@app.get("/metrics")
+async def metrics():
+    """
+    Prometheus scrape endpoint: per-stage and per-upstream latency histograms,
+    error/timeout counters, cache outcomes and in-flight gauges.
+    """
+    return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
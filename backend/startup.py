@@ -0,0 +1,147 @@
+import os
+import time
+import asyncio
+
+from agents.http_client import get_http_client
+from agents.local_extractor import load_pypdf
+from agents.telemetry import get_logger
+
+logger = get_logger("startup")
+
+class AgentSystem:
+    """
+    Builds the agents and warms their pools and indexes in a background task
+    started by the API lifespan: the process answers /healthz immediately and
+    /readyz reports each dependency as it comes up. A failed build (bad
+    config, unreadable store) is retried with backoff instead of leaving the
+    worker up without agents.
+    """
+    def __init__(self, factory, retry_interval=None, max_retry_interval=None, warm_upstreams=None):
+        self.factory = factory
+        self.retry_interval = retry_interval or float(os.getenv("STARTUP_RETRY_INTERVAL", "2"))
+        self.max_retry_interval = max_retry_interval or float(os.getenv("STARTUP_MAX_RETRY_INTERVAL", "60"))
+        # Open a keep-alive connection to the NPI Registry before the first upload needs one
+        self.warm_upstreams = os.getenv("STARTUP_WARM_UPSTREAMS", "1") == "1" if warm_upstreams is None else warm_upstreams
+        self.manager = None
+        self.started_at = time.time()
+        self.ready_at = None
+        self.attempts = 0
+        self.dependencies = {}
+        self.task = None
+
+    async def start(self, on_ready):
+        """
+        `on_ready(manager)` is awaited once every critical dependency is up.
+        It is retried with backoff if it raises, so it must be safe to re-run.
+        """
+        self.task = asyncio.create_task(self._run(on_ready))
+
+    async def stop(self):
+        if self.task:
+            self.task.cancel()
+            await asyncio.gather(self.task, return_exceptions=True)
+            self.task = None
+
+    def readiness(self):
+        ready = self.manager is not None and all(d["ready"] for d in self.dependencies.values() if d["critical"])
+        return {
+            "ready": ready,
+            "attempts": self.attempts,
+            "startup_seconds": round(self.ready_at - self.started_at, 3) if self.ready_at else None,
+            "dependencies": self.dependencies,
+        }
+
+    def last_error(self):
+        failed = [f"{name}: {d['error']}" for name, d in self.dependencies.items() if d["critical"] and d.get("error")]
+        return "; ".join(failed) or None
+
+    async def _run(self, on_ready):
+        delay = self.retry_interval
+        while True:
+            self.attempts += 1
+            ok, manager = await asyncio.to_thread(self._check, "agents", True, self.factory)
+            if ok:
+                break
+            await asyncio.sleep(delay)
+            delay = min(self.max_retry_interval, delay * 2)
+
+        pending = self._warm_steps(manager)
+        delay = self.retry_interval
+        while True:
+            pending = [step for step in pending if not (await asyncio.to_thread(self._check, *step))[0]]
+            if not any(critical for _, critical, _ in pending):
+                break
+            await asyncio.sleep(delay)
+            delay = min(self.max_retry_interval, delay * 2)
+
+        delay = self.retry_interval
+        while not await self._ready(on_ready, manager):
+            await asyncio.sleep(delay)
+            delay = min(self.max_retry_interval, delay * 2)
+        self.manager = manager
+        self.ready_at = time.time()
+        logger.info("agent system ready", extra={"startup_seconds": round(self.ready_at - self.started_at, 3), "attempts": self.attempts})
+
+        # Best effort, after readiness: an upstream outage must not keep workers out of rotation
+        if self.warm_upstreams:
+            await asyncio.to_thread(self._check, "npi_registry", False, lambda: self._warm_registry(manager))
+
+    def _warm_steps(self, manager):
+        """
+        (name, critical, step): touching each store loads its index/pages and
+        opens its SQLite connection before the first request needs them.
+        """
+        validator = manager.validator
+        steps = [
+            ("extraction_model", True, lambda: manager.extractor.model_client.name),
+            ("pdf_parser", True, lambda: "available" if load_pypdf() else "not installed (model only)"),
+            ("license_store", True, lambda: (validator.license_store.lookup("0"), validator.license_store.stats())[1]),
+            ("npi_cache", True, lambda: validator.npi_cache.get("0") and None),
+            ("extraction_cache", True, lambda: manager.extractor.cache.get("warm-up") and None),
+            ("geocoding", True, manager.enricher.stats),
+            ("report_store", True, manager.reports.summary),
+            ("matching_index", True, manager.matcher.stats),
+            ("location_index", True, manager.locations.stats),
+        ]
+        if validator.nppes_store:
+            steps.append(("nppes_store", False, lambda: (validator.nppes_store.lookup("0"), validator.nppes_store.stats())[1]))
+        return steps
+
+    async def _ready(self, on_ready, manager):
+        """
+        Runs the app's on_ready hook, recorded as the "agents_ready" dependency
+        so /readyz and the 503 detail show why a worker is not serving yet.
+        """
+        started = time.perf_counter()
+        try:
+            await on_ready(manager)
+        except Exception as e:
+            logger.exception("start-up step failed", extra={"dependency": "agents_ready"})
+            self.dependencies["agents_ready"] = {
+                "ready": False, "critical": True, "seconds": round(time.perf_counter() - started, 3), "error": str(e),
+            }
+            return False
+        self.dependencies["agents_ready"] = {"ready": True, "critical": True, "seconds": round(time.perf_counter() - started, 3)}
+        return True
+
+    def _warm_registry(self, manager):
+        response = get_http_client().get(manager.validator.base_url, params={"version": "2.1"})
+        return f"HTTP {response.status_code}"
+
+    def _check(self, name, critical, step):
+        started = time.perf_counter()
+        try:
+            result = step()
+        except Exception as e:
+            if critical:
+                logger.exception("start-up step failed", extra={"dependency": name})
+            else:
+                logger.warning("optional start-up step failed", extra={"dependency": name, "error": str(e)})
+            self.dependencies[name] = {
+                "ready": False, "critical": critical, "seconds": round(time.perf_counter() - started, 3), "error": str(e),
+            }
+            return False, None
+        self.dependencies[name] = {"ready": True, "critical": critical, "seconds": round(time.perf_counter() - started, 3)}
+        if isinstance(result, (dict, str)):
+            self.dependencies[name]["detail"] = result
+        return True, result
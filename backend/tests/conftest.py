@@ -0,0 +1,72 @@
+import time
+import threading
+
+import pytest
+
+from agents.directory_management_agent import DirectoryManagementAgent
+from agents.document_splitter import DocumentSplitter
+from agents.matching import ProviderMatcher
+from agents.qa_rules import load_rules
+from agents.report_store import ReportStore
+from agents.spatial_index import SpatialIndex
+
+PROVIDER = {
+    "provider_name": "Jane Doe",
+    "npi_number": "1134527302",
+    "phone_number": "212-674-9120",
+    "address": "123 Main St, New York, NY 10003",
+}
+
+class StubUpstreams:
+    """
+    Stands in for the extraction, registry, license and enrichment agents:
+    fixed answers after `delay` seconds, with each call's (name, start, end)
+    recorded so tests can check what ran concurrently.
+    """
+    def __init__(self, delay=0):
+        self.delay = delay
+        self.calls = []
+        self.lock = threading.Lock()
+
+    def _call(self, name, result):
+        started = time.perf_counter()
+        time.sleep(self.delay)
+        with self.lock:
+            self.calls.append((name, started, time.perf_counter()))
+        return result
+
+    def process_document(self, document):
+        return self._call("extraction", dict(PROVIDER))
+
+    def validate_npi(self, npi):
+        return self._call("npi_registry", {
+            "official_name": "JANE DOE", "official_phone": "212-674-9120",
+            "official_address": "123 Main St", "status": "Active",
+        })
+
+    def check_state_license(self, npi):
+        return self._call("state_license", {"state_license_status": "Active"})
+
+    def enrich_provider_data(self, name, address):
+        return self._call("enrichment", {"latitude": 40.73, "longitude": -73.99, "verified_location": True})
+
+
+@pytest.fixture
+def make_manager(tmp_path):
+    """
+    A DirectoryManagementAgent with real stores under tmp_path and
+    StubUpstreams (available as manager.upstreams) for the network agents.
+    """
+    def make(delay=0):
+        manager = DirectoryManagementAgent.__new__(DirectoryManagementAgent)
+        manager.upstreams = StubUpstreams(delay)
+        manager.extractor = manager.validator = manager.enricher = manager.upstreams
+        manager.rules = load_rules()
+        manager.reports = ReportStore(str(tmp_path / "reports.sqlite"))
+        manager.matcher = ProviderMatcher(str(tmp_path / "matching.sqlite"))
+        manager.locations = SpatialIndex(str(tmp_path / "locations.sqlite"))
+        manager.geocode_registry_online = False
+        manager.splitter = DocumentSplitter()
+        manager.segment_concurrency = 16
+        return manager
+    return make
@@ -0,0 +1,102 @@
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from agents import cache as cache_module
+from agents.cache import TieredCache
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(cache_module, "time", SimpleNamespace(time=lambda: now[0]))
+    return now
+
+def make_cache(tmp_path, **kwargs):
+    kwargs.setdefault("ttl", 60)
+    return TieredCache("test", db_path=str(tmp_path / "cache.sqlite"), **kwargs)
+
+def test_callers_get_copies_on_hits_and_misses(tmp_path):
+    cache = make_cache(tmp_path)
+    fetched = cache.get_or_fetch("k", lambda key: {"name": "JANE DOE", "tags": ["a"]})
+    fetched["name"] = "changed"
+    fetched["tags"].append("b")
+    hit = cache.get_or_fetch("k", lambda key: pytest.fail("fresh entry refetched"))
+    assert hit == {"name": "JANE DOE", "tags": ["a"]}
+    hit["tags"].append("c")
+    assert cache.get("k") == ({"name": "JANE DOE", "tags": ["a"]}, "fresh")
+
+def test_concurrent_misses_share_one_fetch(tmp_path):
+    cache = make_cache(tmp_path)
+    calls = []
+    release = threading.Event()
+
+    def fetch(key):
+        calls.append(key)
+        release.wait(5)
+        return {"value": 1}
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get_or_fetch("k", fetch))) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    while cache.stats()["coalesced"] < 7:
+        time.sleep(0.01)
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert calls == ["k"]
+    assert results == [{"value": 1}] * 8
+    assert len({id(result) for result in results}) == 8
+
+def test_positive_and_negative_entries_expire_on_their_own_ttl(tmp_path, clock):
+    cache = make_cache(tmp_path, ttl=100, negative_ttl=10)
+    cache.set("found", {"status": "Active"})
+    cache.set("missing", {"status": "Not Found"}, negative=True)
+    clock[0] += 11
+    assert cache.get("found")[1] == "fresh"
+    assert cache.get("missing") == (None, None)
+    clock[0] += 90
+    assert cache.get("found") == (None, None)
+
+def test_expired_entries_are_read_from_disk_after_restart(tmp_path, clock):
+    make_cache(tmp_path, ttl=100).set("k", {"v": 1})
+    reopened = make_cache(tmp_path, ttl=100)
+    assert reopened.get("k") == ({"v": 1}, "fresh")
+    clock[0] += 101
+    assert make_cache(tmp_path, ttl=100).get("k") == (None, None)
+
+def test_stale_entry_is_served_while_refreshing(tmp_path, clock):
+    cache = make_cache(tmp_path, ttl=10, stale_ttl=50)
+    cache.set("k", {"v": 1})
+    clock[0] += 20
+    refreshed = threading.Event()
+
+    def fetch(key):
+        refreshed.set()
+        return {"v": 2}
+
+    assert cache.get_or_fetch("k", fetch) == {"v": 1}
+    assert refreshed.wait(5)
+    for _ in range(100):
+        if cache.stats()["refreshes"]:
+            break
+        time.sleep(0.01)
+    assert cache.get("k") == ({"v": 2}, "fresh")
+
+def test_uncacheable_results_are_returned_but_not_stored(tmp_path):
+    cache = make_cache(tmp_path)
+    assert cache.get_or_fetch("k", lambda key: {"error": "down"}, cacheable=lambda r: "error" not in r) == {"error": "down"}
+    assert cache.get("k") == (None, None)
+
+def test_disk_bound_evicts_entries_closest_to_expiry(tmp_path, clock):
+    cache = make_cache(tmp_path, max_disk_entries=50)
+    for i in range(100):
+        clock[0] += 1
+        cache.set(f"k{i}", {"i": i})
+    assert cache.stats()["evictions"] == 50
+    restarted = make_cache(tmp_path)
+    assert restarted.get("k49") == (None, None)
+    assert restarted.get("k50") == ({"i": 50}, "fresh")
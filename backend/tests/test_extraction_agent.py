@@ -0,0 +1,84 @@
+import threading
+
+import pytest
+
+from agents.document import Document
+from agents.extraction_agent import ExtractionAgent
+from agents.local_extractor import LocalTextExtractor
+from agents.model_clients import ModelClient
+
+class CountingModel(ModelClient):
+    """
+    Answers with a fixed record (or `answer`) and counts calls; `gate` holds them open.
+    """
+    name = "counting"
+
+    def __init__(self, answer='{"provider_name": "JANE DOE", "npi_number": "1134527302"}'):
+        self.answer = answer
+        self.calls = 0
+        self.gate = threading.Event()
+        self.gate.set()
+
+    def generate(self, document, prompt):
+        self.calls += 1
+        self.gate.wait(5)
+        if isinstance(self.answer, Exception):
+            raise self.answer
+        return self.answer
+
+@pytest.fixture
+def make_agent(tmp_path, monkeypatch):
+    monkeypatch.setenv("CACHE_DB_PATH", str(tmp_path / "cache.sqlite"))
+    def make(model):
+        return ExtractionAgent(api_key=None, model_client=model, local_extractor=LocalTextExtractor())
+    return make
+
+def scan(data=b"\x89PNG\r\n\x1a\nscan", filename="scan.png"):
+    return Document(filename, data=data)
+
+def test_identical_bytes_reuse_one_extraction(make_agent):
+    model = CountingModel()
+    agent = make_agent(model)
+    first = agent.process_document(scan())
+    again = agent.process_document(scan(filename="renamed.png"))
+    assert first == again == {"provider_name": "JANE DOE", "npi_number": "1134527302", "extraction_method": "model"}
+    assert model.calls == 1
+    agent.process_document(scan(data=b"\x89PNG\r\n\x1a\nother"))
+    assert model.calls == 2
+
+def test_results_survive_a_restart(make_agent):
+    make_agent(CountingModel()).process_document(scan())
+    model = CountingModel()
+    assert make_agent(model).process_document(scan())["provider_name"] == "JANE DOE"
+    assert model.calls == 0
+
+def test_concurrent_uploads_of_one_document_share_a_model_call(make_agent):
+    model = CountingModel()
+    model.gate.clear()
+    agent = make_agent(model)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(agent.process_document(scan()))) for _ in range(5)]
+    for t in threads:
+        t.start()
+    while agent.cache.stats()["coalesced"] < 4:
+        threading.Event().wait(0.01)
+    model.gate.set()
+    for t in threads:
+        t.join()
+    assert model.calls == 1
+    assert len(results) == 5 and all(r == results[0] for r in results)
+
+def test_failed_extractions_are_not_cached(make_agent):
+    model = CountingModel(answer="not json")
+    agent = make_agent(model)
+    assert "error" in agent.process_document(scan())
+    model.answer = '{"provider_name": "JANE DOE"}'
+    assert agent.process_document(scan())["provider_name"] == "JANE DOE"
+    assert model.calls == 2
+
+def test_cache_key_changes_with_the_model(make_agent):
+    make_agent(CountingModel()).process_document(scan())
+    other = CountingModel()
+    other.name = "other-model"
+    make_agent(other).process_document(scan())
+    assert other.calls == 1
@@ -0,0 +1,65 @@
+from types import SimpleNamespace
+
+import pytest
+
+from agents.cache import TieredCache
+from agents.data_validation_agent import DataValidationAgent
+from agents.document import Document
+from agents.enrichment_agent import InformationEnrichmentAgent
+from agents.http_client import HttpClient
+from agents.model_clients import HttpModelClient
+from benchmarks.fake_upstreams import DEFAULT_PROVIDER, FakeUpstreams, scanned_document
+
+@pytest.fixture
+def upstreams():
+    with FakeUpstreams(providers={DEFAULT_PROVIDER["npi_number"]: DEFAULT_PROVIDER}) as server:
+        yield server
+
+def make_validator(tmp_path, upstreams, http):
+    return DataValidationAgent(
+        npi_cache=TieredCache("npi_registry", ttl=60, db_path=str(tmp_path / "cache.sqlite")),
+        license_store=SimpleNamespace(lookup=lambda npi: None),
+        nppes_store=SimpleNamespace(lookup=lambda npi: None),
+        http_client=http,
+    )
+
+def test_registry_answers_parse_like_the_cms_api(tmp_path, upstreams, monkeypatch):
+    monkeypatch.setenv("NPI_REGISTRY_URL", upstreams.env()["NPI_REGISTRY_URL"])
+    validator = make_validator(tmp_path, upstreams, HttpClient(max_retries=0))
+    assert validator.validate_npi("1134527302") == {
+        "official_name": "JESSICA BONET MS", "official_phone": "212-674-9120",
+        "official_address": "123 Main St", "official_city": "New York",
+        "official_state": "NY", "official_postal_code": "10003", "status": "Active",
+    }
+    assert validator.validate_npi("1245319599")["status"] == "Not Found"
+    assert upstreams.stats()["npi"] == 2
+
+def test_nominatim_answers_are_stable_coordinates(tmp_path, upstreams, monkeypatch):
+    monkeypatch.setenv("NOMINATIM_URL", upstreams.env()["NOMINATIM_URL"])
+    def enrich():
+        cache = TieredCache("geocode", ttl=60, db_path=str(tmp_path / f"cache{upstreams.stats()['geocode']}.sqlite"))
+        agent = InformationEnrichmentAgent(http_client=HttpClient(max_retries=0), geocode_cache=cache)
+        agent.gazetteer = None
+        return agent.enrich_provider_data("Jane Doe", DEFAULT_PROVIDER["address"])
+
+    # Fresh cache each time, so both calls reach the fake
+    first, second = enrich(), enrich()
+    assert upstreams.stats()["geocode"] == 2
+    assert first["verified_location"] is True
+    assert (first["latitude"], first["longitude"]) == (second["latitude"], second["longitude"])
+    assert 25 <= first["latitude"] <= 49 and -124 <= first["longitude"] <= -67
+
+def test_model_reads_back_the_scanned_record(upstreams):
+    provider = dict(DEFAULT_PROVIDER, provider_name="JANE DOE")
+    client = HttpModelClient(url=upstreams.env()["EXTRACTION_MODEL_URL"], http_client=HttpClient(max_retries=0))
+    document = Document("scan.png", data=scanned_document(provider))
+    assert client.generate(document, "prompt") == (
+        '{"provider_name": "JANE DOE", "npi_number": "1134527302", '
+        '"phone_number": "212-674-9120", "address": "123 Main St, New York, NY 10003"}'
+    )
+
+def test_injected_errors_are_503s():
+    with FakeUpstreams(error_rate=1.0) as upstreams:
+        response = HttpClient(max_retries=0).get(upstreams.env()["NOMINATIM_URL"], params={"q": "x"})
+        assert response.status_code == 503
+        assert upstreams.stats()["errors"] == 1
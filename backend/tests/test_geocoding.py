@@ -0,0 +1,95 @@
+from agents.cache import TieredCache
+from agents.enrichment_agent import InformationEnrichmentAgent
+from agents.geocoding import OfflineGazetteer, key_variants, normalize_address, parse_coordinates
+
+class StubHttp:
+    """
+    Nominatim stand-in: answers with `results`, or raises when it is an exception.
+    """
+    def __init__(self, results):
+        self.results = results
+        self.calls = 0
+
+    def get(self, url, headers=None, params=None):
+        self.calls += 1
+        if isinstance(self.results, Exception):
+            raise self.results
+        return type("Response", (), {"json": lambda _: self.results})()
+
+def make_agent(tmp_path, http, gazetteer=None):
+    cache = TieredCache("geocode", ttl=60, db_path=str(tmp_path / "cache.sqlite"))
+    agent = InformationEnrichmentAgent(http_client=http, geocode_cache=cache, gazetteer=gazetteer)
+    # gazetteer=None falls back to open_gazetteer(); keep the tests off any built one
+    agent.gazetteer = gazetteer
+    return agent
+
+def test_normalize_address_variants_share_a_key():
+    key = "123 MAIN ST SPRINGFIELD IL 62701"
+    assert normalize_address("123 Main Street, Suite 4, Springfield, IL 62701-1234, USA") == key
+    assert normalize_address("123 MAIN ST. #4 Springfield IL 62701") == key
+    assert normalize_address("123 Main St, Apt 9B, Springfield, IL 62701") == key
+    assert normalize_address("") == ""
+    assert normalize_address(None) == ""
+
+def test_key_variants_drop_the_zip():
+    assert key_variants("123 MAIN ST SPRINGFIELD IL 62701") == ["123 MAIN ST SPRINGFIELD IL 62701", "123 MAIN ST SPRINGFIELD IL"]
+    assert key_variants("123 MAIN ST SPRINGFIELD IL") == ["123 MAIN ST SPRINGFIELD IL"]
+
+def test_parse_coordinates():
+    assert parse_coordinates("40.7128, -74.0060") == (40.7128, -74.006)
+    assert parse_coordinates("91, 0") is None
+    assert parse_coordinates("40.7") is None
+    assert parse_coordinates(None) is None
+
+def test_gazetteer_builds_from_both_csv_layouts(tmp_path):
+    simple = tmp_path / "simple.csv"
+    simple.write_text("address,lat,lon\n\"123 Main Street, Springfield, IL 62701\",39.8,-89.6\nbad row,x,y\n")
+    openaddresses = tmp_path / "oa.csv"
+    openaddresses.write_text("LON,LAT,NUMBER,STREET,UNIT,CITY,DISTRICT,REGION,POSTCODE\n-74.0,40.7,10,Broadway,,New York,,NY,10004\n")
+
+    gazetteer = OfflineGazetteer(str(tmp_path / "gazetteer.sqlite"))
+    gazetteer.build(str(simple))
+    gazetteer.build(str(openaddresses))
+    assert gazetteer.lookup("123 MAIN ST, Suite 2, Springfield, IL 62701") == {
+        "lat": 39.8, "lon": -89.6, "display_name": "123 Main Street, Springfield, IL 62701",
+    }
+    # Addresses without (or with a different) ZIP fall back to the ZIP-less key
+    assert gazetteer.lookup("123 Main St, Springfield, IL")["lat"] == 39.8
+    assert gazetteer.lookup("10 Broadway, New York, NY 10004")["lon"] == -74.0
+    assert gazetteer.lookup("1 Nowhere Rd, Springfield, IL") is None
+
+def test_gazetteer_is_consulted_before_nominatim(tmp_path):
+    csv_path = tmp_path / "simple.csv"
+    csv_path.write_text("address,lat,lon\n\"123 Main St, Springfield, IL 62701\",39.8,-89.6\n")
+    gazetteer = OfflineGazetteer(str(tmp_path / "gazetteer.sqlite"))
+    gazetteer.build(str(csv_path))
+    http = StubHttp([])
+    agent = make_agent(tmp_path, http, gazetteer)
+
+    result = agent.enrich_provider_data("Jane Doe", "123 Main Street, Springfield, IL 62701")
+    assert (result["web_source"], result["latitude"], result["longitude"]) == ("Offline Gazetteer", 39.8, -89.6)
+    assert http.calls == 0
+    assert agent.stats()["gazetteer_hits"] == 1
+
+def test_online_geocodes_are_cached_by_normalized_address(tmp_path):
+    http = StubHttp([{"lat": "40.7", "lon": "-74.0", "display_name": "123 Main St"}])
+    agent = make_agent(tmp_path, http)
+    first = agent.enrich_provider_data("Jane Doe", "123 Main Street, New York, NY 10003")
+    second = agent.enrich_provider_data("Jane Doe", "123 MAIN ST., New York, NY 10003")
+    assert first == second
+    assert first["verified_location"] is True
+    assert http.calls == 1
+    assert agent.locate("123 Main St, New York, NY 10003", online=False) == (40.7, -74.0)
+
+def test_service_errors_are_not_cached(tmp_path):
+    http = StubHttp(ConnectionError("down"))
+    agent = make_agent(tmp_path, http)
+    assert agent.enrich_provider_data("Jane Doe", "1 Main St, Albany, NY")["verified_location"] == "Error"
+    agent.enrich_provider_data("Jane Doe", "1 Main St, Albany, NY")
+    assert http.calls == 2
+
+def test_offline_locate_never_calls_nominatim(tmp_path):
+    http = StubHttp([{"lat": "1", "lon": "2", "display_name": "x"}])
+    agent = make_agent(tmp_path, http)
+    assert agent.locate("9 Elm St, Albany, NY", online=False) is None
+    assert http.calls == 0
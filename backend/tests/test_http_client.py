@@ -0,0 +1,129 @@
+import time
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+
+from agents.http_client import HttpClient, TokenBucket
+
+class ScriptedServer:
+    """
+    Answers each request with the next (status, headers) from `script`
+    (200 once it runs out) after `delay` seconds, tracking peak concurrency.
+    """
+    def __init__(self, script=(), delay=0):
+        self.script = list(script)
+        self.delay = delay
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.active = 0
+        self.peak = 0
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                with server.lock:
+                    server.hits += 1
+                    server.active += 1
+                    server.peak = max(server.peak, server.active)
+                    status, headers = server.script.pop(0) if server.script else (200, {})
+                time.sleep(server.delay)
+                with server.lock:
+                    server.active -= 1
+                self.send_response(status)
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.send_header("Content-Length", "2")
+                self.end_headers()
+                self.wfile.write(b"ok")
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.httpd.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self.httpd.server_address[1]}/"
+        threading.Thread(target=self.httpd.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True).start()
+
+    def close(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+@pytest.fixture
+def serve():
+    servers = []
+    def start(script=(), delay=0):
+        servers.append(ScriptedServer(script, delay))
+        return servers[-1]
+    yield start
+    for server in servers:
+        server.close()
+
+def test_retries_5xx_then_succeeds(serve):
+    server = serve([(503, {}), (502, {})])
+    client = HttpClient(max_retries=3, backoff=0.01)
+    assert client.get(server.url).status_code == 200
+    assert server.hits == 3
+    stats = client.metrics()["hosts"]["127.0.0.1"]
+    assert (stats["requests"], stats["retries"], stats["errors"], stats["in_flight"]) == (3, 2, 2, 0)
+
+def test_gives_up_after_max_retries_and_returns_the_last_response(serve):
+    server = serve([(503, {})] * 5)
+    client = HttpClient(max_retries=2, backoff=0.01)
+    assert client.get(server.url).status_code == 503
+    assert server.hits == 3
+
+def test_client_errors_are_not_retried(serve):
+    server = serve([(404, {})])
+    client = HttpClient(max_retries=3, backoff=0.01)
+    assert client.get(server.url).status_code == 404
+    assert server.hits == 1
+
+def test_retry_after_is_honoured(serve):
+    server = serve([(429, {"Retry-After": "0.3"})])
+    client = HttpClient(max_retries=1, backoff=0.0)
+    started = time.monotonic()
+    assert client.get(server.url).status_code == 200
+    assert time.monotonic() - started >= 0.3
+
+def test_connection_errors_are_retried_then_raised():
+    client = HttpClient(max_retries=1, backoff=0.01, timeout=1)
+    # Nothing listens on port 9 locally
+    with pytest.raises(requests.ConnectionError):
+        client.get("http://127.0.0.1:9/")
+    stats = client.metrics()["hosts"]["127.0.0.1"]
+    assert (stats["requests"], stats["retries"], stats["errors"]) == (2, 1, 2)
+
+def test_backoff_grows_and_is_capped():
+    client = HttpClient(backoff=0.5, max_backoff=2)
+    assert all(0 <= client._retry_delay(0, None) <= 0.5 for _ in range(50))
+    assert all(0 <= client._retry_delay(6, None) <= 2 for _ in range(50))
+
+def test_per_host_concurrency_cap(serve):
+    server = serve(delay=0.1)
+    client = HttpClient(host_policies={"127.0.0.1": {"rate": None, "max_concurrency": 2}})
+    threads = [threading.Thread(target=client.get, args=(server.url,)) for _ in range(6)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert server.hits == 6
+    assert server.peak == 2
+    assert client.metrics()["hosts"]["127.0.0.1"]["concurrency_wait_seconds"] > 0
+
+def test_per_host_rate_limit(serve):
+    server = serve()
+    client = HttpClient(host_policies={"127.0.0.1": {"rate": 10.0, "burst": 1, "max_concurrency": 5}})
+    started = time.monotonic()
+    for _ in range(4):
+        client.get(server.url)
+    # One token up front, then one every 0.1s
+    assert time.monotonic() - started >= 0.28
+    assert client.metrics()["hosts"]["127.0.0.1"]["throttle_wait_seconds"] > 0
+
+def test_token_bucket_allows_a_burst_then_paces():
+    bucket = TokenBucket(rate=20.0, burst=3)
+    assert [bucket.acquire() for _ in range(3)] == [0.0, 0.0, 0.0]
+    assert bucket.acquire() > 0
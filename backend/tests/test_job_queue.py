@@ -0,0 +1,87 @@
+import io
+import os
+import asyncio
+import zipfile
+
+import pytest
+
+from job_queue import BatchProcessor, JobStore, UploadLimitExceeded, expand_uploads
+
+def make_zip(members):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as archive:
+        for name, data in members:
+            archive.writestr(name, data)
+    return buffer.getvalue()
+
+def test_zip_members_are_expanded():
+    archive = make_zip([("a.pdf", b"%PDF-a"), ("notes.txt", b"skip"), ("scans/b.png", b"png")])
+    assert expand_uploads([("batch.zip", archive)]) == [("a.pdf", b"%PDF-a"), ("b.png", b"png")]
+
+def test_member_over_file_budget_is_rejected():
+    archive = make_zip([("bomb.pdf", b"\0" * 10_000_000)])
+    assert len(archive) < 100_000
+    with pytest.raises(UploadLimitExceeded, match="bomb.pdf exceeds"):
+        expand_uploads([("batch.zip", archive)], max_file_bytes=1_000_000)
+
+def test_total_budget_is_enforced_across_members():
+    archive = make_zip([(f"{i}.pdf", b"\0" * 400) for i in range(5)])
+    with pytest.raises(UploadLimitExceeded, match="uncompressed"):
+        expand_uploads([("batch.zip", archive)], max_total_bytes=1000)
+
+def test_file_count_stops_expansion():
+    archive = make_zip([(f"{i}.pdf", b"x") for i in range(10)])
+    with pytest.raises(UploadLimitExceeded, match="3 documents"):
+        expand_uploads([("batch.zip", archive), ("extra.pdf", b"y")], max_files=3)
+
+class PacketManager:
+    """
+    Stands in for DirectoryManagementAgent: "packet.pdf" holds two providers,
+    "broken.pdf" none that can be read.
+    """
+    async def process_packet_async(self, path, limits=None):
+        if path.endswith("broken.pdf"):
+            return [{"error": "Extraction Failed"}]
+        return [{"provider": "Jane Doe", "segment": {"index": 0}}, {"provider": "John Roe", "segment": {"index": 1}}]
+
+def test_batch_item_keeps_every_provider_in_a_packet(tmp_path):
+    store = JobStore(str(tmp_path / "jobs.sqlite"))
+    job_id = store.create_job([("packet.pdf", b"%PDF"), ("broken.pdf", b"%PDF")])
+
+    async def run():
+        processor = BatchProcessor(PacketManager(), store, workers=2)
+        await processor.start()
+        processor.submit(job_id, 2)
+        await processor.queue.join()
+        await processor.stop()
+
+    asyncio.run(run())
+    assert store.get_job(job_id)["status"] == "completed"
+    packet, broken = store.get_results(job_id)
+    assert packet["status"] == "done"
+    assert [r["provider"] for r in packet["reports"]] == ["Jane Doe", "John Roe"]
+    assert broken["status"] == "failed" and broken["error"] == "Extraction Failed"
+
+def test_unfinished_items_resume_after_a_restart(tmp_path):
+    store = JobStore(str(tmp_path / "jobs.sqlite"), files_dir=str(tmp_path / "files"))
+    job_id = store.create_job([("a.pdf", b"%PDF"), ("b.pdf", b"%PDF"), ("c.pdf", b"%PDF")])
+    store.mark_running(job_id, 0)
+    store.finish_item(job_id, 0, result=[{"provider": "Jane Doe"}])
+    # The previous process died while item 1 was running
+    store.mark_running(job_id, 1)
+
+    restarted = JobStore(str(tmp_path / "jobs.sqlite"), files_dir=str(tmp_path / "files"))
+    assert restarted.unfinished_items() == [(job_id, 1), (job_id, 2)]
+
+    async def run():
+        processor = BatchProcessor(PacketManager(), restarted, workers=2)
+        await processor.start()
+        await processor.queue.join()
+        await processor.stop()
+
+    asyncio.run(run())
+    job = restarted.get_job(job_id)
+    assert job["status"] == "completed"
+    assert [item["status"] for item in restarted.get_results(job_id)] == ["done", "done", "done"]
+    assert restarted.get_results(job_id)[0]["reports"] == [{"provider": "Jane Doe"}]
+    assert not os.listdir(tmp_path / "files")
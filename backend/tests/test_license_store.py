@@ -0,0 +1,65 @@
+import os
+import json
+
+from agents.license_store import JsonLicenseStore, SqliteLicenseStore
+
+def write(path, text, mtime):
+    path.write_text(text)
+    os.utime(path, (mtime, mtime))
+
+def test_json_store_reloads_when_the_file_changes(tmp_path):
+    path = tmp_path / "licenses.json"
+    write(path, json.dumps({"1134527302": {"status": "Active"}}), 1000)
+    store = JsonLicenseStore(str(path), check_interval=0)
+    assert store.lookup(1134527302) == {"status": "Active"}
+
+    write(path, json.dumps({"1134527302": {"status": "Revoked"}}), 2000)
+    assert store.lookup("1134527302") == {"status": "Revoked"}
+    assert store.stats()["full_loads"] == 2
+
+def test_json_store_waits_for_the_check_interval(tmp_path):
+    path = tmp_path / "licenses.json"
+    write(path, json.dumps({"1": {"status": "Active"}}), 1000)
+    store = JsonLicenseStore(str(path), check_interval=3600)
+    store.lookup("1")
+    write(path, json.dumps({"1": {"status": "Revoked"}}), 2000)
+    assert store.lookup("1") == {"status": "Active"}
+
+def test_jsonl_store_reads_only_appended_complete_lines(tmp_path):
+    path = tmp_path / "licenses.jsonl"
+    write(path, '{"npi": "1", "status": "Active"}\n', 1000)
+    store = JsonLicenseStore(str(path), check_interval=0)
+    assert store.lookup("1") == {"status": "Active"}
+
+    with open(path, "a") as f:
+        f.write('{"npi": "2", "status": "Active"}\n{"npi": "3", "sta')
+    os.utime(path, (2000, 2000))
+    assert store.lookup_many(["1", "2", "3"]) == {"1": {"status": "Active"}, "2": {"status": "Active"}}
+
+    with open(path, "a") as f:
+        f.write('tus": "Expired"}\n')
+    os.utime(path, (3000, 3000))
+    assert store.lookup("3") == {"status": "Expired"}
+    assert store.stats()["full_loads"] == 1
+    assert store.stats()["incremental_loads"] == 2
+
+def test_sqlite_store_imports_csv_and_jsonl(tmp_path):
+    csv_path = tmp_path / "licenses.csv"
+    csv_path.write_text("npi,status\n1,Active\n2,Revoked\n")
+    jsonl_path = tmp_path / "licenses.jsonl"
+    jsonl_path.write_text('{"npi": 2, "status": "Active"}\n')
+
+    store = SqliteLicenseStore(str(tmp_path / "licenses.sqlite"))
+    assert store.import_file(str(csv_path), batch_size=1) == 2
+    assert store.import_file(str(jsonl_path)) == 1
+    assert store.lookup(2) == {"status": "Active"}
+    assert store.lookup("9") is None
+    assert store.stats()["records"] == 2
+
+def test_sqlite_lookup_many_spans_chunks_and_dedupes(tmp_path):
+    store = SqliteLicenseStore(str(tmp_path / "licenses.sqlite"))
+    path = tmp_path / "licenses.json"
+    path.write_text(json.dumps({str(n): {"n": n} for n in range(10)}))
+    store.import_file(str(path))
+    found = store.lookup_many(["1", 1, "4", "7", "42"], chunk_size=2)
+    assert found == {"1": {"n": 1}, "4": {"n": 4}, "7": {"n": 7}}
@@ -0,0 +1,86 @@
+from agents.document import Document
+from agents.document_splitter import DocumentSplitter
+from agents.local_extractor import LocalTextExtractor
+from benchmarks.sample_documents import build_pdf
+
+MULTI_LABEL_FORM = [
+    "Practice Name: Sunrise Family Clinic",
+    "Group Name: Sunrise Medical Group",
+    "Contact Name: Front Desk",
+    "Provider Name: Jane Doe, MD",
+    "NPI Number: 1134527302",
+    "Hotel: 5551234567",
+    "Office Phone: 212-674-9120",
+    "Practice Address: 123 Main St, New York, NY 10003",
+]
+
+def test_provider_name_ignores_practice_and_contact_labels():
+    fields, confidence = LocalTextExtractor().extract_fields("\n".join(MULTI_LABEL_FORM))
+    assert fields["provider_name"] == "Jane Doe, MD"
+    assert fields["phone_number"] == "212-674-9120"
+    assert confidence == 1.0
+
+def test_practice_name_alone_is_not_a_provider_name():
+    fields, confidence = LocalTextExtractor().extract_fields("Practice Name: Sunrise Family Clinic\nNPI: 1134527302")
+    assert fields["provider_name"] is None
+    assert confidence < 0.8
+
+def test_hotel_is_not_a_phone_label():
+    fields, _ = LocalTextExtractor().extract_fields("Hotel: 5551234567")
+    assert fields["phone_number"] is None
+
+def test_bare_name_label_still_matches():
+    fields, _ = LocalTextExtractor().extract_fields("Name: Jane Doe\nNPI: 1134527302")
+    assert fields["provider_name"] == "Jane Doe"
+
+def test_group_packet_splits_by_provider_name():
+    pages = [
+        ["Practice Name: Sunrise Family Clinic", f"Provider Name: {name}", "Office Phone: 212-674-9120"]
+        for name in ("Jane Doe", "John Roe", "Ann Poe")
+    ]
+    segments = DocumentSplitter(mode="auto").split(Document("packet.pdf", data=build_pdf(pages)))
+    assert [pages for _, pages in segments] == [(1, 1), (2, 2), (3, 3)]
+
+GROUP_FORM = [
+    "Group Name: Sunrise Medical Group",
+    "Group NPI: 1245319599",
+    "Contact Phone: 212-555-0100",
+    "Email Address: jane@clinic.com",
+    "Mailing Address: PO Box 12",
+    "Provider Name: Jane Doe, MD",
+    "Individual NPI Number: 1134527302",
+    "Office Phone: 212-674-9120",
+    "Practice Address: 123 Main St",
+    "New York, NY 10003",
+]
+
+def test_group_contact_email_and_mailing_labels_are_ignored():
+    fields, confidence = LocalTextExtractor().extract_fields("\n".join(GROUP_FORM))
+    assert fields == {
+        "provider_name": "Jane Doe, MD",
+        "npi_number": "1134527302",
+        "phone_number": "212-674-9120",
+        "address": "123 Main St, New York, NY 10003",
+    }
+    assert confidence == 1.0
+
+def test_practice_labels_win_over_unqualified_ones():
+    text = "Phone: 212-555-0199\nAddress: 9 Side St, Albany, NY 12207\nOffice Phone: 212-674-9120\nPractice Address: 123 Main St, New York, NY 10003"
+    fields, _ = LocalTextExtractor().extract_fields(text)
+    assert fields["phone_number"] == "212-674-9120"
+    assert fields["address"] == "123 Main St, New York, NY 10003"
+
+def test_only_rejected_labels_leave_fields_empty():
+    text = "Group NPI: 1245319599\nContact Phone: 212-555-0100\nEmail Address: jane@clinic.com"
+    fields, confidence = LocalTextExtractor().extract_fields(text)
+    assert fields["npi_number"] is None
+    assert fields["phone_number"] is None
+    assert fields["address"] is None
+    assert confidence < 0.8
+
+def test_address_does_not_continue_into_a_labelled_line():
+    text = "Mailing Address: PO Box 12\nPractice Address: 123 Main St, New York, NY 10003"
+    fields, _ = LocalTextExtractor().extract_fields(text)
+    assert fields["address"] == "123 Main St, New York, NY 10003"
+    fields, _ = LocalTextExtractor().extract_fields("Address: PO Box 12\nBilling: Acme, NY 10003")
+    assert fields["address"] == "PO Box 12"
@@ -0,0 +1,13 @@
+from agents.matching import ProviderMatcher
+
+def test_npi_less_entry_is_updated_not_duplicated(tmp_path):
+    matcher = ProviderMatcher(str(tmp_path / "matching.sqlite"))
+    first = matcher.add("Jane Doe", None, "212-555-1111", "1 Main St, New York, NY 10003")
+    again = matcher.add("Dr. Jane Doe", None, "2125551111", "1 Main Street, New York, NY 10003")
+    assert first == again
+    assert matcher.stats()["providers"] == 1
+
+def test_entry_without_any_key_is_skipped(tmp_path):
+    matcher = ProviderMatcher(str(tmp_path / "matching.sqlite"))
+    assert matcher.add(None, None, None, None) is None
+    assert matcher.stats()["providers"] == 0
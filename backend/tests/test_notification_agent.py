@@ -0,0 +1,117 @@
+import time
+import threading
+
+import pytest
+
+from agents.notification_agent import NotificationAgent, notice_key
+from benchmarks.fake_smtp import FakeSmtp
+
+@pytest.fixture
+def smtp(monkeypatch):
+    with FakeSmtp() as server:
+        for name, value in server.env().items():
+            monkeypatch.setenv(name, value)
+        yield server
+
+@pytest.fixture
+def make_outbox(tmp_path, smtp):
+    outboxes = []
+    def make(**settings):
+        outbox = NotificationAgent(db_path=str(tmp_path / "outbox.sqlite"))
+        for name, value in settings.items():
+            setattr(outbox, name, value)
+        outboxes.append(outbox)
+        return outbox
+    yield make
+    for outbox in outboxes:
+        outbox.close()
+
+def queue(outbox, count, domain="example.com"):
+    return [outbox.send_email(f"dr{i}@{domain}", f"Notice {i}", "<p>hi</p>")["id"] for i in range(count)]
+
+def row(outbox, message_id):
+    return outbox.conn.execute("SELECT * FROM outbox WHERE id = ?", (message_id,)).fetchone()
+
+def test_queued_mail_goes_out_over_one_session(make_outbox, smtp):
+    outbox = make_outbox(batch_size=3)
+    queue(outbox, 7)
+    assert outbox.deliver_pending() == 7
+    assert len(smtp.messages) == 7
+    assert smtp.stats()["logins"] == 1
+    stats = outbox.stats()
+    assert (stats["sent_total"], stats["queued"], stats["batches"]) == (7, 0, 3)
+
+def test_undelivered_mail_survives_a_restart(make_outbox, smtp):
+    queue(make_outbox(), 2)
+    assert make_outbox().deliver_pending() == 2
+    assert len(smtp.messages) == 2
+
+def test_duplicate_notices_are_queued_once(make_outbox):
+    outbox = make_outbox()
+    key = notice_key("1134527302", ["phone_mismatch", "name_mismatch"], "dr@example.com")
+    first = outbox.send_email("dr@example.com", "Notice", "<p>hi</p>", dedupe_key=key)
+    again = outbox.send_email("dr@example.com", "Notice", "<p>hi</p>", dedupe_key=key)
+    assert first["status"] == "queued"
+    assert again == {"status": "duplicate", "message": "Same notice already sent to this provider", "id": first["id"]}
+    assert key == notice_key("1134527302", ["name_mismatch", "phone_mismatch"], " DR@example.com ")
+    assert key != notice_key("1134527302", ["phone_mismatch", "name_mismatch"], "office@example.com")
+    assert notice_key(None, [], "dr@example.com", report_id=1) != notice_key(None, [], "dr@example.com", report_id=2)
+
+    # A notice that finally failed does not block a new attempt
+    outbox.conn.execute("UPDATE outbox SET status = 'failed' WHERE id = ?", (first["id"],))
+    assert outbox.send_email("dr@example.com", "Notice", "<p>hi</p>", dedupe_key=key)["status"] == "queued"
+
+def test_concurrent_senders_never_claim_the_same_message(make_outbox, smtp):
+    queue(make_outbox(), 40)
+    senders = [make_outbox(batch_size=5) for _ in range(4)]
+    threads = [threading.Thread(target=sender.deliver_pending) for sender in senders]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    subjects = [message["subject"] for message in smtp.messages]
+    assert sorted(subjects) == sorted(f"Notice {i}" for i in range(40))
+    assert sum(sender.counters["sent"] for sender in senders) == 40
+
+def test_claims_are_exclusive_until_they_go_stale(make_outbox, smtp):
+    crashed, survivor = make_outbox(), make_outbox()
+    (message_id,) = queue(crashed, 1)
+    assert len(crashed._claim()) == 1
+    assert row(crashed, message_id)["status"] == "sending"
+    # The claiming sender died before delivering
+    assert survivor.deliver_pending() == 0
+
+    survivor.conn.execute("UPDATE outbox SET claimed_at = ? WHERE id = ?", (time.time() - 601, message_id))
+    assert survivor.deliver_pending() == 1
+    assert row(survivor, message_id)["status"] == "sent"
+    assert len(smtp.messages) == 1
+
+def test_temporary_failures_back_off_then_give_up(make_outbox, smtp):
+    smtp.error_rate = 1.0
+    outbox = make_outbox(backoff=30, max_backoff=3600, max_attempts=3)
+    (message_id,) = queue(outbox, 1)
+
+    before = time.time()
+    assert outbox.deliver_pending() == 1
+    queued = row(outbox, message_id)
+    assert (queued["status"], queued["attempts"], queued["claimed_at"]) == ("queued", 1, None)
+    assert before + 15 <= queued["next_attempt_at"] <= time.time() + 30
+    assert "451" in queued["last_error"]
+    # Not due yet
+    assert outbox.deliver_pending() == 0
+
+    for _ in range(2):
+        outbox.conn.execute("UPDATE outbox SET next_attempt_at = 0 WHERE id = ?", (message_id,))
+        outbox.deliver_pending()
+    failed = row(outbox, message_id)
+    assert (failed["status"], failed["attempts"]) == ("failed", 3)
+    assert (outbox.counters["retried"], outbox.counters["failed"]) == (2, 1)
+
+def test_permanent_rejection_fails_one_message_not_the_batch(make_outbox, smtp):
+    outbox = make_outbox()
+    (rejected,) = queue(outbox, 1, domain="invalid.example")
+    queue(outbox, 3)
+    assert outbox.deliver_pending() == 4
+    assert (row(outbox, rejected)["status"], row(outbox, rejected)["attempts"]) == ("failed", 1)
+    assert len(smtp.messages) == 3
+    assert smtp.stats()["logins"] == 1
@@ -0,0 +1,22 @@
+import random
+
+from agents.data_validation_agent import npi_checksum_ok
+from agents.npi_prescreen import VALID, INVALID_FORMAT, CHECKSUM_FAIL, prescreen_npis, summarize
+
+def test_verdicts_match_the_scalar_checksum():
+    rng = random.Random(7)
+    npis = [str(rng.randrange(10**9, 10**10)) for _ in range(2000)]
+    verdicts = prescreen_npis(npis)["verdicts"]
+    expected = [VALID if npi_checksum_ok(n) else CHECKSUM_FAIL for n in npis]
+    assert verdicts.tolist() == expected
+
+def test_malformed_values_are_rejected_before_the_checksum():
+    npis = ["", "12345", "ABC1234567", "11345273020", "113452730 ", " 1134527302", "1134527302", "1134527303"]
+    verdicts = prescreen_npis(npis)["verdicts"].tolist()
+    assert verdicts == [INVALID_FORMAT] * 4 + [INVALID_FORMAT, VALID, VALID, CHECKSUM_FAIL]
+
+def test_duplicates_map_to_one_unique_npi():
+    result = prescreen_npis(["1134527302", "bad", "1134527302", "1245319599"])
+    assert result["unique_npis"].tolist() == ["1134527302", "1245319599"]
+    assert result["unique_index"].tolist() == [0, -1, 0, 1]
+    assert summarize(result) == {"Valid": 3, "Invalid Format": 1, "Checksum Fail": 0, "Unique Valid": 2}
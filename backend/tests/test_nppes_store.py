@@ -0,0 +1,50 @@
+import csv
+import sqlite3
+
+from agents import nppes_store
+from agents.directory_management_agent import _registry_address
+from agents.nppes_store import NPPESStore
+
+COLUMNS = [
+    nppes_store.COL_NPI, nppes_store.COL_ENTITY_TYPE, nppes_store.COL_ORG_NAME, nppes_store.COL_LAST_NAME,
+    nppes_store.COL_FIRST_NAME, nppes_store.COL_ADDRESS, nppes_store.COL_CITY, nppes_store.COL_STATE,
+    nppes_store.COL_POSTAL_CODE, nppes_store.COL_PHONE, nppes_store.COL_DEACTIVATED, nppes_store.COL_REACTIVATED,
+]
+
+def write_file(path, rows):
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(COLUMNS + ["Other Column"])
+        for row in rows:
+            writer.writerow(row + ["x"])
+
+def test_lookup_returns_the_practice_city_state_and_zip(tmp_path):
+    write_file(tmp_path / "npidata.csv", [
+        ["1134527302", "1", "", "DOE", "JANE", "123 MAIN ST", "NEW YORK", "NY", "100031234", "2126749120", "", ""],
+        ["1245319599", "1", "", "ROE", "JOHN", "9 ELM ST", "CHICAGO", "IL", "60601", "3125550100", "01/02/2020", ""],
+    ])
+    store = NPPESStore(str(tmp_path / "nppes.sqlite"))
+    assert store.ingest(str(tmp_path / "npidata.csv")) == 2
+
+    record = store.lookup("1134527302")
+    assert record == {
+        "official_name": "JANE DOE", "official_phone": "212-674-9120", "official_address": "123 MAIN ST",
+        "official_city": "NEW YORK", "official_state": "NY", "official_postal_code": "10003", "status": "Active",
+    }
+    assert _registry_address(record) == "123 MAIN ST, NEW YORK, NY 10003"
+    assert store.lookup("1245319599")["status"] == "Deactivated"
+
+def test_store_from_an_older_release_is_migrated(tmp_path):
+    path = str(tmp_path / "nppes.sqlite")
+    conn = sqlite3.connect(path)
+    conn.execute(
+        "CREATE TABLE npi_records (npi TEXT PRIMARY KEY, official_name TEXT, official_phone TEXT, "
+        "official_address TEXT, status TEXT NOT NULL) WITHOUT ROWID"
+    )
+    conn.execute("INSERT INTO npi_records VALUES ('1134527302', 'JANE DOE', '212-674-9120', '123 MAIN ST', 'Active')")
+    conn.commit()
+    conn.close()
+
+    store = NPPESStore(path)
+    assert store.conn.execute("PRAGMA user_version").fetchone()[0] == nppes_store.SCHEMA_VERSION
+    assert store.lookup("1134527302")["official_city"] is None
@@ -0,0 +1,50 @@
+import asyncio
+
+from agents.document import Document
+
+def spans(manager, name):
+    return [(start, end) for call, start, end in manager.upstreams.calls if call == name]
+
+def test_lookups_after_extraction_run_concurrently(make_manager):
+    manager = make_manager(delay=0.1)
+    report = asyncio.run(manager.process_application_async(Document("a.png", data=b"png")))
+
+    (extraction,) = spans(manager, "extraction")
+    lookups = [span for name in ("npi_registry", "state_license", "enrichment") for span in spans(manager, name)]
+    assert len(lookups) == 3
+    assert all(start >= extraction[1] for start, _ in lookups)
+    # All three were in flight at the same time
+    assert max(start for start, _ in lookups) < min(end for _, end in lookups)
+    assert report["validation_result"]["score"] == 100
+    assert manager.reports.get(report["report_id"]) is not None
+
+def test_async_and_sync_workflows_agree(make_manager):
+    manager = make_manager()
+    sync = manager.process_application(Document("a.png", data=b"png"))
+    concurrent = asyncio.run(manager.process_application_async(Document("b.png", data=b"png")))
+    assert sync["validation_result"] == concurrent["validation_result"]
+    assert sync["extracted"] == concurrent["extracted"]
+
+def test_stage_limits_cap_concurrent_calls(make_manager):
+    manager = make_manager(delay=0.05)
+
+    async def run():
+        limits = {"npi_registry": asyncio.Semaphore(1)}
+        documents = [Document(f"{i}.png", data=b"png") for i in range(4)]
+        return await asyncio.gather(*(manager.process_application_async(d, limits=limits) for d in documents))
+
+    assert len(asyncio.run(run())) == 4
+    registry = sorted(spans(manager, "npi_registry"))
+    assert len(registry) == 4
+    assert all(later[0] >= earlier[1] for earlier, later in zip(registry, registry[1:]))
+    # Unlimited stages still overlapped across applications
+    license_spans = sorted(spans(manager, "state_license"))
+    assert any(later[0] < earlier[1] for earlier, later in zip(license_spans, license_spans[1:]))
+
+def test_failed_extraction_stops_the_workflow(make_manager):
+    manager = make_manager()
+    manager.upstreams.process_document = lambda document: {"error": "unreadable"}
+    result = asyncio.run(manager.process_application_async(Document("a.png", data=b"png")))
+    assert result == {"error": "Extraction Failed", "details": {"error": "unreadable"}}
+    assert manager.upstreams.calls == []
+    assert manager.reports.summary()["reports"] == 0
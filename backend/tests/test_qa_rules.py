@@ -0,0 +1,36 @@
+from agents.qa_rules import _get_path, load_rules
+
+REPORT = {
+    "extracted": {"provider_name": "Jane Doe", "phone_number": "212-674-9120"},
+    "official": {"official_name": "JANE DOE", "official_phone": "212-674-9120", "status": "Active"},
+    "state_board": {"state_license_status": "Active"},
+    "matching": {"name_similarity": 1.0, "duplicate_count": 0},
+}
+
+def test_deactivated_npi_is_critical():
+    report = dict(REPORT, official=dict(REPORT["official"], status="Deactivated"))
+    result = load_rules().evaluate(report)
+    assert result["score"] == 0
+    assert result["priority"] == "Critical"
+    assert result["mismatches"] == ["CRITICAL: NPI deactivated in NPPES"]
+
+def test_rescoring_matches_pipeline_for_deactivated_npi():
+    rules = load_rules()
+    reports = [REPORT, dict(REPORT, official=dict(REPORT["official"], status="Deactivated"))]
+    frame = rules.evaluate_frame({source: [_get_path(r, source) for r in reports] for source in rules.sources})
+    assert frame["score"].tolist() == [rules.evaluate(r)["score"] for r in reports] == [100, 0]
+
+def test_registry_comparisons_do_not_stack_on_a_deactivated_npi():
+    # NPPES keeps no usable name for a deactivated NPI; its other fields differ too
+    report = dict(
+        REPORT,
+        official={"official_name": "N/A", "official_phone": "212-555-0000", "status": "Deactivated"},
+        matching={"name_similarity": 0.0, "duplicate_count": 0, "registry_distance_km": 900.0},
+    )
+    rules = load_rules()
+    result = rules.evaluate(report)
+    assert result["score"] == 0
+    assert result["mismatches"] == ["CRITICAL: NPI deactivated in NPPES"]
+    frame = rules.evaluate_frame({source: [_get_path(report, source)] for source in rules.sources})
+    assert frame["score"].tolist() == [0]
+    assert frame["mismatches"].tolist() == [result["mismatches"]]
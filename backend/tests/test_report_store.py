@@ -0,0 +1,52 @@
+import pytest
+
+from agents.report_store import ReportStore
+
+def make_report(name, npi, score, priority):
+    return {
+        "extracted": {"provider_name": name, "npi_number": npi, "phone_number": "212-674-9120"},
+        "official": {"official_name": name.upper(), "official_phone": "212-674-9120"},
+        "state_board": {"state_license_status": "Active"},
+        "matching": {},
+        "validation_result": {"score": score, "priority": priority, "mismatches": []},
+    }
+
+@pytest.fixture
+def store(tmp_path):
+    store = ReportStore(str(tmp_path / "reports.sqlite"))
+    for i, (score, priority) in enumerate([(100, "Low"), (0, "Critical"), (60, "High"), (10, "Critical"), (85, "Medium")]):
+        store.add(make_report(f"Provider {chr(ord('E') - i)}", f"11345273{i:02d}", score, priority), source="test")
+    return store
+
+def test_pages_are_sorted_and_counted(store):
+    first = store.query(limit=2, sort="score")
+    second = store.query(offset=2, limit=2, sort="score")
+    assert first["total"] == second["total"] == 5
+    assert [item["score"] for item in first["items"] + second["items"]] == [0, 10, 60, 85]
+    by_name = store.query(sort="provider_name", order="desc")
+    assert [item["provider_name"] for item in by_name["items"]] == [f"Provider {c}" for c in "EDCBA"]
+
+def test_filters_combine(store):
+    critical = store.query(priority="Critical")
+    assert critical["total"] == 2
+    assert {item["priority"] for item in critical["items"]} == {"Critical"}
+    assert store.query(min_score=50, max_score=90)["total"] == 2
+    assert store.query(npi="1134527302")["items"][0]["score"] == 60
+
+def test_unknown_sort_or_priority_is_rejected(store):
+    with pytest.raises(ValueError):
+        store.query(sort="mismatches")
+    with pytest.raises(ValueError):
+        store.query(priority="Urgent")
+
+def test_review_queue_queries_use_indexes(store):
+    def plan(sql, params=()):
+        return " ".join(row[-1] for row in store.conn.execute("EXPLAIN QUERY PLAN " + sql, params))
+    assert "idx_reports_priority" in plan("SELECT COUNT(*) FROM reports WHERE priority_rank = ?", (0,))
+    assert "TEMP B-TREE" not in plan("SELECT id FROM reports ORDER BY provider_name ASC, id ASC LIMIT 50")
+
+def test_summary_counts_critical_reports(store):
+    summary = store.summary()
+    assert summary["reports"] == 5
+    assert summary["critical"] == 2
+    assert summary["avg_score"] == 51.0
@@ -0,0 +1,67 @@
+import time
+from types import SimpleNamespace
+
+from agents.revalidation import RevalidationScheduler
+
+def make_manager():
+    # One freshly verified entry, so a batch only moves the cursor
+    entries = [{"id": 1, "npi": "1134527302", "created_at": time.time()}]
+    latest = lambda after, limit: [e for e in entries if e["npi"] > after][:limit]
+    return SimpleNamespace(reports=SimpleNamespace(latest_per_npi=latest))
+
+def test_only_the_lease_holder_walks_the_directory(tmp_path):
+    db_path = str(tmp_path / "revalidation.sqlite")
+    first = RevalidationScheduler(make_manager(), db_path=db_path, interval=0)
+    second = RevalidationScheduler(make_manager(), db_path=db_path, interval=0)
+
+    assert first.run_batch() is True
+    assert second.run_batch() is False
+    assert second.run_pass() is None
+    assert second.stats()["cursor"] == "1134527302"
+
+    first.release()
+    summary = second.run_pass()
+    assert summary["skipped"] == 1
+    assert second.stats()["lease"] is None
+
+def test_expired_lease_is_taken_over(tmp_path):
+    db_path = str(tmp_path / "revalidation.sqlite")
+    first = RevalidationScheduler(make_manager(), db_path=db_path, interval=0)
+    first.lease_ttl = 0
+    assert first.run_batch() is True
+    second = RevalidationScheduler(make_manager(), db_path=db_path, interval=0)
+    assert second.run_pass()["skipped"] == 1
+
+def test_newly_verified_provider_reaches_the_indexes(tmp_path):
+    from agents.directory_management_agent import DirectoryManagementAgent
+    from agents.matching import ProviderMatcher
+    from agents.qa_rules import load_rules
+    from agents.report_store import ReportStore
+    from agents.spatial_index import SpatialIndex
+
+    # The stores and rules of a real manager, without the upstream agents
+    manager = DirectoryManagementAgent.__new__(DirectoryManagementAgent)
+    manager.rules = load_rules()
+    manager.reports = ReportStore(str(tmp_path / "reports.sqlite"))
+    manager.matcher = ProviderMatcher(str(tmp_path / "matching.sqlite"))
+    manager.locations = SpatialIndex(str(tmp_path / "locations.sqlite"))
+
+    npi = "1134527302"
+    extracted = {"provider_name": "Jane Doe", "npi_number": npi, "phone_number": "212-674-9120", "address": "123 Main St"}
+    web = {"latitude": 40.73, "longitude": -73.99, "verified_location": True}
+    license_data = {"state_license_status": "Active"}
+    not_found = {"official_name": "Not Found", "status": "Not Found"}
+    manager.record(manager.perform_quality_assurance(extracted, not_found, license_data, web, {}), "a.pdf")
+    assert manager.matcher.stats()["providers"] == 0
+
+    active = {"official_name": "JANE DOE", "official_phone": "212-674-9120", "official_address": "123 Main St", "status": "Active"}
+    manager.validator = SimpleNamespace(
+        nppes_store=SimpleNamespace(lookup=lambda n: dict(active)),
+        check_state_licenses=lambda npis: {n: dict(license_data) for n in npis},
+    )
+    scheduler = RevalidationScheduler(manager, db_path=str(tmp_path / "revalidation.sqlite"), max_age=0, interval=0)
+    summary = scheduler.run_pass()
+
+    assert summary["changed"] == 1
+    assert manager.matcher.stats()["providers"] == 1
+    assert manager.locations.nearest(40.73, -73.99, k=1)[0]["npi"] == npi
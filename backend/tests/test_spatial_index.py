@@ -0,0 +1,18 @@
+from agents.spatial_index import indexed_location
+
+def make_report(status="Active", verified_location=True):
+    return {
+        "official": {"official_name": "JANE DOE", "status": status},
+        "web_enrichment": {"latitude": 40.73, "longitude": -73.99, "verified_location": verified_location},
+    }
+
+def test_verified_provider_at_verified_location_is_indexed():
+    assert indexed_location(make_report()) == (40.73, -73.99)
+
+def test_unverified_npis_are_not_indexed():
+    for status in ("Not Found", "Checksum Fail", "Invalid Input", "Deactivated"):
+        assert indexed_location(make_report(status=status)) is None
+
+def test_unverified_location_is_not_indexed():
+    assert indexed_location(make_report(verified_location=False)) is None
+    assert indexed_location(make_report(verified_location=None)) is None
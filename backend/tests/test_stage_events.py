@@ -0,0 +1,48 @@
+import json
+import asyncio
+
+from fastapi.testclient import TestClient
+
+import main
+from agents.document import Document
+
+LOOKUPS = {"npi_registry", "state_license", "enrichment"}
+
+def collect(manager, document):
+    events = []
+    async def emit(event):
+        events.append(event)
+    result = asyncio.run(manager.process_application_async(document, emit=emit))
+    return result, events
+
+def test_one_event_per_stage_in_workflow_order(make_manager):
+    manager = make_manager()
+    report, events = collect(manager, Document("a.png", data=b"png"))
+    stages = [event["stage"] for event in events]
+    assert stages[0] == "extraction"
+    assert set(stages[1:4]) == LOOKUPS
+    assert stages[4:] == ["matching", "qa"]
+    assert all(event["status"] == "completed" for event in events)
+    assert events[0]["data"]["npi_number"] == "1134527302"
+    assert events[-1]["data"]["validation_result"] == report["validation_result"]
+    assert all(0 <= event["duration_ms"] <= event["elapsed_ms"] for event in events)
+
+def test_failed_stage_is_reported_as_error(make_manager):
+    manager = make_manager()
+    manager.upstreams.process_document = lambda document: {"error": "unreadable"}
+    _, events = collect(manager, Document("a.png", data=b"png"))
+    assert [(event["stage"], event["status"]) for event in events] == [("extraction", "error")]
+
+def parse_sse(body):
+    for block in body.strip().split("\n\n"):
+        event, data = block.split("\n")
+        yield event.removeprefix("event: "), json.loads(data.removeprefix("data: "))
+
+def test_stream_endpoint_sends_stage_events_then_the_report(make_manager, monkeypatch):
+    monkeypatch.setattr(main, "manager", make_manager())
+    response = TestClient(main.app).post("/validate_document/stream", files={"file": ("a.png", b"png", "image/png")})
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+    events = list(parse_sse(response.text))
+    assert [name for name, _ in events] == ["stage"] * 6 + ["report"]
+    assert events[-1][1]["validation_result"]["score"] == 100
@@ -0,0 +1,25 @@
+import asyncio
+from types import SimpleNamespace
+
+from startup import AgentSystem
+
+def test_failed_on_ready_is_recorded_and_retried():
+    system = AgentSystem(SimpleNamespace, retry_interval=0.01, warm_upstreams=False)
+    system._warm_steps = lambda manager: []
+    seen = []
+
+    async def on_ready(manager):
+        seen.append(dict(system.dependencies.get("agents_ready", {})))
+        if len(seen) == 1:
+            raise OSError("outbox unavailable")
+
+    async def run():
+        await system.start(on_ready)
+        await asyncio.wait_for(asyncio.shield(system.task), timeout=5)
+
+    asyncio.run(run())
+    assert len(seen) == 2
+    assert seen[1]["ready"] is False and seen[1]["error"] == "outbox unavailable"
+    readiness = system.readiness()
+    assert readiness["ready"] is True
+    assert readiness["dependencies"]["agents_ready"]["ready"] is True
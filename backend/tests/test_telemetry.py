@@ -0,0 +1,61 @@
+import json
+import asyncio
+import logging
+
+import pytest
+from fastapi.testclient import TestClient
+from prometheus_client import REGISTRY
+
+import main
+from agents.telemetry import JsonFormatter, new_trace, span, span_var, stage_span, trace_id_var
+
+def sample(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0.0
+
+def test_json_logs_carry_trace_span_and_extras():
+    async def run():
+        new_trace("abc123")
+        with span("outer"), span("inner"):
+            record = logging.LogRecord("provider_validator.test", logging.INFO, __file__, 1, "hello %s", ("there",), None)
+            record.npi = "1134527302"
+            return json.loads(JsonFormatter().format(record))
+
+    payload = asyncio.run(run())
+    assert payload["msg"] == "hello there"
+    assert (payload["trace_id"], payload["span"], payload["npi"]) == ("abc123", "outer/inner", "1134527302")
+
+def test_trace_id_reaches_worker_threads():
+    async def run():
+        trace_id = new_trace()
+        seen = await asyncio.to_thread(trace_id_var.get)
+        return trace_id, seen
+
+    trace_id, seen = asyncio.run(run())
+    assert len(trace_id) == 16 and seen == trace_id
+
+def test_stage_span_counts_soft_and_raised_failures():
+    before = sample("pv_stage_errors_total", stage="test_stage")
+    count = sample("pv_stage_duration_seconds_count", stage="test_stage")
+    with stage_span("test_stage") as outcome:
+        outcome["error"] = True
+    with pytest.raises(ValueError):
+        with stage_span("test_stage"):
+            raise ValueError("boom")
+    with stage_span("test_stage"):
+        pass
+    assert sample("pv_stage_errors_total", stage="test_stage") == before + 2
+    assert sample("pv_stage_duration_seconds_count", stage="test_stage") == count + 3
+    assert sample("pv_stages_in_flight", stage="test_stage") == 0
+    assert span_var.get() is None
+
+def test_requests_get_a_trace_id_and_show_up_in_metrics():
+    client = TestClient(main.app)
+    assert client.get("/healthz", headers={"X-Request-ID": "req-42"}).headers["X-Trace-Id"] == "req-42"
+    assert len(client.get("/healthz").headers["X-Trace-Id"]) == 16
+    client.get("/jobs/some-job-id")
+
+    body = client.get("/metrics").text
+    assert 'pv_http_request_duration_seconds_count{endpoint="/healthz",status="200"}' in body
+    # Path parameters are labelled by route template, not by value
+    assert 'endpoint="/jobs/{job_id}"' in body
+    assert "some-job-id" not in body
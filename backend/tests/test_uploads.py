@@ -0,0 +1,43 @@
+import io
+import os
+import asyncio
+import hashlib
+
+import pytest
+from fastapi import HTTPException, UploadFile
+
+import uploads
+
+def receive(data, filename="form.pdf", **limits):
+    return asyncio.run(uploads.receive_upload(UploadFile(file=io.BytesIO(data), filename=filename), **limits))
+
+@pytest.fixture(autouse=True)
+def spill_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(uploads, "UPLOAD_TMP_DIR", str(tmp_path))
+    monkeypatch.setattr(uploads, "UPLOAD_CHUNK_BYTES", 1024)
+    return tmp_path
+
+def test_small_upload_stays_in_memory_and_is_hashed(spill_dir):
+    data = b"%PDF" + b"x" * 3000
+    document = receive(data, filename="../../etc/form.pdf", spill_bytes=4096)
+    assert (document.filename, document.data, document.path, document.size) == ("form.pdf", data, None, len(data))
+    assert document.content_hash() == hashlib.sha256(data).hexdigest()
+    assert os.listdir(spill_dir) == []
+
+def test_large_upload_spills_to_a_temp_file(spill_dir):
+    data = os.urandom(10 * 1024 + 17)
+    first = receive(data, spill_bytes=4096)
+    second = receive(data, spill_bytes=4096)
+    assert first.data is None and first.path != second.path
+    assert os.path.dirname(first.path) == str(spill_dir) and first.path.endswith(".pdf")
+    assert first.read_bytes() == data
+    assert first.sha256 == hashlib.sha256(data).hexdigest()
+    first.close()
+    assert not os.path.exists(first.path)
+    assert os.path.exists(second.path)
+
+def test_oversized_upload_is_rejected_and_leaves_nothing_behind(spill_dir):
+    with pytest.raises(HTTPException) as excinfo:
+        receive(b"x" * 9000, max_bytes=8192, spill_bytes=2048)
+    assert excinfo.value.status_code == 413
+    assert os.listdir(spill_dir) == []
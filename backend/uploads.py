@@ -0,0 +1,56 @@
+import os
+import hashlib
+import tempfile
+from fastapi import HTTPException
+from fastapi.concurrency import run_in_threadpool
+
+from agents.document import Document
+
+UPLOAD_MAX_BYTES = int(os.getenv("UPLOAD_MAX_BYTES", str(25 * 1024 * 1024)))
+UPLOAD_SPILL_BYTES = int(os.getenv("UPLOAD_SPILL_BYTES", str(2 * 1024 * 1024)))
+UPLOAD_CHUNK_BYTES = 256 * 1024
+UPLOAD_TMP_DIR = os.getenv("UPLOAD_TMP_DIR") or None
+
+async def receive_upload(upload, max_bytes=UPLOAD_MAX_BYTES, spill_bytes=UPLOAD_SPILL_BYTES):
+    """
+    Streams an UploadFile into a Document in one pass:
+    - enforces the size cap (413) without buffering past it
+    - hashes the bytes as they arrive (used for extraction dedup)
+    - keeps small documents in memory, spills large ones to a uniquely named temp file
+    """
+    digest = hashlib.sha256()
+    chunks = []
+    size = 0
+    spill = None
+    filename = os.path.basename(upload.filename or "document.pdf")
+
+    try:
+        while True:
+            chunk = await upload.read(UPLOAD_CHUNK_BYTES)
+            if not chunk:
+                break
+            size += len(chunk)
+            if size > max_bytes:
+                raise HTTPException(status_code=413, detail=f"Upload exceeds {max_bytes} bytes")
+            digest.update(chunk)
+
+            if spill is None and size > spill_bytes:
+                spill = tempfile.NamedTemporaryFile(
+                    prefix="upload_", suffix=os.path.splitext(filename)[1], dir=UPLOAD_TMP_DIR, delete=False
+                )
+                await run_in_threadpool(spill.writelines, chunks)
+                chunks = None
+            if spill is None:
+                chunks.append(chunk)
+            else:
+                await run_in_threadpool(spill.write, chunk)
+    except BaseException:
+        if spill is not None:
+            spill.close()
+            os.remove(spill.name)
+        raise
+
+    if spill is None:
+        return Document(filename, data=b"".join(chunks), sha256=digest.hexdigest(), size=size)
+    spill.close()
+    return Document(filename, path=spill.name, sha256=digest.hexdigest(), size=size, owns_path=True)
@@ -2,6 +2,8 @@ import streamlit as st
 import pandas as pd
 import time
 import requests
+import json
+import os
 # --- 1. Page Configuration (Must be first) ---
 st.set_page_config(
     page_title="ProviderValidator AI",
@@ -9,16 +11,69 @@ st.set_page_config(
     layout="wide"
 )
 
+BACKEND_URL = os.getenv("BACKEND_URL", "http://localhost:8000")
+
+STAGE_LABELS = {
+    "extraction": "📄 Extraction",
+    "npi_registry": "🔍 NPI Registry",
+    "state_license": "📜 State License",
+    "enrichment": "🌍 Enrichment",
+    "matching": "🔗 Duplicate Check",
+    "qa": "⚖️ Quality Assurance",
+}
+
+def read_sse(response):
+    """
+    Yields (event, payload) pairs from a text/event-stream response as they arrive.
+    """
+    event, data = None, []
+    for line in response.iter_lines(decode_unicode=True):
+        if line.startswith("event:"):
+            event = line[len("event:"):].strip()
+        elif line.startswith("data:"):
+            data.append(line[len("data:"):].strip())
+        elif not line and event:
+            yield event, json.loads("\n".join(data))
+            event, data = None, []
+
+def fetch_json(path, **params):
+    response = requests.get(f"{BACKEND_URL}{path}", params=params, timeout=10)
+    response.raise_for_status()
+    return response.json()
+
+def render_stage_event(payload):
+    """
+    Shows one finished stage with its timing, so reviewers can act early
+    (e.g. on a registry mismatch) and see which stage is the bottleneck.
+    """
+    label = STAGE_LABELS.get(payload["stage"], payload["stage"])
+    if "segment" in payload:
+        label = f"Provider {payload['segment'] + 1} · {label}"
+    icon = "⚠️" if payload["status"] == "error" else "✅"
+    st.write(f"{icon} **{label}** — {payload['duration_ms']:.0f} ms (t+{payload['elapsed_ms']:.0f} ms)")
+    data = payload.get("data") or {}
+    if payload["stage"] == "npi_registry":
+        st.caption(f"Registry: {data.get('official_name', data.get('error', 'N/A'))} · {data.get('official_phone', 'N/A')}")
+    elif payload["stage"] == "state_license":
+        st.caption(f"State license: {data.get('state_license_status', 'N/A')}")
+    elif payload["stage"] == "enrichment":
+        st.caption(f"Location: {data.get('full_address_match', 'N/A')}")
+    elif payload["stage"] == "matching":
+        similarity = data.get("name_similarity")
+        st.caption(f"Name match: {'N/A' if similarity is None else f'{similarity:.0%}'} · Possible duplicates: {data.get('duplicate_count', 0)}")
+        distance = data.get("registry_distance_km")
+        if data.get("colocated_count") is not None:
+            st.caption(f"Unrelated NPIs at this address: {data['colocated_count']} · Distance to registry address: {'N/A' if distance is None else f'{distance} km'}")
+    elif payload["stage"] == "qa":
+        result = data.get("validation_result", {})
+        st.caption(f"Score: {result.get('score', 'N/A')}% · Priority: {result.get('priority', 'N/A')}")
+    elif payload["stage"] == "extraction":
+        st.caption(f"Extracted: {data.get('provider_name', 'N/A')} · NPI {data.get('npi_number', 'N/A')}")
+
 # --- 2. Session State Management ---
 # This keeps data alive when buttons are clicked
 if 'processed' not in st.session_state:
     st.session_state.processed = False
-if 'data_log' not in st.session_state:
-    # Dummy data for the "Prioritized Queue" to show the UI working immediately
-    st.session_state.data_log = pd.DataFrame([
-        {"ID": "P-002", "Name": "Dr. Sarah Lee", "NPI": "9876543210", "Score": 95, "Status": "Verified"},
-        {"ID": "P-003", "Name": "Dr. Mike Ross", "NPI": "1122334455", "Score": 40, "Status": "Critical Mismatch"},
-    ])
 
 # --- 3. Sidebar: Input & Controls ---
 with st.sidebar:
@@ -34,18 +89,32 @@ with st.sidebar:
     
             with st.status("🚀 communicating with Backend API...", expanded=True) as status:
                 
-                # Prepare the file to send over the network
-                files = {"file": uploaded_file.getvalue()}
-                
                 try:
-                    # CALL THE API (The "Production Way")
-                    response = requests.post("http://localhost:8000/validate_document", files={"file": uploaded_file})
+                    # CALL THE STREAMING API: one Server-Sent Event per finished stage
+                    response = requests.post(
+                        f"{BACKEND_URL}/validate_document/stream",
+                        files={"file": (uploaded_file.name, uploaded_file.getvalue())},
+                        stream=True,
+                    )
                     
                     if response.status_code == 200:
-                        validation_report = response.json()
-                        st.session_state.current_result = validation_report
-                        st.session_state.processed = True
-                        status.update(label="✅ API Response Received!", state="complete")
+                        # One report per provider (group practice packets hold many)
+                        results = []
+                        for event, payload in read_sse(response):
+                            if event == "stage":
+                                render_stage_event(payload)
+                                status.update(label=f"⏳ {STAGE_LABELS.get(payload['stage'], payload['stage'])} done...")
+                            elif event == "report":
+                                if "error" in payload:
+                                    st.error(f"Pipeline Error: {payload['error']}")
+                                else:
+                                    results.append(payload)
+                                    st.session_state.results = results
+                                    st.session_state.processed = True
+                                    status.update(label=f"✅ {len(results)} report(s) received!", state="complete")
+                            elif event == "error":
+                                st.error(f"API Error: {payload.get('detail')}")
+                                status.update(label="❌ Pipeline failed", state="error")
                     else:
                         st.error(f"API Error: {response.text}")
                         
@@ -55,21 +124,44 @@ with st.sidebar:
 # --- 4. Main Dashboard Area ---
 st.title("🏥 Provider Data Validation Dashboard")
 
-# Top Level Metrics (The "Business Value" View)
+# Top Level Metrics (The "Business Value" View), from the backend's running aggregates
+try:
+    summary = fetch_json("/reports/summary")
+except Exception:
+    summary = None
+
 col1, col2, col3, col4 = st.columns(4)
-col1.metric("Providers Processed", "142", "+12 today")
-col2.metric("Avg. Confidence Score", "88%", "+5%")
-col3.metric("Critical Flags", "3", "Requires Attention")
+if summary:
+    avg, avg_today = summary["avg_score"], summary["avg_score_today"]
+    col1.metric("Providers Processed", summary["reports"], f"+{summary['reports_today']} today")
+    col2.metric(
+        "Avg. Confidence Score",
+        f"{avg:.0f}%" if avg is not None else "N/A",
+        f"{avg_today - avg:+.1f}% today" if avg_today is not None else None,
+    )
+    col3.metric("Critical Flags", summary["critical"], f"+{summary['critical_today']} today", delta_color="inverse")
+else:
+    col1.metric("Providers Processed", "N/A")
+    col2.metric("Avg. Confidence Score", "N/A")
+    col3.metric("Critical Flags", "N/A")
 col4.metric("AHT Savings", "94%", "vs Manual")
 
 st.markdown("---")
 
 # --- 5. The "Wow" Factor: Side-by-Side Comparison ---
-if st.session_state.processed and 'current_result' in st.session_state:
+if st.session_state.processed and st.session_state.get('results'):
     st.subheader("剥 Real-Time Validation Result")
     
-    # Get the real data from the backend report
-    res = st.session_state.current_result
+    # Get the real data from the backend report (pick one when the document held several providers)
+    results = st.session_state.results
+    choice = 0
+    if len(results) > 1:
+        choice = st.selectbox(
+            f"{len(results)} providers found in this document",
+            range(len(results)),
+            format_func=lambda i: f"{i + 1}. {results[i]['extracted'].get('provider_name') or 'Unknown'} (pages {results[i]['segment']['pages'][0]}–{results[i]['segment']['pages'][1]})",
+        )
+    res = results[choice]
     extracted = res['extracted']
     official = res['official']
     score = res['validation_result']['score']
@@ -98,28 +190,41 @@ if st.session_state.processed and 'current_result' in st.session_state:
         else:
             st.success("VERIFIED MATCH")
 
-    # Add to Queue Logic
-    # Check if this NPI is already in our list to avoid duplicates
-    existing_npis = st.session_state.data_log["NPI"].astype(str).values
-    current_npi = str(extracted.get("npi_number"))
-    
-    if current_npi not in existing_npis:
-        new_row = {
-            "ID": f"P-00{len(st.session_state.data_log) + 2}", 
-            "Name": extracted.get("provider_name"), 
-            "NPI": current_npi, 
-            "Score": score, 
-            "Status": "Critical Mismatch" if score < 70 else "Verified"
-        }
-        st.session_state.data_log = pd.concat([pd.DataFrame([new_row]), st.session_state.data_log], ignore_index=True)
-
 st.markdown("---")
 
 # --- 6. The "Prioritized Queue" (DataFrame) ---
 st.subheader("📋 Prioritized Review Queue (Lowest Confidence First)")
 
-# Sort data so lowest score is on top
-sorted_df = st.session_state.data_log.sort_values(by="Score", ascending=True)
+# Every report is stored by the backend; filter, sort and page on the server
+q1, q2, q3, q4, q5 = st.columns(5)
+sort_key = q1.selectbox("Sort by", ["score", "priority", "created_at", "npi", "provider_name"])
+order = q2.selectbox("Order", ["asc", "desc"])
+priority_filter = q3.selectbox("Priority", ["All", "Critical", "High", "Medium", "Low"])
+page_size = q4.selectbox("Rows per page", [25, 50, 100, 250], index=1)
+page_number = q5.number_input("Page", min_value=1, value=1, step=1)
+
+params = {"offset": (page_number - 1) * page_size, "limit": page_size, "sort": sort_key, "order": order}
+if priority_filter != "All":
+    params["priority"] = priority_filter
+try:
+    page = fetch_json("/reports", **params)
+except Exception as e:
+    st.error(f"Could not load the review queue: {e}")
+    page = {"total": 0, "items": []}
+
+sorted_df = pd.DataFrame(
+    [{
+        "ID": f"P-{item['id']:05d}",
+        "Name": item["provider_name"],
+        "NPI": item["npi"],
+        "Score": item["score"],
+        "Priority": item["priority"],
+        "Status": "Critical Mismatch" if item["score"] < 70 else "Verified",
+    } for item in page["items"]],
+    columns=["ID", "Name", "NPI", "Score", "Priority", "Status"],
+)
+first = params["offset"] + 1 if page["items"] else 0
+st.caption(f"Showing {first}–{params['offset'] + len(page['items'])} of {page['total']} reports")
 
 # Use data_editor so it looks interactive
 st.data_editor(
@@ -146,16 +251,20 @@ st.data_editor(
 st.subheader("📧 Action Center")
 col_a, col_b = st.columns([1, 3])
 
+# Reports on this page, by provider name (newest report wins)
+page_reports = {item["provider_name"]: item for item in page["items"] if item["provider_name"]}
+
 with col_a:
-    target_provider = st.selectbox("Select Provider to Contact", sorted_df["Name"].unique())
+    target_provider = st.selectbox("Select Provider to Contact", sorted(page_reports))
     if st.button("Generate Correction Email"):
         st.session_state.show_email = True
 
 with col_b:
-    if 'show_email' in st.session_state and st.session_state.show_email:
-        st.text_area(
+    if 'show_email' in st.session_state and st.session_state.show_email and target_provider:
+        recipient = st.text_input("Recipient Email", key=f"recipient_{target_provider}")
+        subject = st.text_input("Subject", f"Important - Data Discrepancy for {target_provider}")
+        body = st.text_area(
             "Generated Email Draft",
-            f"Subject: Important - Data Discrepancy for {target_provider}\n\n"
             f"Dear {target_provider},\n\n"
             "Our automated validation system has detected a discrepancy in your contact information "
             "between your submitted application and the NPI Registry.\n\n"
@@ -163,4 +272,20 @@ with col_b:
             "Sincerely,\nProvider Network Team",
             height=200
         )
-        st.button("Send Email 🚀")
\ No newline at end of file
+        if st.button("Send Email 🚀", disabled=not recipient):
+            # The backend queues it; delivery happens in the background
+            try:
+                response = requests.post(
+                    f"{BACKEND_URL}/notifications",
+                    json={"report_id": page_reports[target_provider]["id"], "recipient": recipient, "subject": subject, "body": body},
+                    timeout=10,
+                )
+                result = response.json()
+                if response.status_code == 202 and result["status"] == "queued":
+                    st.success(f"📨 Email queued for delivery to {recipient}")
+                elif response.status_code == 202:
+                    st.info("This provider was already notified about the same discrepancy.")
+                else:
+                    st.error(f"Could not send: {result.get('detail', response.text)}")
+            except Exception as e:
+                st.error(f"Connection Failed: {e}")